@@ -0,0 +1,51 @@
+import os
+import argparse
+
+from src.utils.benchmark import run_benchmark
+
+
+# location where store the benchmark data
+BACKUP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backup')
+
+# declarative grids of the benchmark (see make_grid)
+GRIDS = {
+    'larp_scalability': {'modes': ['larp'],
+                         'fields': [100],
+                         'storages_vehicles': [(5, 3), (10, 6), (15, 9), (20, 12), (25, 15), (30, 18)],
+                         'capacity': 2000,
+                         'iterations': 10},
+
+    'wfa_scalability': {'modes': ['wfa'],
+                        'fields': [5],
+                        'storages_vehicles': [(5, 2), (6, 3), (7, 4), (8, 5)],
+                        'capacity': 100,
+                        'iterations': 10,
+                        'wfa': {'max_cloud': 3, 'max_pop': 10, 'max_UIE': 5, 'min_ero': 2}},
+
+    'wfa_vs_larp': {'modes': ['larp', 'wfa', 'hybrid'],
+                    'fields': [5, 10],
+                    'storages_vehicles': [(5, 2), (6, 3), (7, 4), (8, 5)],
+                    'capacity': 100,
+                    'iterations': 5,
+                    'time_limit': 600},
+}
+
+
+# results of all the grids (see ResultsStore)
+RESULTS = os.path.join(BACKUP, 'results.sqlite')
+
+
+def main(grid:str, workers:int=1, timeout:float=None, path:str=RESULTS) -> None:
+    run_benchmark(GRIDS[grid], path, workers, timeout)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Run a benchmark grid of the LARP solvers')
+    parser.add_argument('grid', choices=list(GRIDS))
+    parser.add_argument('--workers', type=int, default=1, help='number of cells running at the same time')
+    parser.add_argument('--timeout', type=float, default=None, help='maximum number of seconds of a cell')
+    parser.add_argument('--out', default=RESULTS, help='results file, SQLite (.sqlite, .db) or CSV')
+    args = parser.parse_args()
+
+    main(args.grid, args.workers, args.timeout, args.out)
@@ -0,0 +1,37 @@
+import os
+import sys
+import argparse
+
+from src.utils.regression import CORPUS, run_suite, compare, load_baseline, save_baseline
+
+
+PROJECT = os.path.dirname(os.path.abspath(__file__))
+
+# location of the data and of the stored baseline
+DATA = os.path.join(PROJECT, 'data')
+BASELINE = os.path.join(PROJECT, 'backup', 'regression_baseline.json')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='WFA vs exact LARP regression suite')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file (JSON)')
+    parser.add_argument('--update', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--quick', action='store_true', help='only the random instances of the corpus')
+    args = parser.parse_args()
+
+    corpus = [spec for spec in CORPUS if spec['source'] == 'random'] if args.quick else CORPUS
+    results = run_suite(DATA, corpus)
+    baseline = load_baseline(args.baseline)
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print('REGRESSION', ' '.join(f'{name}: {value}' for name, value in regression.items()))
+
+    if args.update or not baseline:
+        save_baseline(args.baseline, results)
+        print('baseline stored:', args.baseline)
+    elif not regressions:
+        print('no regressions')
+
+    sys.exit(1 if regressions and not args.update else 0)
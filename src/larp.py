@@ -1,10 +1,20 @@
+import os
+import tempfile
+from contextlib import contextmanager, nullcontext
+from timeit import default_timer as timer
+
 import pandas as pd
 import numpy as np
 
 import gurobipy as gp
 from gurobipy import GRB
 
-gp.disposeDefaultEnv() # reset default env variables
+from src.utils.model_cache import ModelCache
+from src.utils.larp_matrix import export_matrices
+from src.utils.presolve import presolve
+from src.utils.strengthening import check_strengthening, identical_storages, min_open_storages
+from src.utils.solve_recorder import SolveRecorder
+from src.utils.memory_profiler import MemoryProfiler
 
 
 class LARP:
@@ -20,7 +30,10 @@ class LARP:
                  q:dict, 
                  fs_dist:pd.DataFrame, 
                  cs_dist:pd.DataFrame, 
-                 pivot_d:pd.DataFrame) -> None:
+                 pivot_d:pd.DataFrame,
+                 env:gp.Env=None,
+                 strengthening:list=None,
+                 forbidden:list=None) -> None:
         '''
             This class rapresent the LARP model, it is composed
             by a set of class methods to define the decision variables,
@@ -64,12 +77,44 @@ class LARP:
 
             pivot_d:pd.DataFrame
             Dataframe rapresenting the amount of agricultural waste per fieds
+
+            env:gp.Env
+            Gurobi environment used by the model (see EnvPool), if None the
+            Gurobi default environment is used. The environment is never
+            disposed by the LARP instance
+
+            strengthening:list
+            Names of the optional strengtheners of the formulation (see
+            STRENGTHENERS), also used by the matrix export (see to_matrices)
+
+            forbidden:list
+            List of (field, storage) labels that cannot be assigned (see
+            presolve), their Y variables are fixed to 0 by build and by
+            the matrix export
             
         '''
 
         self._X = None
         self._Y = None
         self._Z = None       
+        self._T = None
+
+        # handles of the constraints patched by the update method
+        self._capacity_constrs = dict()
+        self._subtour_constrs = dict()
+        self._load_constrs = dict()
+        self._strengthening_constrs = list()
+
+        # seconds spent to build each part of the model
+        self.build_timings = dict()
+        self._profiler = None
+
+        # number of optimizations of the model (e.g. by the WFA)
+        self.solver_calls = 0
+
+        # on-disk model cache, set by the build method
+        self._cache = None
+        self._cache_key = None
 
         self._X_sol = None
         self._Y_sol = None
@@ -96,13 +141,17 @@ class LARP:
         self._cs_dist = cs_dist
         self._pivot_d = pivot_d
 
+        self.strengthening = check_strengthening(strengthening)
+        self.forbidden = list() if forbidden is None else list(forbidden)
+
         self.fields_idx = dict(zip(fields, range(self.n_fields)))
         self.storages_idx = dict(zip(storages, range(self.m_storages)))
         self.idx_to_storages = dict(zip(range(self.m_storages), storages))
         self.J_0_idx = dict(zip(self.J_0, range(len(self.J_0))))
 
         # larp model
-        self._model = gp.Model('location_assignment_routing_problem') # general Gurobi mdodel
+        self._env = env
+        self._model = gp.Model('location_assignment_routing_problem', env=env) # general Gurobi mdodel
         self._model.modelSense = GRB.MINIMIZE # decleare the problem as minimization problem
         self._model.setParam('outputFlag', 0)
 
@@ -161,6 +210,19 @@ class LARP:
         self._Z = self._model.addVars([(u,v) for u in range(len(self.J_0)) for v in range(len(self.J_0)) if u!=v], 
                                           vtype=GRB.BINARY, name='Z')
 
+        for i, j in zip(*np.nonzero(self._forbidden_mask())):
+            self._Y[i,j].UB = 0.0
+
+    def _forbidden_mask(self) -> np.ndarray:
+        '''
+            Support function to return the forbidden assignments as a
+            boolean array of shape (n_fields, m_storages).
+        '''
+        mask = np.zeros((self.n_fields, self.m_storages), dtype=bool)
+        for field, storage in self.forbidden:
+            mask[self.fields_idx[field], self.storages_idx[storage]] = True
+        return mask
+
     def _decleare_objective_function(self) -> None:
         '''
             Support function to decleare the objective function of the model
@@ -179,39 +241,58 @@ class LARP:
         '''
 
         # all fields have to be assigned to exactly one storage
-        for i in self._fields:
-            self._model.addConstr(
-                gp.quicksum(self._Y[self.fields_idx[i],self.storages_idx[j]] for j in self._storages) == 1)
+        with self._build_phase('assignment'):
+            for i in self._fields:
+                self._model.addConstr(
+                    gp.quicksum(self._Y[self.fields_idx[i],self.storages_idx[j]] for j in self._storages) == 1)
         
         # (capacity constraint) amount of agricultural waste cannot exceed the
         # storage capacity, this is valid for each storage
-        for j in self._storages:
-            self._model.addConstr(
-                gp.quicksum(self._pivot_d.loc[i,h]*self._Y[self.fields_idx[i],self.storages_idx[j]] 
-                            for i in self._fields for h in self._households) <= self._q[j]*self._X[self.storages_idx[j]])
+        with self._build_phase('capacity'):
+            for j in self._storages:
+                self._capacity_constrs[self.storages_idx[j]] = self._model.addConstr(
+                    gp.quicksum(self._pivot_d.loc[i,h]*self._Y[self.fields_idx[i],self.storages_idx[j]] 
+                                for i in self._fields for h in self._households) <= self._q[j]*self._X[self.storages_idx[j]],
+                    name=f'capacity[{self.storages_idx[j]}]')
         
         # (conservatibe constrains) k_vehicles leave the main facility
         # and k_vehicles return to the main facility
-        self._model.addConstr(
-            gp.quicksum(self._Z[self.storages_idx[u],self.J_0_idx[self._facility]] 
-                        for u in self._storages) == self._k_vehicles)
-        self._model.addConstr(
-            gp.quicksum(self._Z[self.J_0_idx[self._facility],self.storages_idx[v]] 
-                        for v in self._storages) == self._k_vehicles)
-
-        # linearization of non-linear constrains
-        self._apply_linearization()
+        with self._build_phase('conservation'):
+            self._model.addConstr(
+                gp.quicksum(self._Z[self.storages_idx[u],self.J_0_idx[self._facility]] 
+                            for u in self._storages) == self._k_vehicles)
+            self._model.addConstr(
+                gp.quicksum(self._Z[self.J_0_idx[self._facility],self.storages_idx[v]] 
+                            for v in self._storages) == self._k_vehicles)
+
+        # linearization of non-linear constrains, or degree constraints
+        # without auxiliary variables (strengthening)
+        if 'degree' in self.strengthening:
+            with self._build_phase('degree'):
+                self._add_degree_constrs()
+        else:
+            with self._build_phase('linearization'):
+                self._apply_linearization()
 
         # include constrains to eliminate subtorus
-        self._eliminate_subtours()
+        with self._build_phase('subtours'):
+            self._eliminate_subtours()
+
+        # symmetry breaking and rounded capacity constraints (strengthening)
+        if self.strengthening:
+            with self._build_phase('strengthening'):
+                self._add_strengthening_constrs()
 
         # NOTE: Totally Unimodularity constraint
         # Since the adjacency matrix of the distances among the storages
         # is total unimodular, it means the LARP decision variables are all integer
         # therefore, the following set of constrains can be included
-        for i in self._fields:
-            for j in self._storages:
-                self._model.addConstr(self._Y[self.fields_idx[i],self.storages_idx[j]] >= 0)
+        # (they are redundant with the binary bounds, see drop_redundant)
+        if 'drop_redundant' not in self.strengthening:
+            with self._build_phase('unimodularity'):
+                for i in self._fields:
+                    for j in self._storages:
+                        self._model.addConstr(self._Y[self.fields_idx[i],self.storages_idx[j]] >= 0)
     
     def _eliminate_subtours(self) -> None:
         '''
@@ -220,6 +301,7 @@ class LARP:
         '''
         # auxiliary decision variables
         T = self._model.addVars([w for w in range(self.m_storages)], vtype=GRB.INTEGER, name='T')
+        self._T = T
 
         for u in self._storages:
             self._model.addConstr(T[self.storages_idx[u]] >= 0)
@@ -227,16 +309,18 @@ class LARP:
         for u in self._storages:
             for v in self._storages:
                 if u != v:
-                    self._model.addConstr(T[self.storages_idx[u]] - T[self.storages_idx[v]] + 
+                    self._subtour_constrs[self.storages_idx[u], self.storages_idx[v]] = self._model.addConstr(T[self.storages_idx[u]] - T[self.storages_idx[v]] + 
                                                self._Q_vehicle_capacity*self._Z[self.storages_idx[u], self.storages_idx[v]] <= 
                             self._Q_vehicle_capacity - (self._k_vehicles**(-1))*gp.quicksum(
                                 self._pivot_d.loc[i,h]*self._Y[self.fields_idx[i],self.storages_idx[v]] 
-                                                                                for i in self._fields for h in self._households))
+                                                                                for i in self._fields for h in self._households),
+                            name=f'subtour[{self.storages_idx[u]},{self.storages_idx[v]}]')
 
             self._model.addConstr(T[self.storages_idx[u]] <= self._Q_vehicle_capacity)
-            self._model.addConstr((self._k_vehicles**(-1))*gp.quicksum(
+            self._load_constrs[self.storages_idx[u]] = self._model.addConstr((self._k_vehicles**(-1))*gp.quicksum(
                 self._pivot_d.loc[i,h]*self._Y[self.fields_idx[i],self.storages_idx[u]] 
-                                                                for i in self._fields for h in self._households) <= T[self.storages_idx[u]])
+                                                                for i in self._fields for h in self._households) <= T[self.storages_idx[u]],
+                name=f'load[{self.storages_idx[u]}]')
     
     def _apply_linearization(self) -> None:
         '''
@@ -275,29 +359,437 @@ class LARP:
                     )
                     self._model.addConstr(W_2[self.J_0_idx[u], self.J_0_idx[v]] <= self._Z[self.J_0_idx[u], self.J_0_idx[v]])
 
-    def build(self) -> None:
+    def _add_degree_constrs(self) -> None:
+        '''
+            Support function to tie the routes to the open storages: exactly
+            one arc enters and one arc leaves an open storage, none a closed
+            one. They replace the linearization of X_u*Z_uv and X_v*Z_uv
+            (W_1 and W_2), which has the same effect on the solutions not
+            paying for arcs among closed storages.
+        '''
+        for v in self._storages:
+            self._model.addConstr(gp.quicksum(self._Z[self.J_0_idx[u], self.storages_idx[v]]
+                                              for u in self.J_0 if u!=v) == self._X[self.storages_idx[v]])
+            self._model.addConstr(gp.quicksum(self._Z[self.storages_idx[v], self.J_0_idx[u]]
+                                              for u in self.J_0 if u!=v) == self._X[self.storages_idx[v]])
+
+    def _add_strengthening_constrs(self) -> None:
+        '''
+            Support function to add the strengthening constraints depending
+            on the inputs (symmetry and rounded_capacity, see STRENGTHENERS);
+            the ones already in the model are replaced.
+        '''
+        self._model.remove(self._strengthening_constrs)
+        self._strengthening_constrs = list()
+        arrays = self.get_arrays()
+        X, Y = self._X, self._Y
+
+        if 'symmetry' in self.strengthening:
+            # with some demand the facility has to be in the routes
+            X[self.J_0_idx[self._facility]].LB = 1.0 if arrays['demand'].sum() > 0 else 0.0
+            # identical storages are opened in order
+            for group in identical_storages(arrays):
+                for a, b in zip(group[:-1], group[1:]):
+                    self._strengthening_constrs.append(self._model.addConstr(X[a] >= X[b], name=f'symmetry[{a},{b}]'))
+
+        if 'rounded_capacity' in self.strengthening:
+            self._strengthening_constrs.append(self._model.addConstr(
+                gp.quicksum(X[j] for j in range(self.m_storages)) >= min_open_storages(arrays, self._k_vehicles),
+                name='open_storages'))
+            self._strengthening_constrs += self._model.addConstrs(
+                (Y[i,j] <= X[j] for i in range(self.n_fields) for j in range(self.m_storages)),
+                name='assignment_bound').values()
+
+    def build(self, cache:ModelCache=None, warm_start:bool=True, profiler:MemoryProfiler=None) -> None:
         '''
             Public method to build the model, this process is composed
             by the declaration of decision variables, declaration of 
             objective function and declaration of constraints. This is a
             required step to set the LARP model and start the optimization.
+
+            If a cache is given and it already contains a model for the same
+            inputs (see input_hash), the stored model is loaded and the build
+            process is skipped completely.
+
+            Arguments
+            ---------
+
+            cache:ModelCache
+            On-disk cache of built models, optional
+
+            warm_start:bool
+            If True, the last solution stored in the cache (if any) is used
+            as starting point for the optimization
+
+            profiler:MemoryProfiler
+            Memory profiler of the build phases, optional
+
+            Return
+            ------
+
+            None
         '''
-        self._declare_decision_variables()
+        self._profiler = profiler
+
+        if cache is not None:
+            self._cache = cache
+            self._cache_key = self.input_hash()
+
+            if self._cache_key in cache:
+                self._load_model(cache, self._cache_key, warm_start)
+                print('-- LARP model loaded from cache --')
+                return
+
+        with self._build_phase('variables'):
+            self._declare_decision_variables()
         # print('LARP decision variables defined')
 
-        self._decleare_objective_function()
+        with self._build_phase('objective'):
+            self._decleare_objective_function()
         # print('LARP objective function defined')
 
         self._decleare_constrains()
         # print('LARP constrains defined')
 
+        if cache is not None:
+            self._model.update()
+            cache.store_model(self._cache_key, self._model)
+
         print('-- LARP model build COMPLETED --')
 
-    def optimize(self) -> None:
+    @contextmanager
+    def _build_phase(self, name:str):
+        '''
+            Support context manager to measure the time spent (and
+            the memory used, if a profiler is set) in a phase of the
+            build process.
+        '''
+        memory = self._profiler.phase(name) if self._profiler is not None else nullcontext()
+        start = timer()
+        try:
+            with memory:
+                yield
+        finally:
+            self.build_timings[name] = timer()-start
+
+    def _load_model(self, cache:ModelCache, key:str, warm_start:bool) -> None:
+        '''
+            Support function to replace the (empty) LARP model with the
+            one stored in the cache, parameters already set on the current
+            model are kept.
+        '''
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            params_path = os.path.join(tmp_dir, 'params.prm')
+            self._model.write(params_path) # only non-default parameters are written
+
+            model = gp.read(cache.model_path(key), env=self._env)
+            model.read(params_path)
+
+        model.modelSense = GRB.MINIMIZE
+        if warm_start and cache.has_solution(key):
+            model.read(cache.solution_path(key)) # a solution file sets the Start attribute
+        cache.touch(key)
+
+        self._model.dispose()
+        self._model = model
+        self._bind_model()
+
+    def _bind_model(self) -> None:
+        '''
+            Support function to retrieve decision variables and constraints
+            of a model not built by this instance, using their names.
+        '''
+        model = self._model
+        model.update()
+        J_0_len = len(self.J_0)
+
+        self._X = gp.tupledict({j: model.getVarByName(f'X[{j}]') for j in range(J_0_len)})
+        self._Y = gp.tupledict({(i,j): model.getVarByName(f'Y[{i},{j}]') 
+                                for i in range(self.n_fields) for j in range(self.m_storages)})
+        self._Z = gp.tupledict({(u,v): model.getVarByName(f'Z[{u},{v}]') 
+                                for u in range(J_0_len) for v in range(J_0_len) if u!=v})
+        self._T = gp.tupledict({w: model.getVarByName(f'T[{w}]') for w in range(self.m_storages)})
+
+        self._capacity_constrs = {j: model.getConstrByName(f'capacity[{j}]') for j in range(self.m_storages)}
+        self._load_constrs = {u: model.getConstrByName(f'load[{u}]') for u in range(self.m_storages)}
+        self._subtour_constrs = {(u,v): model.getConstrByName(f'subtour[{u},{v}]') 
+                                 for u in range(self.m_storages) for v in range(self.m_storages) if u!=v}
+        self._strengthening_constrs = [constr for constr in model.getConstrs()
+                                       if constr.ConstrName.startswith(('symmetry[', 'open_storages', 'assignment_bound['))]
+
+    def input_hash(self) -> str:
+        '''
+            Public method to compute a content hash of the LARP inputs,
+            used as key of the model cache.
+
+            Arguments
+            ---------
+
+            None
+
+            Return
+            ------
+
+            str
+            Hexadecimal digest of the inputs
+        '''
+        arrays = self.get_arrays()
+        # the strengtheners and the forbidden assignments change the model,
+        # the key of the plain model is unchanged
+        strengthening = (self.strengthening,) if self.strengthening else ()
+        forbidden = (self._forbidden_mask(),) if self.forbidden else ()
+        return ModelCache.hash_inputs(self._facility, self._k_vehicles, self._Q_vehicle_capacity,
+                                      self._fields, self._storages,
+                                      arrays['f'], arrays['q'], arrays['demand'],
+                                      arrays['cs_dist'], arrays['fs_dist'], *strengthening, *forbidden)
+
+    def optimize(self, recorder:SolveRecorder=None) -> None:
         '''
             Public method to start the LARP optimization
+
+            Arguments
+            ---------
+
+            recorder:SolveRecorder
+            Callback to record the progress of the optimization, optional;
+            the build timings of the model are attached to it
+
+            Return
+            ------
+
+            None
+        '''
+        self.solver_calls += 1
+        if recorder is None:
+            self._model.optimize()
+        else:
+            recorder.build_timings = dict(self.build_timings)
+            self._model.optimize(recorder)
+            recorder.record_final(self._model)
+
+        if self._cache is not None:
+            self._cache.store_solution(self._cache_key, self._model)
+
+    def get_arrays(self) -> dict:
+        '''
+            Public method to return the LARP inputs as NumPy arrays,
+            ordered as the indexes of the decision variables.
+
+            Arguments
+            ---------
+
+            None
+
+            Return
+            ------
+
+            dict
+            A dictionary with the following arrays:
+              - f: storage costs, shape (m_storages,)
+              - q: storage capacities, shape (m_storages,)
+              - demand: agricultural waste per field, shape (n_fields,)
+              - cs_dist: field to storage distances, shape (n_fields, m_storages)
+              - fs_dist: distances among J_0, shape (m_storages+1, m_storages+1)
+        '''
+        pivot_d = self._pivot_d.loc[self._fields, self._households]
+        return {'f': np.array([self._f[j] for j in self._storages], dtype=float),
+                'q': np.array([self._q[j] for j in self._storages], dtype=float),
+                'demand': pivot_d.to_numpy(dtype=float).sum(axis=1),
+                'cs_dist': self._cs_dist.loc[self._fields, self._storages].to_numpy(dtype=float),
+                'fs_dist': self._fs_dist.loc[self.J_0, self.J_0].to_numpy(dtype=float)}
+
+    def to_matrices(self) -> dict:
+        '''
+            Public method to export the LARP model as sparse matrices
+            (see export_matrices), built from the NumPy inputs; the
+            model does not need to be built.
+
+            Arguments
+            ---------
+
+            None
+
+            Return
+            ------
+
+            matrices:dict
+            The LARP model in matrix form
+        '''
+        forbidden = self._forbidden_mask() if self.forbidden else None
+        return export_matrices(self.get_arrays(), self._k_vehicles, self._Q_vehicle_capacity,
+                               self.strengthening, forbidden)
+
+    def solve_with(self, backend) -> dict:
+        '''
+            Public method to solve the LARP model with a different backend
+            (see solver_backends), the solution arrays are stored in
+            X_sol, Y_sol and Z_sol.
+
+            Arguments
+            ---------
+
+            backend
+            A backend instance, e.g. HighsBackend
+
+            Return
+            ------
+
+            results:dict
+            Results of the backend: status, objval, solution arrays and runtime
+        '''
+        results = backend.solve(self.to_matrices())
+        if results['objval'] is not None:
+            self._X_sol, self._Y_sol, self._Z_sol = results['X_sol'], results['Y_sol'], results['Z_sol']
+        return results
+
+    def presolve(self, remove_storages:bool=False) -> tuple:
         '''
-        self._model.optimize()
+            Public method to reduce the LARP inputs (see presolve) before
+            the decision variables are created: forbidden assignments and,
+            optionally, storages that are not useful.
+
+            The reduced model fixes the forbidden assignments itself (see
+            the forbidden argument), also in the matrix export and in the
+            WFA; its solutions are mapped to the original storages with
+            Reduction.map_solution (solution arrays) or Reduction.map_dow
+            (WFA solutions).
+
+            Arguments
+            ---------
+
+            remove_storages:bool
+            If True, storages without allowed fields and dominated storages
+            are removed (heuristic reduction, see presolve)
+
+            Return
+            ------
+
+            larp:LARP
+            A new LARP instance with the reduced inputs, not built
+
+            reduction:Reduction
+            Reductions (see Reduction.report) and mapping to this model
+        '''
+        reduction = presolve(self._k_vehicles, self._Q_vehicle_capacity, self._fields, self._storages,
+                             self._households, self._f, self._q, self._fs_dist, self._cs_dist, self._pivot_d,
+                             remove_storages)
+        larp = LARP(self._facility, self._k_vehicles, self._Q_vehicle_capacity, *reduction.inputs, env=self._env,
+                    strengthening=self.strengthening, forbidden=reduction.forbidden)
+        return larp, reduction
+
+    def update(self,
+               f:dict=None,
+               q:dict=None,
+               fs_dist:pd.DataFrame=None,
+               cs_dist:pd.DataFrame=None,
+               pivot_d:pd.DataFrame=None) -> None:
+        '''
+            Public method to patch the inputs of an already built model,
+            without building it again. Only the coefficients affected by
+            the new values are changed:
+              - objective coefficients of X, Y and Z;
+              - storage capacities (coefficients of X in the capacity constraints);
+              - field demands in the capacity and subtour elimination constraints;
+              - strengthening constraints depending on the inputs, replaced
+                (see STRENGTHENERS).
+
+            If the model has a solution, it is used as starting point (warm start)
+            for the next optimization.
+
+            Arguments
+            ---------
+
+            f:dict
+            Dictionary of storages and cost, it may contain only the changed storages
+
+            q:dict
+            Dictionary of storages and storage capacities, it may contain only
+            the changed storages
+
+            fs_dist:pd.DataFrame
+            storage to storage distance dataframe, it may contain only the
+            changed rows and columns
+
+            cs_dist:pd.DataFrame
+            field to storage distance dataframe, it may contain only the
+            changed rows and columns
+
+            pivot_d:pd.DataFrame
+            Dataframe rapresenting the amount of agricultural waste per fieds,
+            it may contain only the changed fields
+
+            Return
+            ------
+
+            None
+        '''
+        assert self._X is not None, 'ERROR: LARP model has to be built before an update'
+
+        # keep the current solution (if any), since model changes discard it
+        start = None
+        if self._model.SolCount > 0:
+            variables = self._model.getVars()
+            start = self._model.getAttr('X', variables)
+
+        old = self.get_arrays()
+
+        if f is not None:
+            self._f = {**self._f, **f}
+        if q is not None:
+            self._q = {**self._q, **q}
+        if fs_dist is not None:
+            self._fs_dist = self._fs_dist.copy()
+            self._fs_dist.loc[fs_dist.index, fs_dist.columns] = fs_dist
+        if cs_dist is not None:
+            self._cs_dist = self._cs_dist.copy()
+            self._cs_dist.loc[cs_dist.index, cs_dist.columns] = cs_dist
+        if pivot_d is not None:
+            self._pivot_d = self._pivot_d.copy()
+            self._pivot_d.loc[pivot_d.index, pivot_d.columns] = pivot_d
+
+        new = self.get_arrays()
+
+        # (objective function) location costs
+        for j in np.nonzero(old['f'] != new['f'])[0]:
+            self._X[j].Obj = new['f'][j]
+
+        # (objective function) assignment costs
+        old_cost = old['cs_dist']*old['demand'][:, None]
+        new_cost = new['cs_dist']*new['demand'][:, None]
+        for i, j in zip(*np.nonzero(old_cost != new_cost)):
+            self._Y[i,j].Obj = new_cost[i,j]
+
+        # (objective function) transportation costs
+        for u, v in zip(*np.nonzero(old['fs_dist'] != new['fs_dist'])):
+            if u != v:
+                self._Z[u,v].Obj = new['fs_dist'][u,v]
+
+        # (capacity constraint) storage capacities
+        for j in np.nonzero(old['q'] != new['q'])[0]:
+            self._model.chgCoeff(self._capacity_constrs[j], self._X[j], -new['q'][j])
+
+        # (capacity and subtour constraints) field demands
+        for i in np.nonzero(old['demand'] != new['demand'])[0]:
+            for v in range(self.m_storages):
+                self._model.chgCoeff(self._capacity_constrs[v], self._Y[i,v], new['demand'][i])
+                self._model.chgCoeff(self._load_constrs[v], self._Y[i,v], new['demand'][i]/self._k_vehicles)
+                for u in range(self.m_storages):
+                    if u != v:
+                        self._model.chgCoeff(self._subtour_constrs[u,v], self._Y[i,v],
+                                             new['demand'][i]/self._k_vehicles)
+
+        # strengthening constraints depending on the inputs
+        if self.strengthening:
+            self._add_strengthening_constrs()
+
+        self._model.update()
+
+        # the cached model does not represent the patched inputs anymore
+        self._cache, self._cache_key = None, None
+
+        # warm start the next optimization from the previous solution
+        if start is not None:
+            self._model.setAttr('Start', variables, start)
 
     def get_solutions(self) -> tuple:
         '''
@@ -396,7 +888,9 @@ class LARP:
     
     def dispose(self) -> None:
         '''
-            Public method to dispose the LARP model
+            Public method to dispose the LARP model, the Gurobi
+            environment is not disposed since it can be shared
+            with other models
 
             Arguments
             ---------
@@ -408,5 +902,6 @@ class LARP:
 
             None
         '''
-        self._model.dispose()
-        gp.disposeDefaultEnv()
\ No newline at end of file
+        if getattr(self, '_model', None) is not None:
+            self._model.dispose()
+            self._model = None
@@ -0,0 +1,452 @@
+import os
+import csv
+import json
+import time
+import pickle
+import traceback
+import multiprocessing as mp
+from collections import deque
+from itertools import product
+from timeit import default_timer as timer
+
+import numpy as np
+from gurobipy import GRB
+
+from src.larp import LARP
+from src.waterflow import waterflow
+from src.utils.env_pool import get_pool
+from src.utils.gurobipy_utils import set_start
+from src.utils.instance_generator import generate_instance, to_larp_inputs
+from src.utils.solve_recorder import SolveRecorder
+from src.utils.results_store import ResultsStore
+from src.utils.memory_profiler import MemoryProfiler
+from src.utils.strengthening import check_strengthening
+
+
+MODES = ('larp', 'wfa', 'hybrid')
+
+# columns of the results file, the first ones are the same of the old
+# scalability backups (fields, storages, vehicles, iter, build_time, opt_time)
+COLUMNS = ['fields', 'storages', 'vehicles', 'iter', 'build_time', 'opt_time',
+           'mode', 'capacity', 'kind', 'seed', 'status', 'objval', 'wfa_objval', 'error', 'memory',
+           'strengthening']
+
+# columns identifying a cell of the grid
+KEY = ('mode', 'fields', 'storages', 'vehicles', 'capacity', 'iter', 'strengthening')
+
+STATUS = {GRB.OPTIMAL: 'optimal', GRB.INFEASIBLE: 'infeasible', GRB.INF_OR_UNBD: 'infeasible',
+          GRB.UNBOUNDED: 'unbounded', GRB.TIME_LIMIT: 'time_limit',
+          GRB.SOLUTION_LIMIT: 'solution_limit', GRB.INTERRUPTED: 'interrupted'}
+
+# default parameters of the WFA (see wfa_scalability.py)
+WFA_PARAMS = {'max_cloud': 3, 'max_pop': 10, 'max_UIE': 5, 'min_ero': 2}
+
+
+def make_grid(spec:dict) -> list:
+    '''
+        Expand a declarative grid into the list of its cells. The grid is
+        a dictionary with the following items:
+          - modes: list of modes, among 'larp' (exact), 'wfa' and 'hybrid'
+            (WFA solution used as MIP start of the exact model);
+          - fields: list of number of fields;
+          - storages_vehicles: list of pairs (number of storages, number of vehicles);
+          - capacity: vehicle capacity, or list of vehicle capacities;
+          - iterations: integer number of instances per size;
+          - kind: kind of generated instances (see generate_instance), optional;
+          - seed: base seed of the instances, optional;
+          - time_limit: time limit (sec) of the exact optimization, optional;
+          - facility: name of the main facility, optional;
+          - wfa: parameters of the WFA, optional (see WFA_PARAMS);
+          - timeline_dir: folder where the optimization timelines of the exact
+            model are written, optional;
+          - memory: if True, the memory used by the build phases and by the
+            WFA phases is profiled (see MemoryProfiler), optional;
+          - strengthening: list of strengtheners of the LARP formulation (see
+            STRENGTHENERS), or list of such lists to compare them, optional.
+
+        The instance of a cell only depends on its size, iteration and seed,
+        so that different modes are compared on the same instances.
+
+        Arguments
+        ---------
+        spec:dict
+        Declarative grid
+
+        Return
+        ------
+        cells:list
+        List of dictionaries, one per cell
+    '''
+    capacities = spec['capacity'] if isinstance(spec['capacity'], (list, tuple)) else [spec['capacity']]
+    base_seed = spec.get('seed', 0)
+
+    strengthening = spec.get('strengthening', [])
+    if not strengthening or isinstance(strengthening[0], str):
+        strengthening = [strengthening]
+    # each option set is a cell column, e.g. 'degree+drop_redundant' ('' for the plain model)
+    strengthening = ['+'.join(check_strengthening(names)) for names in strengthening]
+
+    cells = list()
+    for mode, n_f, (m_s, k_v), Q, itr, strength in product(spec['modes'], spec['fields'], spec['storages_vehicles'],
+                                                            capacities, range(spec['iterations']), strengthening):
+        if mode not in MODES:
+            raise ValueError(f'unknown benchmark mode: {mode}')
+
+        seed = int(np.random.SeedSequence([base_seed, n_f, m_s, k_v, itr]).generate_state(1)[0])
+        cells.append({'mode': mode, 'fields': n_f, 'storages': m_s, 'vehicles': k_v,
+                      'capacity': Q, 'iter': itr, 'seed': seed,
+                      'kind': spec.get('kind', 'uniform'),
+                      'time_limit': spec.get('time_limit'),
+                      'facility': spec.get('facility', 'F'),
+                      'wfa': {**WFA_PARAMS, **spec.get('wfa', dict())},
+                      'timeline_dir': spec.get('timeline_dir'),
+                      'profile_memory': spec.get('memory', False),
+                      'strengthening': strength})
+    return cells
+
+def _key_value(value) -> str:
+    # numbers are normalized, so that e.g. 100, 100.0 and '100' are the same key;
+    # missing values (e.g. columns added later) are the same of empty strings
+    if value is None:
+        return ''
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return str(int(value)) if value.is_integer() else str(value)
+
+def cell_key(cell:dict) -> tuple:
+    '''
+        Return the key of a cell (or of a row of the results file),
+        used to resume an interrupted benchmark.
+    '''
+    return tuple(_key_value(cell.get(name)) for name in KEY)
+
+def _status(larp:LARP) -> str:
+    return STATUS.get(larp.model.status, str(larp.model.status))
+
+def _new_larp(cell:dict, inputs:tuple, env) -> LARP:
+    strengthening = cell['strengthening'].split('+') if cell.get('strengthening') else None
+    return LARP(cell['facility'], cell['vehicles'], cell['capacity'], *inputs, env, strengthening)
+
+def _run_wfa(cell:dict, inputs:tuple, env, profiler:MemoryProfiler=None) -> tuple:
+    '''
+        Support function to run the WFA on a new LARP instance.
+    '''
+    larp = _new_larp(cell, inputs, env)
+
+    # NOTE: as in the WFA notebook, gurobi stops at the very first feasible solution
+    larp.model.setParam('OutputFlag', 0)
+    larp.model.setParam('SolutionLimit', 1)
+
+    start_build = timer()
+    larp.build(profiler=profiler)
+    build_time = timer()-start_build
+
+    start_opt = timer()
+    dow = waterflow(larp, **cell['wfa'], profiler=profiler)
+    opt_time = timer()-start_opt
+
+    larp.dispose()
+    return dow, build_time, opt_time
+
+def _run_larp(cell:dict, inputs:tuple, env, dow=None, profiler:MemoryProfiler=None) -> tuple:
+    '''
+        Support function to run the exact optimization on a new LARP instance,
+        optionally with a dow (drop-of-water) as MIP start.
+    '''
+    larp = _new_larp(cell, inputs, env)
+    larp.model.setParam('OutputFlag', 0)
+    if cell['time_limit'] is not None:
+        larp.model.setParam('TimeLimit', cell['time_limit'])
+
+    start_build = timer()
+    larp.build(profiler=profiler)
+    build_time = timer()-start_build
+
+    if dow is not None:
+        set_start(larp, dow)
+
+    recorder = SolveRecorder()
+    larp.optimize(recorder)
+
+    if cell['timeline_dir'] is not None:
+        os.makedirs(cell['timeline_dir'], exist_ok=True)
+        name = '_'.join(str(cell[k]) for k in KEY if cell[k] != '') # plain model: same name as before
+        recorder.to_csv(os.path.join(cell['timeline_dir'], f'timeline_{name}.csv'))
+
+    status = _status(larp)
+    objval = larp.model.ObjVal if larp.model.SolCount > 0 else None
+    opt_time = larp.get_execution_time()
+    larp.dispose()
+    return status, objval, build_time, opt_time, recorder.to_array()
+
+def run_cell(cell:dict) -> dict:
+    '''
+        Run a single cell of the benchmark grid: generate its instance
+        and solve it with the cell mode.
+
+        Arguments
+        ---------
+        cell:dict
+        A cell of the grid (see make_grid)
+
+        Return
+        ------
+        row:dict
+        Row of the results file (see COLUMNS), plus the optimization
+        timeline of the exact model (see SolveRecorder.to_array)
+    '''
+    row = {name: cell[name] for name in COLUMNS if name in cell}
+
+    instance = generate_instance(cell['fields'], cell['storages'], cell['kind'], cell['seed'], dtype=float)
+    inputs = to_larp_inputs(instance, cell['facility'])
+
+    # memory profilers of the WFA and of the exact model, only if requested
+    profilers = {'wfa': MemoryProfiler(), 'larp': MemoryProfiler()} if cell['profile_memory'] else dict()
+
+    with get_pool().env() as env:
+        if cell['mode'] == 'larp':
+            status, objval, build_time, opt_time, row['timeline'] = _run_larp(cell, inputs, env,
+                                                                             profiler=profilers.get('larp'))
+
+        else:
+            dow, build_time, opt_time = _run_wfa(cell, inputs, env, profilers.get('wfa'))
+            status = 'infeasible' if dow is None else 'feasible'
+            objval = None if dow is None else dow.obj_value
+            row['wfa_objval'] = objval
+
+            if cell['mode'] == 'hybrid' and dow is not None:
+                status, objval, exact_build, exact_opt, row['timeline'] = _run_larp(cell, inputs, env, dow,
+                                                                                    profilers.get('larp'))
+                build_time, opt_time = build_time+exact_build, opt_time+exact_opt
+
+    row.update({'status': status, 'objval': objval, 'build_time': build_time, 'opt_time': opt_time})
+    if profilers:
+        row['memory'] = json.dumps({name: profiler.report() for name, profiler in profilers.items()
+                                    if profiler.phases})
+    return row
+
+def _worker(cell:dict, conn) -> None:
+    '''
+        Support function executed by the worker processes, the row
+        (or the error) is sent back to the main process.
+    '''
+    try:
+        row = run_cell(cell)
+    except Exception:
+        row = {name: cell[name] for name in COLUMNS if name in cell}
+        row.update({'status': 'error', 'error': traceback.format_exc(limit=3)})
+    conn.send(row)
+    conn.close()
+
+class _CSVResults:
+
+    def __init__(self, path:str) -> None:
+        '''
+            Support class to append the results to a CSV file,
+            one column per item of COLUMNS.
+        '''
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a+', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS, extrasaction='ignore')
+        if new_file:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def keys(self) -> list:
+        self._file.seek(0)
+        return list(csv.DictReader(self._file))
+
+    def append(self, row:dict) -> None:
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+def open_results(path:str):
+    '''
+        Open a results file: a ResultsStore for SQLite databases
+        (.sqlite or .db extension), a CSV file otherwise.
+
+        Arguments
+        ---------
+        path:str
+        Path of the results file
+
+        Return
+        ------
+        ResultsStore or CSV results, both with the methods keys,
+        append and close
+    '''
+    if os.path.splitext(path)[1] in ('.sqlite', '.db'):
+        return ResultsStore(path)
+    return _CSVResults(path)
+
+def completed_keys(results) -> set:
+    '''
+        Return the set of keys of the cells already in the results;
+        cells ended with an error are not completed, so that they are
+        run again when the benchmark is resumed.
+
+        Arguments
+        ---------
+        results:ResultsStore or CSV results
+        Results opened by open_results
+
+        Return
+        ------
+        set
+        Set of cell keys (see cell_key)
+    '''
+    return {cell_key(row) for row in results.keys() if row.get('status') != 'error'}
+
+def run_benchmark(spec:dict, path:str, workers:int=1, timeout:float=None,
+                  poll_interval:float=0.1, verbose:bool=True) -> None:
+    '''
+        Run a benchmark grid, each cell in its own worker process with at
+        most workers cells running at the same time. A cell running for more
+        than timeout seconds is terminated and recorded with status 'timeout'.
+
+        Each result is appended to the results file (see open_results) as soon
+        as the cell ends; cells already in the file are skipped, so an
+        interrupted benchmark is resumed by running it again.
+
+        Arguments
+        ---------
+        spec:dict
+        Declarative grid (see make_grid)
+
+        path:str
+        Path of the results file, a SQLite database (.sqlite or .db) or a CSV file
+
+        workers:int
+        Integer number of cells running at the same time
+
+        timeout:float
+        Maximum number of seconds of a cell, optional
+
+        poll_interval:float
+        Number of seconds between two checks of the running cells
+
+        verbose:bool
+        If True, print the progress of the benchmark
+
+        Return
+        ------
+        None
+    '''
+    results = open_results(path)
+    done = completed_keys(results)
+    pending = deque(cell for cell in make_grid(spec) if cell_key(cell) not in done)
+    if verbose:
+        print('benchmark:', path, '| completed:', len(done), '| pending:', len(pending))
+
+    running = list()
+    try:
+        while pending or running:
+            # start new cells
+            while pending and len(running) < workers:
+                cell = pending.popleft()
+                parent_conn, child_conn = mp.Pipe(duplex=False)
+                process = mp.Process(target=_worker, args=(cell, child_conn), daemon=True)
+                process.start()
+                child_conn.close()
+                running.append((cell, process, parent_conn, timer()))
+
+            # collect ended (or expired) cells
+            still_running = list()
+            for cell, process, conn, start in running:
+                row = None
+                alive = process.is_alive()
+                if not alive:
+                    # the row may be sent right before the worker exits
+                    process.join()
+                if conn.poll():
+                    try:
+                        row = conn.recv()
+                    except EOFError: # the worker exited without a row
+                        pass
+
+                if row is None and not alive:
+                    row = {'status': 'error', 'error': f'exit code {process.exitcode}'}
+                elif row is None and timeout is not None and timer()-start > timeout:
+                    process.terminate()
+                    row = {'status': 'timeout', 'opt_time': timer()-start}
+
+                if row is None:
+                    still_running.append((cell, process, conn, start))
+                    continue
+
+                process.join()
+                conn.close()
+                row = {**{name: cell[name] for name in COLUMNS if name in cell}, **row}
+                results.append(row)
+
+                # the optimization timeline is kept only by the results store
+                timeline = row.get('timeline')
+                if timeline is not None and isinstance(results, ResultsStore):
+                    results.put('_'.join(value for value in cell_key(cell) if value), 'timeline', timeline)
+
+                if verbose:
+                    print(' '.join(f'{name}: {row.get(name)}' for name in KEY+('status', 'opt_time')))
+
+            running = still_running
+            if running:
+                time.sleep(poll_interval)
+    finally:
+        for _, process, _, _ in running:
+            process.terminate()
+        results.close()
+
+def import_legacy(backup:str, path:str, mode:str, capacity:int, kind:str='uniform') -> int:
+    '''
+        Append the rows of an old scalability backup (pickle list of
+        [fields, storages, vehicles, iter, build_time, opt_time]) to
+        a results file.
+
+        Arguments
+        ---------
+        backup:str
+        Path of the old backup (.pkl)
+
+        path:str
+        Path of the results file (see open_results)
+
+        mode:str
+        Mode of the old runs ('larp' or 'wfa')
+
+        capacity:int
+        Vehicle capacity of the old runs
+
+        kind:str
+        Kind of instances of the old runs
+
+        Return
+        ------
+        int
+        Integer number of appended rows
+    '''
+    with open(backup, 'rb') as file:
+        scalability = pickle.load(file)
+
+    results = open_results(path)
+    done = completed_keys(results)
+    rows = 0
+    for n_f, m_s, k_v, itr, build_time, opt_time in scalability:
+        row = {'fields': n_f, 'storages': m_s, 'vehicles': k_v, 'iter': itr,
+               'build_time': build_time, 'opt_time': opt_time, 'mode': mode,
+               'capacity': capacity, 'kind': kind, 'status': 'legacy'}
+        if cell_key(row) in done:
+            continue
+        done.add(cell_key(row))
+        results.append(row)
+        rows += 1
+
+    results.close()
+    return rows
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.distance_matrix import pairwise_distances
+
+
+def _nearest(coordinates:np.ndarray, centers:np.ndarray, block_size:int) -> tuple:
+    '''
+        Support function to return the index of (and the distance to)
+        the nearest center of each point, computed by blocks.
+    '''
+    labels = np.empty(len(coordinates), dtype=np.int64)
+    distances = np.empty(len(coordinates))
+    for start in range(0, len(coordinates), block_size):
+        stop = min(start+block_size, len(coordinates))
+        block = pairwise_distances(coordinates[start:stop], centers, 'euclidean', block_size, dtype=float)
+        labels[start:stop] = block.argmin(axis=1)
+        distances[start:stop] = block[np.arange(stop-start), labels[start:stop]]
+    return labels, distances
+
+def _centers(coordinates:np.ndarray, weights:np.ndarray, labels:np.ndarray, n_clusters:int) -> tuple:
+    '''
+        Support function to compute the weighted centers of the clusters.
+    '''
+    total = np.bincount(labels, weights=weights, minlength=n_clusters)
+    centers = np.stack([np.bincount(labels, weights=weights*coordinates[:, k], minlength=n_clusters)
+                        for k in range(coordinates.shape[1])], axis=1)
+    return centers/np.maximum(total, np.finfo(float).tiny)[:, None], total
+
+def kmeans(coordinates:np.ndarray, n_clusters:int, weights:np.ndarray=None, max_iter:int=100,
+           tol:float=1e-9, seed:int=None, block_size:int=4096) -> tuple:
+    '''
+        Weighted k-means (Lloyd algorithm with k-means++ initialization).
+
+        Arguments
+        ---------
+        coordinates:np.ndarray
+        Coordinates of the points, shape (n_points, 2)
+
+        n_clusters:int
+        Integer number of clusters
+
+        weights:np.ndarray
+        Weight of each point (e.g. demand), optional
+
+        max_iter:int
+        Integer number of maximum iterations
+
+        tol:float
+        The algorithm stops when no center moves more than tol
+
+        seed:int
+        Seed of the random generator
+
+        block_size:int
+        Integer number of points processed at once
+
+        Return
+        ------
+        labels:np.ndarray
+        Cluster of each point, shape (n_points,)
+
+        centers:np.ndarray
+        Coordinates of the clusters, shape (n_clusters, 2)
+    '''
+    rng = np.random.default_rng(seed)
+    coordinates = np.asarray(coordinates, dtype=float)
+    weights = np.ones(len(coordinates)) if weights is None else np.asarray(weights, dtype=float)
+    n_clusters = min(n_clusters, len(coordinates))
+
+    # k-means++ initialization
+    centers = coordinates[[rng.choice(len(coordinates), p=weights/weights.sum())]]
+    for _ in range(1, n_clusters):
+        _, distances = _nearest(coordinates, centers, block_size)
+        prob = weights*distances**2
+        prob = prob/prob.sum() if prob.sum() > 0 else weights/weights.sum()
+        centers = np.concatenate([centers, coordinates[[rng.choice(len(coordinates), p=prob)]]])
+
+    for _ in range(max_iter):
+        labels, _ = _nearest(coordinates, centers, block_size)
+        new_centers, total = _centers(coordinates, weights, labels, n_clusters)
+        new_centers[total == 0] = centers[total == 0] # empty clusters keep their center
+
+        shift = np.abs(new_centers-centers).max()
+        centers = new_centers
+        if shift <= tol:
+            break
+
+    labels, _ = _nearest(coordinates, centers, block_size)
+    return labels, centers
+
+def grid_buckets(coordinates:np.ndarray, n_clusters:int, weights:np.ndarray=None) -> tuple:
+    '''
+        Group points by the cells of a regular side x side grid over the
+        bounding box, with side = ceil(sqrt(n_clusters)); only non-empty
+        cells are returned, so the number of clusters is at most side**2.
+
+        Arguments
+        ---------
+        coordinates:np.ndarray
+        Coordinates of the points, shape (n_points, 2)
+
+        n_clusters:int
+        Integer number of grid cells
+
+        weights:np.ndarray
+        Weight of each point (e.g. demand), used for the centers
+
+        Return
+        ------
+        labels:np.ndarray
+        Cluster of each point, shape (n_points,)
+
+        centers:np.ndarray
+        Weighted centers of the non-empty cells, shape (n_cells, 2)
+    '''
+    coordinates = np.asarray(coordinates, dtype=float)
+    weights = np.ones(len(coordinates)) if weights is None else np.asarray(weights, dtype=float)
+
+    side = int(np.ceil(np.sqrt(n_clusters)))
+    low, high = coordinates.min(axis=0), coordinates.max(axis=0)
+    size = np.where(high > low, (high-low)/side, 1.0)
+
+    cells = np.minimum(((coordinates-low)/size).astype(np.int64), side-1)
+    cells = cells[:, 0]*side + cells[:, 1]
+    _, labels = np.unique(cells, return_inverse=True)
+
+    centers, _ = _centers(coordinates, weights, labels, labels.max()+1)
+    return labels, centers
+
+def aggregate_households(households:pd.DataFrame, n_fields:int, method:str='kmeans', seed:int=None) -> dict:
+    '''
+        Cluster households into fields and aggregate their demand, to
+        reduce the size of a LARP instance. The demand of each field is
+        represented by a single aggregated household (as in random_data).
+
+        Arguments
+        ---------
+        households:pd.DataFrame
+        Household data with columns household, location_x, location_y
+        and demand (see read_households)
+
+        n_fields:int
+        Integer number of fields of the reduced instance
+
+        method:str
+        Clustering method, 'kmeans' or 'grid'
+
+        seed:int
+        Seed of the random generator (kmeans only)
+
+        Return
+        ------
+        aggregation:dict
+        A dictionary with the following items:
+          - fields, households: labels of the reduced instance
+          - pivot_d: demand dataframe of the reduced instance
+          - coordinates: demand-weighted centroids of the fields, shape (n_fields, 2)
+          - assignment: field index of each original household
+          - original_households: labels of the original households
+          - error: demand-weighted mean distance between households and their field
+    '''
+    coordinates = households[['location_x', 'location_y']].to_numpy(dtype=float)
+    demand = households['demand'].to_numpy(dtype=float)
+
+    if method == 'kmeans':
+        labels, centers = kmeans(coordinates, n_fields, weights=demand, seed=seed)
+    elif method == 'grid':
+        labels, centers = grid_buckets(coordinates, n_fields, weights=demand)
+    else:
+        raise ValueError(f'unknown aggregation method: {method}')
+
+    # drop empty clusters and re-label the remaining ones
+    used, labels = np.unique(labels, return_inverse=True)
+    centers = centers[used]
+    n = len(used)
+
+    fields = ['C'+str(i) for i in range(n)]
+    aggregated = ['H'+str(i) for i in range(n)]
+    field_demand = np.bincount(labels, weights=demand, minlength=n)
+    pivot_d = pd.DataFrame(np.diag(field_demand), columns=aggregated, index=fields)
+
+    distances = np.sqrt(((coordinates-centers[labels])**2).sum(axis=1))
+    error = float((distances*demand).sum()/demand.sum())
+
+    return {'fields': fields, 'households': aggregated, 'pivot_d': pivot_d,
+            'coordinates': centers, 'assignment': labels,
+            'original_households': households['household'].tolist(), 'error': error}
+
+def map_to_households(aggregation:dict, Y_sol:pd.DataFrame) -> pd.Series:
+    '''
+        Map the field assignment of a solution of the reduced instance
+        back to the original households.
+
+        Arguments
+        ---------
+        aggregation:dict
+        Output of aggregate_households
+
+        Y_sol:pd.DataFrame
+        Field to storage assignment of the reduced instance (see LARP.get_solutions)
+
+        Return
+        ------
+        pd.Series
+        Storage assigned to each original household
+    '''
+    Y_sol = Y_sol.loc[aggregation['fields']]
+    field_storage = Y_sol.columns.to_numpy()[Y_sol.to_numpy().argmax(axis=1)]
+    return pd.Series(field_storage[aggregation['assignment']],
+                     index=aggregation['original_households'], name='storage')
@@ -0,0 +1,198 @@
+import os
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def euclidean(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    '''
+        Euclidean distances between two sets of points.
+
+        Arguments
+        ---------
+        a:np.ndarray
+        Coordinates of the first set of points, shape (n, 2)
+
+        b:np.ndarray
+        Coordinates of the second set of points, shape (m, 2)
+
+        Return
+        ------
+        np.ndarray
+        Distance matrix, shape (n, m)
+    '''
+    diff = a[:, None, :] - b[None, :, :]
+    return np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+
+def haversine(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    '''
+        Great-circle distances (km) between two sets of points given as
+        (latitude, longitude) in degrees, e.g. (location_x, location_y)
+        of location_and_demand_110.csv.
+
+        Arguments
+        ---------
+        a:np.ndarray
+        Coordinates of the first set of points, shape (n, 2)
+
+        b:np.ndarray
+        Coordinates of the second set of points, shape (m, 2)
+
+        Return
+        ------
+        np.ndarray
+        Distance matrix in km, shape (n, m)
+    '''
+    a, b = np.radians(a), np.radians(b)
+    lat_a, lon_a = a[:, 0, None], a[:, 1, None]
+    lat_b, lon_b = b[None, :, 0], b[None, :, 1]
+
+    h = np.sin((lat_b-lat_a)/2)**2 + np.cos(lat_a)*np.cos(lat_b)*np.sin((lon_b-lon_a)/2)**2
+    return 2*EARTH_RADIUS_KM*np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+METRICS = {'euclidean': euclidean, 'haversine': haversine}
+
+
+def pairwise_distances(a:np.ndarray, b:np.ndarray, metric:str='euclidean',
+                       block_size:int=4096, out=None, dtype=np.float32) -> np.ndarray:
+    '''
+        Compute the distance matrix between two sets of points, by blocks
+        of block_size rows; only one block is held in memory in float64.
+
+        Arguments
+        ---------
+        a:np.ndarray
+        Coordinates of the first set of points, shape (n, 2)
+
+        b:np.ndarray
+        Coordinates of the second set of points, shape (m, 2)
+
+        metric:str
+        Distance kernel, 'euclidean' or 'haversine'
+
+        block_size:int
+        Integer number of rows computed at once
+
+        out:str or np.ndarray
+        Path of a .npy file, written as a memory-mapped array, or an array
+        of shape (n, m); if None, a new array is allocated
+
+        dtype:np.dtype
+        Data type of the distance matrix
+
+        Return
+        ------
+        np.ndarray
+        Distance matrix, shape (n, m); memory-mapped if out is a path
+    '''
+    kernel = METRICS[metric]
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    shape = (a.shape[0], b.shape[0])
+
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif isinstance(out, (str, os.PathLike)):
+        out = np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+
+    for start in range(0, shape[0], block_size):
+        stop = min(start+block_size, shape[0])
+        out[start:stop] = kernel(a[start:stop], b)
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+def field_centroids(coordinates:np.ndarray, labels:np.ndarray, weights:np.ndarray=None) -> tuple:
+    '''
+        Coordinates of the fields, computed as (weighted) centroid of
+        the coordinates of their households.
+
+        Arguments
+        ---------
+        coordinates:np.ndarray
+        Coordinates of the households, shape (n_households, 2)
+
+        labels:np.ndarray
+        Field label of each household, shape (n_households,)
+
+        weights:np.ndarray
+        Weight of each household (e.g. demand), optional
+
+        Return
+        ------
+        fields:np.ndarray
+        Field labels, sorted
+
+        centroids:np.ndarray
+        Coordinates of the fields, shape (n_fields, 2)
+    '''
+    coordinates = np.asarray(coordinates, dtype=float)
+    fields, inverse = np.unique(labels, return_inverse=True)
+    weights = np.ones(len(labels)) if weights is None else np.asarray(weights, dtype=float)
+
+    total = np.bincount(inverse, weights=weights, minlength=len(fields))
+    centroids = np.stack([np.bincount(inverse, weights=weights*coordinates[:, k], minlength=len(fields))
+                          for k in range(coordinates.shape[1])], axis=1)
+    return fields, centroids/total[:, None]
+
+def build_distance_matrices(field_xy:np.ndarray, storage_xy:np.ndarray, facility_xy:np.ndarray,
+                            metric:str='euclidean', block_size:int=4096, out_dir:str=None,
+                            dtype=np.float32) -> tuple:
+    '''
+        Build the LARP distance matrices from coordinates: fields to storages
+        (cs_dist) and storages plus facility to storages plus facility (fs_dist,
+        with the facility as last row/column and no self-loops, i.e. inf
+        on the diagonal).
+
+        Arguments
+        ---------
+        field_xy:np.ndarray
+        Coordinates of the fields, shape (n_fields, 2)
+
+        storage_xy:np.ndarray
+        Coordinates of the storages, shape (m_storages, 2)
+
+        facility_xy:np.ndarray
+        Coordinates of the main facility, shape (2,)
+
+        metric:str
+        Distance kernel, 'euclidean' or 'haversine'
+
+        block_size:int
+        Integer number of rows computed at once
+
+        out_dir:str
+        Folder where cs_dist.npy and fs_dist.npy are written as memory-mapped
+        arrays, optional
+
+        dtype:np.dtype
+        Data type of the distance matrices
+
+        Return
+        ------
+        cs_dist:np.ndarray
+        Field to storage distances, shape (n_fields, m_storages)
+
+        fs_dist:np.ndarray
+        Distances among storages and facility, shape (m_storages+1, m_storages+1)
+    '''
+    J_0_xy = np.concatenate([np.asarray(storage_xy, dtype=float),
+                             np.asarray(facility_xy, dtype=float).reshape((1, -1))])
+
+    cs_out, fs_out = None, None
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        cs_out = os.path.join(out_dir, 'cs_dist.npy')
+        fs_out = os.path.join(out_dir, 'fs_dist.npy')
+
+    cs_dist = pairwise_distances(field_xy, storage_xy, metric, block_size, cs_out, dtype)
+    fs_dist = pairwise_distances(J_0_xy, J_0_xy, metric, block_size, fs_out, dtype)
+    np.fill_diagonal(fs_dist, np.inf)
+
+    if isinstance(fs_dist, np.memmap):
+        fs_dist.flush()
+    return cs_dist, fs_dist
@@ -0,0 +1,149 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import gurobipy as gp
+
+
+class EnvPool:
+
+    def __init__(self, size:int=1, threads=0, params:dict=None) -> None:
+        '''
+            The EnvPool class keeps a small set of started Gurobi environments,
+            so that many LARP models can reuse them instead of paying the
+            environment (and licence) setup for each model.
+
+            An environment is acquired by one model at a time; Gurobi environments
+            are not thread-safe, therefore concurrent models must use different
+            environments. Environments are started lazily, on first request.
+
+            Arguments
+            ---------
+            size:int
+            Integer number of environments in the pool
+
+            threads:int or list
+            Value of the Threads parameter; it can be a list with one value
+            per environment (0 means Gurobi default)
+
+            params:dict
+            Additional parameters set on each environment before starting it
+        '''
+        if isinstance(threads, int):
+            threads = [threads]*size
+        assert len(threads) == size, 'ERROR: one Threads value per environment is required'
+
+        self.size = size
+        self.threads = list(threads)
+        self.params = {'OutputFlag': 0, **(params or dict())}
+
+        self._envs = list()
+        self._available = queue.Queue()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._envs)
+
+    def _start_env(self) -> gp.Env:
+        env = gp.Env(empty=True)
+        for name, value in self.params.items():
+            env.setParam(name, value)
+        env.setParam('Threads', self.threads[len(self._envs)])
+        env.start()
+        self._envs.append(env)
+        return env
+
+    def acquire(self, timeout:float=None) -> gp.Env:
+        '''
+            Get a free environment, a new one is started if the pool is not full;
+            otherwise wait until an environment is released.
+
+            Arguments
+            ---------
+            timeout:float
+            Seconds to wait for a free environment, None to wait forever
+
+            Return
+            ------
+            env:gp.Env
+            A started Gurobi environment
+        '''
+        try:
+            return self._available.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._envs) < self.size:
+                return self._start_env()
+
+        return self._available.get(timeout=timeout)
+
+    def release(self, env:gp.Env) -> None:
+        '''
+            Give back an environment to the pool, models created with it
+            should be already disposed.
+
+            Arguments
+            ---------
+            env:gp.Env
+            Environment previously acquired from the pool
+
+            Return
+            ------
+            None
+        '''
+        self._available.put(env)
+
+    @contextmanager
+    def env(self, timeout:float=None):
+        '''
+            Context manager to acquire and release an environment.
+        '''
+        env = self.acquire(timeout)
+        try:
+            yield env
+        finally:
+            self.release(env)
+
+    def dispose(self) -> None:
+        '''
+            Dispose all the environments of the pool.
+        '''
+        with self._lock:
+            for env in self._envs:
+                env.dispose()
+            self._envs = list()
+            self._available = queue.Queue()
+
+
+_pools = dict()
+
+
+def get_pool(size:int=1, threads=0, params:dict=None) -> EnvPool:
+    '''
+        Return the environment pool of the current process, it is created
+        at the first call. Pools are never shared among processes, so that
+        each worker of a multi-process runner starts its own environments.
+
+        Arguments
+        ---------
+        size:int
+        Integer number of environments in the pool (used only at creation)
+
+        threads:int or list
+        Value of the Threads parameter (used only at creation)
+
+        params:dict
+        Additional environment parameters (used only at creation)
+
+        Return
+        ------
+        EnvPool
+        The pool of the current process
+    '''
+    pid = os.getpid()
+    if pid not in _pools:
+        _pools[pid] = EnvPool(size, threads, params)
+    return _pools[pid]
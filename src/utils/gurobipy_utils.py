@@ -4,6 +4,7 @@ from itertools import product
 from gurobipy import GRB
 from src.utils.utils_waterflow.dow import DOW
 from src.larp import LARP
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
 
 
 def remove_constrs(larp:LARP, constrs:dict) -> LARP:
@@ -69,23 +70,25 @@ def modify_rhs_constrs(dow:DOW, constrs:dict) -> None:
         None
     '''
 
-    X_len = len(dow.X)
+    X = dow.X.tolist()
     constr = constrs['X_Constr_WaterFlow']
-    for i in range(X_len):
-        constr[i].rhs = dow.X[i]
+    for i in range(len(X)):
+        constr[i].rhs = X[i]
 
     constr = constrs.get('Y_Constr_WaterFlow', None)
     if constr:
-        Y_rows, Y_cols = dow.Y.shape
+        Y = dow.Y_matrix
+        Y_rows, Y_cols = Y.shape
         for i, j in product(range(Y_rows), range(Y_cols)):
-            constr[i,j].rhs = dow.Y[i,j]
+            constr[i,j].rhs = Y[i,j]
 
     constr = constrs.get('Z_Constr_WaterFlow', None)
     if constr:
-        Z_rows, Z_cols = dow.Z.shape
+        Z = dow.Z_matrix
+        Z_rows, Z_cols = Z.shape
         for u, v in product(range(Z_rows), range(Z_cols)):
             if u != v: # as the Z decision variable is defined in LARP
-                constr[u,v].rhs = dow.Z[u,v]
+                constr[u,v].rhs = Z[u,v]
     
 def add_constrs(larp:LARP, dow:DOW, option:str='all') -> tuple:
     '''
@@ -117,20 +120,22 @@ def add_constrs(larp:LARP, dow:DOW, option:str='all') -> tuple:
     
     # if option is not equals to 'all', only X_Constr_WaterFlow constraints
     # are created and introduced in larp model
-    X_len = len(dow.X)
-    X_Constr_WaterFlow = model.addConstrs((larp.X[i] == dow.X[i] 
-                    for i in range(X_len)), name='X_Constr_WaterFlow')
+    X = dow.X.tolist()
+    X_Constr_WaterFlow = model.addConstrs((larp.X[i] == X[i] 
+                    for i in range(len(X))), name='X_Constr_WaterFlow')
     constrs['X_Constr_WaterFlow'] = X_Constr_WaterFlow
 
     if option == 'all':
-        Y_rows, Y_cols = dow.Y.shape
-        Y_Constr_WaterFlow = model.addConstrs((larp.Y[i,j] == dow.Y[i,j] 
+        Y = dow.Y_matrix
+        Y_rows, Y_cols = Y.shape
+        Y_Constr_WaterFlow = model.addConstrs((larp.Y[i,j] == Y[i,j] 
                         for i in range(Y_rows) 
                         for j in range(Y_cols)), name='Y_Constr_WaterFlow')
         constrs['Y_Constr_WaterFlow'] = Y_Constr_WaterFlow
         
-        Z_rows, Z_cols = dow.Z.shape
-        Z_Constr_WaterFlow = model.addConstrs((larp.Z[u,v] == dow.Z[u,v]
+        Z = dow.Z_matrix
+        Z_rows, Z_cols = Z.shape
+        Z_Constr_WaterFlow = model.addConstrs((larp.Z[u,v] == Z[u,v]
                         for u in range(Z_rows) 
                         for v in range(Z_cols)
                         if u!=v), name='Z_Constr_WaterFlow')
@@ -138,7 +143,7 @@ def add_constrs(larp:LARP, dow:DOW, option:str='all') -> tuple:
 
     return larp, constrs
 
-def fit(larp:LARP, dow:DOW) -> tuple:
+def fit(larp:LARP, dow:DOW, stats:WFAStats=NO_STATS) -> tuple:
     '''
         Execute the optimization of LARP model.
 
@@ -150,6 +155,9 @@ def fit(larp:LARP, dow:DOW) -> tuple:
         dow:DOW
         A drop-of-water (dow) representing a certain solution
 
+        stats:WFAStats
+        Statistics of the WFA run, solver calls are counted and timed
+
         Return
         ------
         larp: LARP
@@ -163,14 +171,18 @@ def fit(larp:LARP, dow:DOW) -> tuple:
     model.setParam('OutputFlag', 0) # silent optimization logs
 
     # print('model optimization in-progress...')
-    model.optimize()
+    larp.solver_calls += 1
+    with stats.timer('fit'):
+        model.optimize()
     # print('model optimization COMPLETED')
 
     # print('model status:', model.status)
     # if ANY solution is found update dow
     if model.status in [GRB.SOLUTION_LIMIT, GRB.OPTIMAL]:
+        stats.count('fit_feasible')
         dow.obj_value = model.ObjVal
         return larp, True
+    stats.count('fit_infeasible')
     return larp, False
 
 def check_additional_constr(dow:DOW) -> bool:
@@ -189,6 +201,37 @@ def check_additional_constr(dow:DOW) -> bool:
         True if additional check is satisfied, False otherwise
     '''
 
-    X_idx = [i for i in np.nonzero(dow.X)[0]]
-    columns_nozero = all([dow.Y[:, j].any() for j in X_idx])
+    # each open storage (labels from 1) has at least one field assigned
+    columns_nozero = bool(np.isin(np.nonzero(dow.X)[0]+1, dow.Y).all())
     return columns_nozero
+
+def set_start(larp:LARP, dow:DOW) -> None:
+    '''
+        Use a drop-of-water (dow) solution as MIP start of the LARP model,
+        e.g. to warm start the exact optimization with the WFA solution.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model, already built
+
+        dow:DOW
+        A drop-of-water (dow) representing a certain solution
+
+        Return
+        ------
+        None
+    '''
+    X, Y, Z = dow.X.tolist(), dow.Y_matrix, dow.Z_matrix
+
+    for i in range(len(X)):
+        larp.X[i].Start = X[i]
+
+    Y_rows, Y_cols = Y.shape
+    for i, j in product(range(Y_rows), range(Y_cols)):
+        larp.Y[i,j].Start = Y[i,j]
+
+    Z_rows, Z_cols = Z.shape
+    for u, v in product(range(Z_rows), range(Z_cols)):
+        if u!=v:
+            larp.Z[u,v].Start = Z[u,v]
@@ -0,0 +1,231 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.utils.distance_matrix import pairwise_distances
+
+
+KINDS = ('uniform', 'geometric', 'clustered', 'capacity_tight')
+
+# side of the square where geometric instances are generated
+AREA_SIDE = 100.0
+
+
+def _storage_arrays(rng:np.random.Generator, m_storages:int, kind:str, dtype) -> dict:
+    '''
+        Support function to generate the storage level arrays: costs,
+        capacities, coordinates and distances among storages and facility.
+    '''
+    f = rng.integers(low=50, high=200, size=m_storages).astype(dtype)
+    q = np.full(m_storages, 1000, dtype=dtype)
+
+    if kind == 'uniform':
+        # same distributions of the original random_data
+        fs_dist = rng.integers(low=1, high=20, size=(m_storages+1, m_storages+1))
+        fs_dist = ((fs_dist + fs_dist.T)/2).astype(dtype)
+        return {'f': f, 'q': q, 'fs_dist': fs_dist}
+
+    # storages and facility (last row) located in the square
+    storage_xy = rng.uniform(0, AREA_SIDE, size=(m_storages+1, 2))
+    fs_dist = pairwise_distances(storage_xy, storage_xy, 'euclidean', dtype=dtype)
+    np.fill_diagonal(fs_dist, np.inf)
+    return {'f': f, 'q': q, 'fs_dist': fs_dist, 'storage_xy': storage_xy.astype(dtype)}
+
+def _field_chunk(rng:np.random.Generator, size:int, m_storages:int, kind:str,
+                 storage_xy:np.ndarray, dtype) -> dict:
+    '''
+        Support function to generate a chunk of fields: demands, coordinates
+        and distances from the storages.
+    '''
+    demand = rng.integers(low=1, high=10, size=size).astype(dtype)
+
+    if kind == 'uniform':
+        cs_dist = rng.integers(low=1, high=20, size=(size, m_storages)).astype(dtype)
+        return {'demand': demand, 'field_xy': None, 'cs_dist': cs_dist}
+
+    if kind == 'clustered':
+        # fields are spread around the storages
+        centers = storage_xy[rng.integers(0, m_storages, size=size)]
+        field_xy = np.clip(centers + rng.normal(0, AREA_SIDE/20, size=(size, 2)), 0, AREA_SIDE)
+    else:
+        field_xy = rng.uniform(0, AREA_SIDE, size=(size, 2))
+
+    cs_dist = pairwise_distances(field_xy, storage_xy[:-1], 'euclidean', dtype=dtype)
+    return {'demand': demand, 'field_xy': field_xy.astype(dtype), 'cs_dist': cs_dist}
+
+def _chunks(n_fields:int, m_storages:int, kind:str, seed:int, chunk_size:int, dtype):
+    '''
+        Support generator of the instance: the first item is the dictionary of
+        storage arrays, then one dictionary per chunk of fields. Each chunk has
+        its own random generator, spawned from the seed.
+    '''
+    if kind not in KINDS:
+        raise ValueError(f'unknown instance kind: {kind}')
+
+    n_chunks = max(1, -(-n_fields//chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks+1)
+
+    storage = _storage_arrays(np.random.default_rng(seeds[0]), m_storages, kind, dtype)
+    yield storage
+
+    for c in range(n_chunks):
+        start, stop = c*chunk_size, min((c+1)*chunk_size, n_fields)
+        rng = np.random.default_rng(seeds[c+1])
+        chunk = _field_chunk(rng, stop-start, m_storages, kind, storage.get('storage_xy'), dtype)
+        chunk['start'], chunk['stop'] = start, stop
+        yield chunk
+
+def _tight_capacities(q:np.ndarray, total_demand:float, k_slack:float) -> np.ndarray:
+    '''
+        Support function to scale the storage capacities, so that the
+        total capacity is only k_slack times the total demand.
+    '''
+    weights = q/q.sum()
+    return np.ceil(weights*total_demand*k_slack).astype(q.dtype)
+
+def generate_instance(n_fields:int, m_storages:int, kind:str='geometric', seed:int=None,
+                      chunk_size:int=65536, dtype=np.float32, slack:float=1.1) -> dict:
+    '''
+        Generate a reproducible LARP instance as compact NumPy arrays.
+        The following kinds of instances are available:
+          - uniform: the distributions of random_data (random integer distances);
+          - geometric: storages, facility and fields uniformly located in a square,
+            euclidean distances;
+          - clustered: as geometric, but fields are spread around the storages;
+          - capacity_tight: as geometric, with total storage capacity equal to
+            slack times the total demand.
+
+        Arguments
+        ---------
+        n_fields:int
+        Integer number of fields
+
+        m_storages:int
+        Integer number of storages
+
+        kind:str
+        Kind of instance, one of KINDS
+
+        seed:int
+        Seed of the random generator; the same seed (and chunk_size) always
+        gives the same instance
+
+        chunk_size:int
+        Integer number of fields generated at once
+
+        dtype:np.dtype
+        Data type of the arrays
+
+        slack:float
+        Ratio between total capacity and total demand (capacity_tight only)
+
+        Return
+        ------
+        instance:dict
+        A dictionary with the arrays f, q, demand, cs_dist (fields x storages),
+        fs_dist (storages+facility, facility last) and, for geometric kinds,
+        the coordinates field_xy and storage_xy (facility last)
+    '''
+    chunks = _chunks(n_fields, m_storages, kind, seed, chunk_size, dtype)
+    instance = next(chunks)
+    fields = list(chunks)
+
+    instance['demand'] = np.concatenate([chunk['demand'] for chunk in fields])
+    instance['cs_dist'] = np.concatenate([chunk['cs_dist'] for chunk in fields])
+    if kind != 'uniform':
+        instance['field_xy'] = np.concatenate([chunk['field_xy'] for chunk in fields])
+
+    if kind == 'capacity_tight':
+        instance['q'] = _tight_capacities(instance['q'], instance['demand'].sum(), slack)
+    return instance
+
+def stream_instance(path:str, n_fields:int, m_storages:int, kind:str='geometric', seed:int=None,
+                    chunk_size:int=65536, dtype=np.float32, slack:float=1.1) -> dict:
+    '''
+        Generate a LARP instance directly on disk, chunk by chunk, so that
+        only chunk_size fields are held in memory. The arrays are written as
+        .npy files in the path folder and returned memory-mapped; for the same
+        arguments, the arrays are equal to the ones of generate_instance.
+
+        Arguments
+        ---------
+        path:str
+        Folder where the arrays are written
+
+        n_fields, m_storages, kind, seed, chunk_size, dtype, slack
+        See generate_instance
+
+        Return
+        ------
+        instance:dict
+        Same dictionary of generate_instance, with memory-mapped arrays
+    '''
+    os.makedirs(path, exist_ok=True)
+    open_memmap = np.lib.format.open_memmap
+
+    chunks = _chunks(n_fields, m_storages, kind, seed, chunk_size, dtype)
+    instance = dict(next(chunks))
+    storage_xy = instance.pop('storage_xy', None)
+
+    instance['demand'] = open_memmap(os.path.join(path, 'demand.npy'), mode='w+', dtype=dtype, shape=(n_fields,))
+    instance['cs_dist'] = open_memmap(os.path.join(path, 'cs_dist.npy'), mode='w+', dtype=dtype,
+                                      shape=(n_fields, m_storages))
+    if kind != 'uniform':
+        instance['field_xy'] = open_memmap(os.path.join(path, 'field_xy.npy'), mode='w+', dtype=dtype,
+                                           shape=(n_fields, 2))
+
+    for chunk in chunks:
+        start, stop = chunk['start'], chunk['stop']
+        for name in ['demand', 'cs_dist', 'field_xy']:
+            if name in instance:
+                instance[name][start:stop] = chunk[name]
+
+    if kind == 'capacity_tight':
+        instance['q'] = _tight_capacities(instance['q'], float(instance['demand'].sum(dtype=float)), slack)
+
+    # storage level arrays are small, they are written at the end
+    if storage_xy is not None:
+        instance['storage_xy'] = storage_xy
+    for name, array in list(instance.items()):
+        if isinstance(array, np.memmap):
+            array.flush()
+        else:
+            np.save(os.path.join(path, f'{name}.npy'), array)
+        instance[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+    return instance
+
+def to_larp_inputs(instance:dict, facility:str='F') -> tuple:
+    '''
+        Convert a generated instance into the inputs of the LARP class.
+        The demand of each field is represented by a single household
+        (a diagonal pivot_d), as in random_data.
+
+        Arguments
+        ---------
+        instance:dict
+        Output of generate_instance or stream_instance
+
+        facility:str
+        Name of the main facility
+
+        Return
+        ------
+        tuple
+        Tuple with fields, storages, households, f, q, fs_dist, cs_dist, pivot_d
+    '''
+    n_fields, m_storages = instance['cs_dist'].shape
+
+    storages = ['S'+str(i) for i in range(m_storages)]
+    fields = ['C'+str(j) for j in range(n_fields)]
+    households = ['H'+str(h) for h in range(n_fields)]
+
+    f = dict(zip(storages, instance['f'].tolist()))
+    q = dict(zip(storages, instance['q'].tolist()))
+
+    fs_dist = pd.DataFrame(np.asarray(instance['fs_dist'], dtype=float),
+                           columns=storages+[facility], index=storages+[facility])
+    cs_dist = pd.DataFrame(np.asarray(instance['cs_dist'], dtype=float), columns=storages, index=fields)
+    pivot_d = pd.DataFrame(np.diag(np.asarray(instance['demand'], dtype=float)), columns=households, index=fields)
+
+    return fields, storages, households, f, q, fs_dist, cs_dist, pivot_d
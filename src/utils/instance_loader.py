@@ -0,0 +1,252 @@
+import os
+import json
+import hashlib
+
+import pandas as pd
+import numpy as np
+
+
+ARRAYS = ['f', 'q', 'fs_dist', 'cs_dist', 'pivot_d']
+
+# bundles written with a different version are assembled again
+BUNDLE_VERSION = 2
+
+
+def _source_files(data_path:str, use_110:bool) -> list:
+    demand_file = 'location_and_demand_110.csv' if use_110 else 'waste_cluster.csv'
+    files = [demand_file, 'distance_clusters_storages.xlsx',
+             'distance_facilities_storages.xlsx', 'cost_capacity_storages.csv']
+    return [os.path.join(data_path, file) for file in files]
+
+def _file_hash(path:str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def read_households(data_path:str) -> pd.DataFrame:
+    '''
+        Read the household level data (location_and_demand_110.csv).
+        A few rows of the file have location_x and location_y merged in
+        a single value (e.g. 16.7980505.107.2213614), which shifts the
+        demand in the location_y column, and others miss the decimal point
+        (e.g. 1072421435); these rows are repaired.
+
+        Arguments
+        ---------
+        data_path:str
+        Path of the data folder
+
+        Return
+        ------
+        households:pd.DataFrame
+        Dataframe with columns cluster, household, location_x, location_y, demand
+    '''
+    d = pd.read_csv(os.path.join(data_path, 'location_and_demand_110.csv'), dtype={'location_x': str})
+
+    merged = d['location_x'].str.extract(r'^(\d+\.\d+)\.(\d+\.\d+)$')
+    broken = merged[0].notna()
+    d.loc[broken, 'demand'] = d.loc[broken, 'location_y']
+    d.loc[broken, 'location_y'] = merged.loc[broken, 1].astype(float)
+    d.loc[broken, 'location_x'] = merged.loc[broken, 0]
+    d['location_x'] = d['location_x'].astype(float)
+
+    # restore the decimal point, according to the integer digits of the median
+    for col in ['location_x', 'location_y']:
+        digits = len(str(int(abs(d[col].median()))))
+        values = d[col].abs()
+        broken = values >= 10**digits
+        shift = np.floor(np.log10(values[broken])) + 1 - digits
+        d.loc[broken, col] = d.loc[broken, col]/10**shift
+
+    return d
+
+def assemble_instance(data_path:str, facility:str, use_110:bool=False) -> dict:
+    '''
+        Parse the data files and assemble the LARP inputs for a given facility,
+        the same steps of the larp_waste_management notebook.
+
+        Arguments
+        ---------
+        data_path:str
+        Path of the data folder
+
+        facility:str
+        Name of the main facility (F1, F2 or F3)
+
+        use_110:bool
+        If True, the household level demand (location_and_demand_110.csv) is used,
+        otherwise the cluster level demand (waste_cluster.csv)
+
+        Return
+        ------
+        instance:dict
+        A dictionary with the label lists (fields, storages, households, J_0) and
+        the arrays f, q, fs_dist (J_0 x J_0), cs_dist (fields x storages) and
+        pivot_d (fields x households)
+    '''
+    demand_file, cs_file, fs_file, storage_file = _source_files(data_path, use_110)
+
+    if use_110:
+        d = read_households(data_path)[['cluster', 'household', 'demand']]
+    else:
+        d = pd.read_csv(demand_file, usecols=['cluster', 'household', 'demand'])
+    cs_dist = pd.read_excel(cs_file, header=[0], index_col=[0])
+    fs_distance = pd.read_excel(fs_file, header=[0,1], index_col=[0,1])
+    storage_info = pd.read_csv(storage_file)
+
+    storages = cs_dist.columns.tolist()
+    fields = cs_dist.index.tolist()
+    households = list(d.household)
+    J_0 = storages + [facility]
+
+    # storage to storage distances, plus the distances from/to the facility
+    fs_dist = np.empty((len(J_0), len(J_0)))
+    fs_dist[:-1, :-1] = fs_distance.loc[('storage',), 'storage'].loc[storages, storages].to_numpy()
+    fs_dist[:-1, -1] = fs_distance.loc[('storage',), ('facility', facility)].loc[storages].to_numpy()
+    fs_dist[-1, :-1] = fs_distance.loc[('facility', facility), 'storage'].loc[storages].to_numpy()
+    fs_dist[-1, -1] = np.inf
+
+    pivot_d = d.pivot(index='cluster', columns='household', values='demand')
+    pivot_d = pivot_d.reindex(index=fields, columns=households).fillna(0)
+
+    storage_info = storage_info.set_index('storage').loc[storages]
+
+    return {'fields': fields, 'storages': storages, 'households': households, 'J_0': J_0,
+            'f': storage_info['cost'].to_numpy(dtype=float),
+            'q': storage_info['capacity'].to_numpy(dtype=float),
+            'fs_dist': fs_dist,
+            'cs_dist': cs_dist.to_numpy(dtype=float),
+            'pivot_d': pivot_d.to_numpy(dtype=float)}
+
+def _bundle_is_valid(bundle:str, sources:list) -> bool:
+    '''
+        Support function to check if the sources of a bundle are unchanged:
+        a file is unchanged if it has the same mtime, or the same hash.
+        Stored mtimes are refreshed when only the mtime changed.
+    '''
+    meta_path = os.path.join(bundle, 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+
+    with open(meta_path) as file:
+        meta = json.load(file)
+
+    if meta.get('version') != BUNDLE_VERSION:
+        return False
+
+    updated = False
+    for path in sources:
+        stored = meta['sources'].get(os.path.basename(path))
+        if stored is None or not os.path.exists(path):
+            return False
+        if stored['mtime_ns'] == os.stat(path).st_mtime_ns:
+            continue
+        if stored['sha256'] != _file_hash(path):
+            return False
+        stored['mtime_ns'] = os.stat(path).st_mtime_ns
+        updated = True
+
+    if updated:
+        with open(meta_path, 'w') as file:
+            json.dump(meta, file)
+    return True
+
+def _save_bundle(bundle:str, instance:dict, sources:list) -> None:
+    os.makedirs(bundle, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(bundle, f'{name}.npy'), instance[name])
+
+    labels = {name: instance[name] for name in ['fields', 'storages', 'households', 'J_0']}
+    with open(os.path.join(bundle, 'labels.json'), 'w') as file:
+        json.dump(labels, file)
+
+    # meta.json is written last, a bundle without it is not valid
+    meta = {'version': BUNDLE_VERSION,
+            'sources': {os.path.basename(path): {'mtime_ns': os.stat(path).st_mtime_ns,
+                                                  'sha256': _file_hash(path)}
+                        for path in sources}}
+    with open(os.path.join(bundle, 'meta.json'), 'w') as file:
+        json.dump(meta, file)
+
+def load_bundle(data_path:str, facility:str, bundle_dir:str, use_110:bool=False, mmap_mode:str='r') -> dict:
+    '''
+        Return the LARP inputs for a given facility from a binary bundle
+        (NumPy arrays plus label lists). The bundle is assembled from the
+        data files only when it does not exist or the data files changed.
+
+        Arguments
+        ---------
+        data_path:str
+        Path of the data folder
+
+        facility:str
+        Name of the main facility (F1, F2 or F3)
+
+        bundle_dir:str
+        Path of the folder where the bundles are stored
+
+        use_110:bool
+        If True, the household level demand is used (see assemble_instance)
+
+        mmap_mode:str
+        Memory-map mode of the arrays ('r', 'c' or None to load them in memory)
+
+        Return
+        ------
+        instance:dict
+        Same dictionary of assemble_instance
+    '''
+    sources = _source_files(data_path, use_110)
+    bundle = os.path.join(bundle_dir, f'{facility}_{"110" if use_110 else "cluster"}')
+
+    if not _bundle_is_valid(bundle, sources):
+        _save_bundle(bundle, assemble_instance(data_path, facility, use_110), sources)
+
+    with open(os.path.join(bundle, 'labels.json')) as file:
+        instance = json.load(file)
+    for name in ARRAYS:
+        instance[name] = np.load(os.path.join(bundle, f'{name}.npy'), mmap_mode=mmap_mode)
+    return instance
+
+def load_instance(data_path:str, facility:str, bundle_dir:str=None, use_110:bool=False) -> tuple:
+    '''
+        Load the LARP inputs for a given facility, with the same output
+        of random_data. If bundle_dir is given, the binary bundle is
+        used (see load_bundle), otherwise the data files are parsed.
+
+        Arguments
+        ---------
+        data_path:str
+        Path of the data folder
+
+        facility:str
+        Name of the main facility (F1, F2 or F3)
+
+        bundle_dir:str
+        Path of the folder where the bundles are stored, optional
+
+        use_110:bool
+        If True, the household level demand is used (see assemble_instance)
+
+        Return
+        ------
+        tuple
+        Tuple with fields, storages, households, f, q, fs_dist, cs_dist, pivot_d
+    '''
+    if bundle_dir is None:
+        instance = assemble_instance(data_path, facility, use_110)
+    else:
+        instance = load_bundle(data_path, facility, bundle_dir, use_110)
+
+    fields, storages = instance['fields'], instance['storages']
+    households, J_0 = instance['households'], instance['J_0']
+
+    f = dict(zip(storages, instance['f'].tolist()))
+    q = dict(zip(storages, instance['q'].tolist()))
+    fs_dist = pd.DataFrame(instance['fs_dist'], columns=J_0, index=J_0)
+    cs_dist = pd.DataFrame(instance['cs_dist'], columns=storages, index=fields)
+    pivot_d = pd.DataFrame(instance['pivot_d'], columns=households, index=fields)
+
+    return fields, storages, households, f, q, fs_dist, cs_dist, pivot_d
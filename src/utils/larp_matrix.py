@@ -0,0 +1,242 @@
+import numpy as np
+from scipy import sparse
+
+from src.utils.strengthening import check_strengthening, identical_storages, min_open_storages
+
+
+def _arc_index(n_nodes:int) -> np.ndarray:
+    '''
+        Support function to map an arc (u,v), with u!=v, to its position
+        in the list of arcs; the list follows the same order of the Z
+        decision variable in LARP. Self-loops are mapped to -1.
+    '''
+    u, v = np.meshgrid(np.arange(n_nodes), np.arange(n_nodes), indexing='ij')
+    index = u*(n_nodes-1) + np.where(v < u, v, v-1)
+    index[u == v] = -1
+    return index
+
+
+class _RowsBuilder:
+    '''
+        Support class to collect the rows of the constraint matrix as
+        COO triplets, together with their lower and upper bounds.
+    '''
+
+    def __init__(self) -> None:
+        self.n_rows = 0
+        self.rows, self.cols, self.vals = list(), list(), list()
+        self.b_l, self.b_u = list(), list()
+
+    def add(self, cols:np.ndarray, vals:np.ndarray, b_l:np.ndarray, b_u:np.ndarray) -> None:
+        '''
+            Add a block of rows; cols and vals have shape (n_block_rows, n_terms),
+            b_l and b_u are broadcast to (n_block_rows,).
+        '''
+        cols = np.atleast_2d(cols)
+        vals = np.broadcast_to(vals, cols.shape)
+        n_block = cols.shape[0]
+
+        rows = np.repeat(np.arange(self.n_rows, self.n_rows+n_block), cols.shape[1])
+        self.rows.append(rows)
+        self.cols.append(cols.ravel())
+        self.vals.append(np.asarray(vals, dtype=float).ravel())
+        self.b_l.append(np.broadcast_to(np.asarray(b_l, dtype=float), (n_block,)))
+        self.b_u.append(np.broadcast_to(np.asarray(b_u, dtype=float), (n_block,)))
+        self.n_rows += n_block
+
+    def to_matrix(self, n_cols:int) -> tuple:
+        A = sparse.coo_matrix((np.concatenate(self.vals), (np.concatenate(self.rows), np.concatenate(self.cols))),
+                              shape=(self.n_rows, n_cols)).tocsr()
+        return A, np.concatenate(self.b_l), np.concatenate(self.b_u)
+
+
+def export_matrices(arrays:dict, k_vehicles:int, Q_vehicle_capacity:float, strengthening:list=None,
+                    forbidden:np.ndarray=None) -> dict:
+    '''
+        Export the LARP formulation as sparse matrices, in the form
+
+            min c^T x  s.t.  b_l <= A x <= b_u,  lb <= x <= ub,  x_i integer if integrality_i
+
+        The columns follow the same order used by the LARP class to declare
+        the decision variables (X, Y, Z, W_1, W_2, T) and the rows are the
+        same constraints of the LARP class, grouped by family; therefore, the
+        export has the same size of the Gurobi model, also with the optional
+        strengtheners (with degree, W_1 and W_2 have no columns).
+
+        Arguments
+        ---------
+        arrays:dict
+        LARP inputs as NumPy arrays (see LARP.get_arrays)
+
+        k_vehicles:int
+        Number of vehicles
+
+        Q_vehicle_capacity:float
+        Capacity of the vehicles
+
+        strengthening:list
+        Names of the strengtheners of the formulation (see STRENGTHENERS), optional
+
+        forbidden:np.ndarray
+        Boolean array (n_fields, m_storages) of the forbidden assignments,
+        their Y columns have upper bound 0, optional
+
+        Return
+        ------
+        matrices:dict
+        A dictionary with the following items:
+          - c, A, b_l, b_u, lb, ub, integrality: the MILP in matrix form
+          - slices: dictionary of variable name (X, Y, Z, W_1, W_2, T) and
+            its slice of columns
+          - n_fields, m_storages: size of the problem
+    '''
+    strengthening = check_strengthening(strengthening)
+    f, q = arrays['f'], arrays['q']
+    demand = arrays['demand']
+    cs_dist, fs_dist = arrays['cs_dist'], arrays['fs_dist']
+
+    n, m = cs_dist.shape
+    J = m+1 # storages and facility
+    F = m # index of the facility in J_0
+    n_arcs = J*(J-1)
+
+    # columns of the decision variables
+    n_aux = 0 if 'degree' in strengthening else n_arcs
+    sizes = {'X': J, 'Y': n*m, 'Z': n_arcs, 'W_1': n_aux, 'W_2': n_aux, 'T': m}
+    slices, start = dict(), 0
+    for name, size in sizes.items():
+        slices[name] = slice(start, start+size)
+        start += size
+    n_cols = start
+
+    X = np.arange(slices['X'].start, slices['X'].stop)
+    Y = np.arange(slices['Y'].start, slices['Y'].stop).reshape((n, m))
+    arc = _arc_index(J)
+    Z, W_1, W_2 = (slices[name].start + arc for name in ['Z', 'W_1', 'W_2'])
+    T = np.arange(slices['T'].start, slices['T'].stop)
+
+    arcs_u, arcs_v = np.nonzero(arc >= 0)
+    storages = np.arange(m)
+
+    # objective function
+    c = np.zeros(n_cols)
+    c[X[:m]] = f
+    c[Y] = cs_dist*demand[:, None]
+    c[Z[arcs_u, arcs_v]] = fs_dist[arcs_u, arcs_v]
+
+    rows = _RowsBuilder()
+
+    # all fields have to be assigned to exactly one storage
+    rows.add(Y, 1.0, 1.0, 1.0)
+
+    # (capacity constraint) sum_i d_i Y_ij - q_j X_j <= 0
+    cols = np.concatenate([Y.T, X[:m, None]], axis=1)
+    vals = np.concatenate([np.tile(demand, (m, 1)), -q[:, None]], axis=1)
+    rows.add(cols, vals, -np.inf, 0.0)
+
+    # (conservative constraints) k_vehicles leave and return to the facility
+    rows.add(Z[storages, F][None, :], 1.0, k_vehicles, k_vehicles)
+    rows.add(Z[F, storages][None, :], 1.0, k_vehicles, k_vehicles)
+
+    others = np.array([[u for u in range(J) if u != v] for v in storages])
+    vals = np.concatenate([np.ones(others.shape), -np.ones((m, 1))], axis=1)
+    Z_uv = Z[arcs_u, arcs_v]
+
+    if 'degree' in strengthening:
+        # (degree constraints) one arc enters and one leaves each open storage
+        for v in storages:
+            rows.add(np.append(Z[others[v], v], X[v])[None, :], vals[v], 0.0, 0.0)
+            rows.add(np.append(Z[v, others[v]], X[v])[None, :], vals[v], 0.0, 0.0)
+
+    else:
+        # linearization of W_1 = X_u*Z_uv
+        cols = np.concatenate([W_1[others, storages[:, None]], X[storages, None]], axis=1)
+        rows.add(cols, vals, 0.0, 0.0)
+
+        W, X_u = W_1[arcs_u, arcs_v], X[arcs_u]
+        rows.add(np.stack([W, X_u], axis=1), [1.0, -1.0], -np.inf, 0.0)
+        rows.add(np.stack([W, X_u, Z_uv], axis=1), [1.0, -1.0, -1.0], -1.0, np.inf)
+        rows.add(np.stack([W, Z_uv], axis=1), [1.0, -1.0], -np.inf, 0.0)
+
+        # linearization of W_2 = X_v*Z_uv
+        cols = np.concatenate([W_2[storages[:, None], others], X[storages, None]], axis=1)
+        rows.add(cols, vals, 0.0, 0.0)
+
+        W, X_v = W_2[arcs_u, arcs_v], X[arcs_v]
+        rows.add(np.stack([W, X_v], axis=1), [1.0, -1.0], -np.inf, 0.0)
+        rows.add(np.stack([W, X_v, Z_uv], axis=1), [1.0, -1.0, -1.0], -1.0, np.inf)
+        rows.add(np.stack([W, Z_uv], axis=1), [1.0, -1.0], -np.inf, 0.0)
+
+    # subtour elimination constraints
+    rows.add(T[:, None], 1.0, 0.0, np.inf)
+    for u in storages:
+        vs = storages[storages != u]
+        cols = np.concatenate([np.stack([np.full(len(vs), T[u]), T[vs], Z[u, vs]], axis=1), Y[:, vs].T], axis=1)
+        vals = np.concatenate([np.tile([1.0, -1.0, Q_vehicle_capacity], (len(vs), 1)),
+                               np.tile(demand/k_vehicles, (len(vs), 1))], axis=1)
+        rows.add(cols, vals, -np.inf, Q_vehicle_capacity)
+
+        rows.add(np.array([[T[u]]]), 1.0, -np.inf, Q_vehicle_capacity)
+        rows.add(np.concatenate([Y[:, u], [T[u]]])[None, :],
+                 np.concatenate([demand/k_vehicles, [-1.0]]), -np.inf, 0.0)
+
+    lb = np.zeros(n_cols)
+
+    # (strengthening) symmetry breaking and rounded capacity constraints
+    if 'symmetry' in strengthening:
+        lb[X[F]] = 1.0 if demand.sum() > 0 else 0.0
+        for group in identical_storages(arrays):
+            pairs = np.stack([X[group[:-1]], X[group[1:]]], axis=1)
+            rows.add(pairs, [1.0, -1.0], 0.0, np.inf)
+
+    if 'rounded_capacity' in strengthening:
+        rows.add(X[:m][None, :], 1.0, min_open_storages(arrays, k_vehicles), np.inf)
+        rows.add(np.stack([Y.ravel(), np.tile(X[:m], n)], axis=1), [1.0, -1.0], -np.inf, 0.0)
+
+    # NOTE: Totally Unimodularity constraint, see LARP
+    if 'drop_redundant' not in strengthening:
+        rows.add(Y.reshape((-1, 1)), 1.0, 0.0, np.inf)
+
+    A, b_l, b_u = rows.to_matrix(n_cols)
+
+    ub = np.ones(n_cols)
+    ub[slices['T']] = np.inf
+    if forbidden is not None:
+        ub[Y[forbidden]] = 0.0
+    integrality = np.ones(n_cols, dtype=np.uint8)
+
+    return {'c': c, 'A': A, 'b_l': b_l, 'b_u': b_u,
+            'lb': lb, 'ub': ub, 'integrality': integrality,
+            'slices': slices, 'n_fields': n, 'm_storages': m}
+
+def decode_solution(matrices:dict, x:np.ndarray) -> tuple:
+    '''
+        Extract the LARP decision variables from a solution vector of
+        the exported matrices.
+
+        Arguments
+        ---------
+        matrices:dict
+        Exported LARP model (see export_matrices)
+
+        x:np.ndarray
+        Solution vector
+
+        Return
+        ------
+        tuple
+        Tuple of X (m_storages,), Y (n_fields, m_storages) and
+        Z (m_storages+1, m_storages+1) solution arrays, as LARP.get_solutions
+    '''
+    slices = matrices['slices']
+    n, m = matrices['n_fields'], matrices['m_storages']
+    J = m+1
+
+    X_sol = np.rint(x[slices['X']][:m])
+    Y_sol = np.rint(x[slices['Y']]).reshape((n, m))
+
+    Z_sol = np.zeros((J, J))
+    arcs_u, arcs_v = np.nonzero(_arc_index(J) >= 0)
+    Z_sol[arcs_u, arcs_v] = np.rint(x[slices['Z']])
+
+    return X_sol, Y_sol, Z_sol
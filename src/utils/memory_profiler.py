@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+def current_rss() -> int:
+    '''
+        Return the resident set size (bytes) of the process,
+        None if it cannot be measured.
+    '''
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    return None
+
+def process_peak_rss() -> int:
+    '''
+        Return the peak resident set size (bytes) of the process
+        since its start, None if it cannot be measured.
+    '''
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss*1024 # kB on Linux
+    if psutil is not None and hasattr(psutil.Process().memory_info(), 'peak_wset'):
+        return psutil.Process().memory_info().peak_wset
+    return None
+
+
+class _RSSSampler:
+
+    def __init__(self, interval:float) -> None:
+        '''
+            Support class to sample the resident set size of the process
+            in a background thread, keeping the maximum; the thread runs
+            also while Gurobi (which releases the GIL) is optimizing.
+        '''
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self.peak is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, current_rss())
+
+
+class MemoryProfiler:
+
+    def __init__(self, interval:float=0.01) -> None:
+        '''
+            The MemoryProfiler class measures the memory used by the phases
+            of a run (e.g. the build phases of the LARP model or the phases
+            of the WFA). For each phase it reports:
+              - alloc_delta: Python memory allocated and still alive at the
+                end of the phase (tracemalloc), bytes;
+              - alloc_peak: peak of the Python memory allocated during the
+                phase, bytes;
+              - rss_delta: change of the resident set size of the process,
+                it includes the memory allocated by Gurobi, bytes;
+              - rss_peak: peak of the resident set size during the phase,
+                above the one at its start (sampled every interval
+                seconds), bytes;
+              - process_peak_rss: peak resident set size of the process
+                since its start, at the end of the phase (not a per-phase
+                value), bytes;
+              - calls: number of times the phase was executed; deltas are
+                summed and peaks are the maximum over the executions.
+
+            Sizes of containers (e.g. the WFA bookkeeping lists) can be
+            recorded with record_size. Phases must not be nested.
+            tracemalloc slows down the Python code, so the profiler
+            is opt-in.
+
+            Arguments
+            ---------
+            interval:float
+            Seconds between two samples of the resident set size
+        '''
+        self.interval = interval
+        self.phases = dict()
+        self.sizes = dict()
+
+    @contextmanager
+    def phase(self, name:str):
+        '''
+            Context manager to measure the memory used by a phase.
+
+            Arguments
+            ---------
+            name:str
+            Name of the phase
+        '''
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+
+        tracemalloc.reset_peak()
+        alloc_before, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss()
+        sampler = _RSSSampler(self.interval)
+        try:
+            with sampler:
+                yield
+        finally:
+            alloc_after, alloc_peak = tracemalloc.get_traced_memory()
+            rss_after = current_rss()
+            if started:
+                tracemalloc.stop()
+
+            stats = self.phases.setdefault(name, {'alloc_delta': 0, 'alloc_peak': 0, 'rss_delta': None,
+                                                  'rss_peak': None, 'process_peak_rss': None, 'calls': 0})
+            stats['alloc_delta'] += alloc_after-alloc_before
+            stats['alloc_peak'] = max(stats['alloc_peak'], alloc_peak-alloc_before)
+            if rss_before is not None:
+                stats['rss_delta'] = (stats['rss_delta'] or 0) + rss_after-rss_before
+                stats['rss_peak'] = max(stats['rss_peak'] or 0, sampler.peak-rss_before)
+            process_peak = process_peak_rss()
+            if process_peak is not None:
+                stats['process_peak_rss'] = max(stats['process_peak_rss'] or 0, process_peak)
+            stats['calls'] += 1
+
+    def record_size(self, name:str, container) -> None:
+        '''
+            Record the number of items of a container, the maximum
+            over the calls is kept.
+
+            Arguments
+            ---------
+            name:str
+            Name of the container
+
+            container:list, dict or set
+            The container
+        '''
+        self.sizes[name] = max(self.sizes.get(name, 0), len(container))
+
+    def report(self) -> dict:
+        '''
+            Return the report of the profiler, a dictionary with the
+            phases (see MemoryProfiler) and the recorded sizes.
+        '''
+        return {'phases': {name: dict(stats) for name, stats in self.phases.items()},
+                'sizes': dict(self.sizes)}
+
+    def __str__(self) -> str:
+        lines = list()
+        for name, stats in self.phases.items():
+            values = ' '.join(f'{key}: {value/2**20:.2f} MiB' if key != 'calls' and value is not None
+                              else f'{key}: {value}' for key, value in stats.items())
+            lines.append(f'{name} | {values}')
+        lines.extend(f'{name} | size: {size}' for name, size in self.sizes.items())
+        return '\n'.join(lines)
@@ -0,0 +1,144 @@
+import os
+import shutil
+import hashlib
+
+import numpy as np
+
+
+class ModelCache:
+
+    def __init__(self, cache_dir:str, max_entries:int=16) -> None:
+        '''
+            The ModelCache class is an on-disk cache of built LARP models.
+            Each entry is a folder named after the hash of the LARP inputs,
+            containing the model (larp_model.mps) and, once optimized, the
+            last solution found (solution.sol); the same layout of the
+            backup folder.
+
+            When more than max_entries models are stored, the least recently
+            used entries are removed.
+
+            Arguments
+            ---------
+            cache_dir:str
+            Path of the folder where the models are stored
+
+            max_entries:int
+            Integer number of maximum models stored in the cache
+        '''
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __contains__(self, key:str) -> bool:
+        return os.path.exists(self.model_path(key))
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    @staticmethod
+    def hash_inputs(*inputs) -> str:
+        '''
+            Compute a content hash of the given inputs; NumPy arrays are
+            hashed with their shape and dtype, any other object with its
+            string representation.
+
+            Arguments
+            ---------
+            inputs
+            Sequence of NumPy arrays, numbers, strings or lists
+
+            Return
+            ------
+            str
+            Hexadecimal digest of the inputs
+        '''
+        sha = hashlib.sha256()
+        for item in inputs:
+            if isinstance(item, np.ndarray):
+                item = np.ascontiguousarray(item)
+                sha.update(str((item.shape, item.dtype.str)).encode())
+                sha.update(item.tobytes())
+            else:
+                sha.update(repr(item).encode())
+            sha.update(b'|')
+        return sha.hexdigest()
+
+    def entry_path(self, key:str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def model_path(self, key:str) -> str:
+        return os.path.join(self.entry_path(key), 'larp_model.mps')
+
+    def solution_path(self, key:str) -> str:
+        return os.path.join(self.entry_path(key), 'solution.sol')
+
+    def has_solution(self, key:str) -> bool:
+        return os.path.exists(self.solution_path(key))
+
+    def touch(self, key:str) -> None:
+        '''
+            Mark the entry as recently used.
+        '''
+        os.utime(self.entry_path(key))
+
+    def store_model(self, key:str, model) -> None:
+        '''
+            Write the model in the cache and evict the least recently
+            used entries, if needed.
+
+            Arguments
+            ---------
+            key:str
+            Hash of the LARP inputs
+
+            model:gp.Model
+            Gurobi model to store
+
+            Return
+            ------
+            None
+        '''
+        os.makedirs(self.entry_path(key), exist_ok=True)
+        self._write(model, self.model_path(key))
+        self._evict()
+
+    def store_solution(self, key:str, model) -> None:
+        '''
+            Write the current solution of the model in the cache,
+            nothing is done if the model has no solution.
+
+            Arguments
+            ---------
+            key:str
+            Hash of the LARP inputs
+
+            model:gp.Model
+            Gurobi model with (at least) one solution
+
+            Return
+            ------
+            None
+        '''
+        if key in self and model.SolCount > 0:
+            self._write(model, self.solution_path(key))
+
+    def _write(self, model, path:str) -> None:
+        # write in a temporary file first, so that an interrupted
+        # process does not leave a partial model in the cache
+        root, ext = os.path.splitext(path)
+        tmp_path = f'{root}.{os.getpid()}.tmp{ext}'
+        model.write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _entries(self) -> list:
+        return [key for key in os.listdir(self.cache_dir) if key in self]
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort(key=lambda key: os.path.getmtime(self.entry_path(key)))
+        for key in entries[:len(entries)-self.max_entries]:
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
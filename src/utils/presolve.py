@@ -0,0 +1,172 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+from src.utils.utils_waterflow.dow import DOW
+
+
+class Reduction:
+
+    def __init__(self, inputs:tuple, kept:list, removed:dict, forbidden:list, infeasible_fields:list) -> None:
+        '''
+            The Reduction class is the result of the presolve of the LARP
+            inputs (see presolve): the reduced inputs, the reductions and the
+            mapping of the solutions of the reduced problem to the original one.
+
+            Arguments
+            ---------
+            inputs:tuple
+            LARP inputs (fields, storages, households, f, q, fs_dist, cs_dist, pivot_d)
+
+            kept:list
+            Indexes of the kept storages in the original storages
+
+            removed:dict
+            Dictionary of removed storage labels and reason
+
+            forbidden:list
+            List of (field, storage) labels that cannot be assigned, among the
+            kept storages (see the forbidden argument of LARP)
+
+            infeasible_fields:list
+            List of field labels that cannot be assigned to any storage
+        '''
+        self.original = inputs
+        self.kept = kept
+        self.removed = removed
+        self.forbidden = forbidden
+        self.infeasible_fields = infeasible_fields
+
+        fields, storages, households, f, q, fs_dist, cs_dist, pivot_d = inputs
+        kept_storages = [storages[j] for j in kept]
+        J_0 = kept_storages + [label for label in fs_dist.index if label not in storages]
+        self.inputs = (fields, kept_storages, households,
+                       {j: f[j] for j in kept_storages}, {j: q[j] for j in kept_storages},
+                       fs_dist.loc[J_0, J_0], cs_dist.loc[:, kept_storages], pivot_d)
+
+    def report(self) -> dict:
+        '''
+            Return the size of the reductions as a dictionary.
+        '''
+        storages = self.original[1]
+        return {'storages': len(storages),
+                'removed_storages': len(self.removed),
+                'reasons': dict(Counter(self.removed.values())),
+                'forbidden_assignments': len(self.forbidden),
+                'removed_assignments': len(self.removed)*len(self.original[0]),
+                'removed_arcs': len(storages)*(len(storages)+1) - len(self.kept)*(len(self.kept)+1),
+                'infeasible_fields': len(self.infeasible_fields)}
+
+    def map_solution(self, X_sol:np.ndarray, Y_sol:np.ndarray, Z_sol:np.ndarray) -> tuple:
+        '''
+            Map the solution of the reduced problem (see LARP.get_solutions,
+            X_sol, Y_sol and Z_sol) to the original storages, removed
+            storages are closed.
+
+            Return
+            ------
+            tuple
+            X, Y and Z solution of the original problem with a matrix shape
+        '''
+        m = len(self.original[1])
+        J_0 = np.append(self.kept, m) # facility as last row/column
+
+        X = np.zeros(m)
+        X[self.kept] = X_sol
+        Y = np.zeros((len(Y_sol), m))
+        Y[:, self.kept] = Y_sol
+        Z = np.zeros((m+1, m+1))
+        Z[np.ix_(J_0, J_0)] = Z_sol
+        return X, Y, Z
+
+    def map_dow(self, dow:DOW) -> DOW:
+        '''
+            Map a dow of the reduced problem to the original storages.
+        '''
+        m = len(self.original[1])
+        labels = np.append(0, np.asarray(self.kept)+1) # reduced label (from 1) to original label
+        X = np.zeros(m, dtype=int)
+        X[self.kept] = dow.X
+        return DOW(m, dow.n_fields, dow.k_vehicles, X, labels[dow.Y], labels[dow.Z],
+                   obj_value=dow.obj_value)
+
+
+def _dominates(a:int, b:int, f:np.ndarray, q:np.ndarray, cs_dist:np.ndarray, fs_dist:np.ndarray) -> bool:
+    # storage a is not worse than storage b in cost, capacity and distances
+    # (fields, storages and facility, excluding the arcs between a and b)
+    others = np.ones(len(fs_dist), dtype=bool)
+    others[[a, b]] = False
+    return bool(f[a] <= f[b] and q[a] >= q[b] and (cs_dist[:, a] <= cs_dist[:, b]).all() and
+                (fs_dist[a, others] <= fs_dist[b, others]).all() and
+                (fs_dist[others, a] <= fs_dist[others, b]).all())
+
+def presolve(k_vehicles:int, Q_vehicle_capacity:float, fields:list, storages:list, households:list,
+             f:dict, q:dict, fs_dist:pd.DataFrame, cs_dist:pd.DataFrame, pivot_d:pd.DataFrame,
+             remove_storages:bool=False) -> Reduction:
+    '''
+        Presolve of the LARP inputs, before the decision variables are created:
+          - assignments (field, storage) are forbidden if the demand of the
+            field exceeds the capacity of the storage (q) or the capacity of
+            the vehicles (each storage loads demand/k_vehicles);
+          - if remove_storages is True, storages without any allowed field
+            ('no_fields') and storages dominated by another storage, i.e. with
+            higher cost, lower capacity and longer distances to the fields,
+            the storages and the facility ('dominated'), are removed together
+            with their assignments and arcs.
+
+        Forbidding assignments does not change the optimal solutions. Removing
+        storages is a heuristic reduction: the LARP model allows open storages
+        without fields (e.g. to use all the vehicles) and a dominated storage
+        may be needed together with the one dominating it.
+
+        Arguments
+        ---------
+        k_vehicles:int
+        Number of vehicles
+
+        Q_vehicle_capacity:float
+        Capacity of the vehicles
+
+        fields, storages, households, f, q, fs_dist, cs_dist, pivot_d
+        LARP inputs (see LARP)
+
+        remove_storages:bool
+        If True, storages without allowed fields and dominated storages are removed
+
+        Return
+        ------
+        reduction:Reduction
+        Reduced inputs, reductions and mapping to the original problem
+    '''
+    J_0 = storages + [label for label in fs_dist.index if label not in storages]
+    f_arr = np.array([f[j] for j in storages], dtype=float)
+    q_arr = np.array([q[j] for j in storages], dtype=float)
+    demand = pivot_d.loc[fields, households].to_numpy(dtype=float).sum(axis=1)
+    cs_arr = cs_dist.loc[fields, storages].to_numpy(dtype=float)
+    fs_arr = fs_dist.loc[J_0, J_0].to_numpy(dtype=float)
+
+    allowed = (demand[:, np.newaxis] <= q_arr[np.newaxis, :]) & \
+              (demand[:, np.newaxis]/k_vehicles <= Q_vehicle_capacity)
+
+    removed = dict()
+    if remove_storages:
+        for j in np.nonzero(~allowed.any(axis=0))[0]:
+            removed[storages[j]] = 'no_fields'
+        for j in range(len(storages)):
+            if storages[j] in removed:
+                continue
+            for h in range(len(storages)):
+                if h == j or storages[h] in removed or not _dominates(h, j, f_arr, q_arr, cs_arr, fs_arr):
+                    continue
+                # identical storages dominate each other, the first one is kept
+                if h < j or not _dominates(j, h, f_arr, q_arr, cs_arr, fs_arr):
+                    removed[storages[j]] = 'dominated'
+                    break
+
+    kept = [j for j in range(len(storages)) if storages[j] not in removed]
+    rows, cols = np.nonzero(~allowed[:, kept])
+    forbidden = [(fields[i], storages[kept[j]]) for i, j in zip(rows, cols)]
+    infeasible_fields = [fields[i] for i in np.nonzero(~allowed[:, kept].any(axis=1))[0]]
+
+    inputs = (fields, storages, households, f, q, fs_dist, cs_dist, pivot_d)
+    return Reduction(inputs, kept, removed, forbidden, infeasible_fields)
@@ -0,0 +1,186 @@
+import os
+import json
+from timeit import default_timer as timer
+
+from src.larp import LARP
+from src.waterflow import waterflow
+from src.utils.env_pool import get_pool
+from src.utils.get_data import random_data
+from src.utils.instance_loader import load_instance
+
+
+# parameters of the WFA (see wfa_waste_management notebook)
+WFA_PARAMS = {'max_cloud': 3, 'max_pop': 10, 'max_UIE': 5, 'min_ero': 2}
+
+# seeded instance corpus: random instances (random_data) and the real data
+# of the LARP notebook; the real instance is way slower for the WFA (minutes,
+# hundreds of thousands of solver calls), so it uses fewer dows
+CORPUS = [{'name': f'random_f_{n_f}_s_{m_s}_k_{k_v}_seed_{seed}', 'source': 'random',
+           'fields': n_f, 'storages': m_s, 'vehicles': k_v, 'capacity': 100, 'seed': seed}
+          for n_f, m_s, k_v in [(4, 4, 2), (5, 5, 2)] for seed in [0, 1]] + \
+         [{'name': f'data_{facility}', 'source': 'data', 'facility': facility,
+           'vehicles': 3, 'capacity': 10, 'seed': 0,
+           'wfa': {'max_cloud': 1, 'max_pop': 3, 'max_UIE': 2, 'min_ero': 2}} for facility in ['F3']]
+
+# (relative, absolute) tolerance of each metric; a metric is a regression
+# if new > baseline*(1+relative) + absolute (the lower the better)
+TOLERANCES = {'exact_build_time': (0.5, 0.05), 'exact_solve_time': (0.5, 0.05),
+              'wfa_build_time': (0.5, 0.05), 'wfa_solve_time': (0.5, 0.5),
+              'wfa_solver_calls': (0.1, 0), 'wfa_objval': (0, 1e-6), 'gap': (0, 1e-6)}
+
+# metrics that must not change at all
+EXACT = {'exact_objval': 1e-6}
+
+
+def load_corpus_instance(spec:dict, data_path:str) -> tuple:
+    '''
+        Return the LARP inputs of an instance of the corpus.
+
+        Arguments
+        ---------
+        spec:dict
+        Instance of the corpus (see CORPUS)
+
+        data_path:str
+        Path of the data folder
+
+        Return
+        ------
+        facility:str
+        Name of the main facility
+
+        tuple
+        Tuple with fields, storages, households, f, q, fs_dist, cs_dist, pivot_d
+    '''
+    if spec['source'] == 'random':
+        return 'F', random_data(spec['fields'], spec['storages'], seed=spec['seed'])
+    return spec['facility'], load_instance(data_path, spec['facility'])
+
+def _new_larp(spec:dict, facility:str, inputs:tuple, env) -> LARP:
+    larp = LARP(facility, spec['vehicles'], spec['capacity'], *inputs, env)
+    larp.model.setParam('OutputFlag', 0)
+    return larp
+
+def run_instance(spec:dict, data_path:str, wfa_params:dict=WFA_PARAMS) -> dict:
+    '''
+        Solve an instance of the corpus with the exact LARP model and with
+        the WFA (seeded with the instance seed), and record build time, solve
+        time, number of solver calls, objective value of both and optimality
+        gap of the WFA solution.
+
+        Arguments
+        ---------
+        spec:dict
+        Instance of the corpus (see CORPUS)
+
+        data_path:str
+        Path of the data folder
+
+        wfa_params:dict
+        Parameters of the WFA, updated by the ones of the instance
+
+        Return
+        ------
+        record:dict
+        Dictionary of the metrics of the instance
+    '''
+    facility, inputs = load_corpus_instance(spec, data_path)
+    record = {'name': spec['name']}
+
+    with get_pool().env() as env:
+        larp = _new_larp(spec, facility, inputs, env)
+        start = timer()
+        larp.build()
+        record['exact_build_time'] = timer()-start
+
+        start = timer()
+        larp.optimize()
+        record['exact_solve_time'] = timer()-start
+        record['exact_solver_calls'] = larp.solver_calls
+        record['exact_objval'] = larp.model.ObjVal if larp.model.SolCount > 0 else None
+        larp.dispose()
+
+        # NOTE: as in the WFA notebook, gurobi stops at the very first feasible solution
+        larp = _new_larp(spec, facility, inputs, env)
+        larp.model.setParam('SolutionLimit', 1)
+        start = timer()
+        larp.build()
+        record['wfa_build_time'] = timer()-start
+
+        start = timer()
+        dow = waterflow(larp, **{**wfa_params, **spec.get('wfa', dict())}, seed=spec['seed'])
+        record['wfa_solve_time'] = timer()-start
+        record['wfa_solver_calls'] = larp.solver_calls
+        record['wfa_objval'] = None if dow is None else dow.obj_value
+        larp.dispose()
+
+    exact, wfa = record['exact_objval'], record['wfa_objval']
+    record['gap'] = None if exact is None or wfa is None else (wfa-exact)/abs(exact) if exact else 0.0
+    return record
+
+def run_suite(data_path:str, corpus:list=CORPUS, wfa_params:dict=WFA_PARAMS, verbose:bool=True) -> dict:
+    '''
+        Run the regression suite on all the instances of the corpus.
+
+        Return
+        ------
+        results:dict
+        Dictionary of instance name and metrics (see run_instance)
+    '''
+    results = dict()
+    for spec in corpus:
+        results[spec['name']] = run_instance(spec, data_path, wfa_params)
+        if verbose:
+            print(' '.join(f'{name}: {value}' for name, value in results[spec['name']].items()))
+    return results
+
+def compare(results:dict, baseline:dict, tolerances:dict=TOLERANCES) -> list:
+    '''
+        Compare the results of the suite with a baseline, returning the
+        list of regressions: metrics worse than the baseline beyond their
+        tolerance, changed exact objective values and solutions lost
+        (e.g. WFA finding no solution where the baseline found one).
+
+        Arguments
+        ---------
+        results:dict
+        Results of the suite (see run_suite)
+
+        baseline:dict
+        Baseline results, same format of results
+
+        tolerances:dict
+        Dictionary of metric and (relative, absolute) tolerance
+
+        Return
+        ------
+        regressions:list
+        List of dictionaries with instance name, metric, baseline and new values
+    '''
+    regressions = list()
+    for name, record in results.items():
+        if name not in baseline:
+            continue
+        old_record = baseline[name]
+
+        checks = [(metric, lambda new, old, rel=rel, abs_=abs_: new > old*(1+rel) + abs_)
+                  for metric, (rel, abs_) in tolerances.items()]
+        checks += [(metric, lambda new, old, tol=tol: abs(new-old) > tol) for metric, tol in EXACT.items()]
+
+        for metric, is_worse in checks:
+            new, old = record.get(metric), old_record.get(metric)
+            if old is None:
+                continue
+            if new is None or is_worse(new, old):
+                regressions.append({'name': name, 'metric': metric, 'baseline': old, 'new': new})
+    return regressions
+
+def load_baseline(path:str) -> dict:
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as file:
+        return json.load(file)
+
+def save_baseline(path:str, results:dict) -> None:
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=1)
@@ -0,0 +1,299 @@
+import io
+import os
+import json
+import time
+import zlib
+import pickle
+import sqlite3
+from urllib.request import pathname2url
+
+import numpy as np
+import pandas as pd
+
+
+# columns of the runs table, with their SQL type
+RUN_COLUMNS = {'mode': 'TEXT', 'fields': 'INTEGER', 'storages': 'INTEGER', 'vehicles': 'INTEGER',
+               'capacity': 'REAL', 'iter': 'INTEGER', 'kind': 'TEXT', 'seed': 'INTEGER',
+               'status': 'TEXT', 'objval': 'REAL', 'wfa_objval': 'REAL',
+               'build_time': 'REAL', 'opt_time': 'REAL', 'error': 'TEXT', 'memory': 'TEXT',
+               'strengthening': 'TEXT'}
+
+# columns identifying a run (same of benchmark.KEY)
+RUN_KEY = ('mode', 'fields', 'storages', 'vehicles', 'capacity', 'iter', 'strengthening')
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {sql_type}' for name, sql_type in RUN_COLUMNS.items())},
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    instance TEXT NOT NULL,
+    name TEXT NOT NULL,
+    format TEXT NOT NULL,
+    labels TEXT,
+    data BLOB NOT NULL,
+    created REAL
+);
+CREATE INDEX IF NOT EXISTS artifacts_key ON artifacts (instance, name);
+'''
+
+# index of the run key, created once the columns of an older database are added
+RUNS_INDEX = f'CREATE INDEX IF NOT EXISTS runs_key ON runs ({", ".join(RUN_KEY)})'
+
+
+def _encode_array(array:np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return zlib.compress(buffer.getvalue())
+
+def _decode_array(data:bytes) -> np.ndarray:
+    return np.load(io.BytesIO(zlib.decompress(data)), allow_pickle=False)
+
+
+class ResultsStore:
+
+    def __init__(self, path:str, read_only:bool=False) -> None:
+        '''
+            The ResultsStore class is an embedded (SQLite) store of the
+            results of the analysis:
+              - runs: one row per benchmark run (see RUN_COLUMNS), inserted
+                in append mode and indexed by the run key (see RUN_KEY);
+              - artifacts: solution pieces of an instance (arrays and dataframes
+                stored as zlib compressed .npy blobs, small objects as JSON),
+                indexed by instance and name; the last stored version is returned.
+
+            A read-only store (e.g. to plot the results) never changes the
+            database file: the schema of an older database is not migrated,
+            its missing columns are returned as empty values.
+
+            A writable store migrates the schema and uses the WAL journal
+            while it is open (readers are not blocked by the writer); the
+            rollback journal is restored when it is closed, so that the
+            database is a single file at rest.
+
+            Arguments
+            ---------
+            path:str
+            Path of the SQLite database, created if it does not exist (unless read_only)
+
+            read_only:bool
+            If True, the database is opened in read-only mode
+        '''
+        self.path = path
+        self.read_only = read_only
+
+        if read_only:
+            self._conn = sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?mode=ro', uri=True)
+            return
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._conn.execute(RUNS_INDEX)
+        self._conn.commit()
+
+    def _add_missing_columns(self) -> None:
+        '''
+            Support function to add the RUN_COLUMNS missing in a
+            database created by an older version of the store.
+        '''
+        existing = self._existing_columns()
+        for name, sql_type in RUN_COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f'ALTER TABLE runs ADD COLUMN {name} {sql_type}')
+
+    def _existing_columns(self) -> set:
+        return {row[1] for row in self._conn.execute('PRAGMA table_info(runs)')}
+
+    def _select(self, name:str, existing:set) -> str:
+        # columns missing in an older (read-only) database are empty
+        return name if name in existing else f'NULL AS {name}'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self.read_only:
+            try:
+                self._conn.execute('PRAGMA journal_mode=DELETE') # checkpoint and remove the WAL files
+            except sqlite3.OperationalError:
+                pass # another connection is still open, it restores the journal
+        self._conn.close()
+
+    def append(self, row:dict) -> None:
+        '''
+            Insert a run in the store; unknown items of the row are ignored.
+
+            Arguments
+            ---------
+            row:dict
+            Dictionary with (a subset of) the RUN_COLUMNS items
+
+            Return
+            ------
+            None
+        '''
+        self.append_many([row])
+
+    def append_many(self, rows:list) -> None:
+        '''
+            Insert several runs in the store, within a single transaction.
+        '''
+        columns = list(RUN_COLUMNS)
+        sql = f'INSERT INTO runs ({", ".join(columns)}, created) VALUES ({", ".join("?"*(len(columns)+1))})'
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(sql, [[self._value(row.get(name)) for name in columns] + [now]
+                                         for row in rows])
+
+    @staticmethod
+    def _value(value):
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value == '':
+            return None
+        return value.item() if isinstance(value, np.generic) else value
+
+    def keys(self) -> list:
+        '''
+            Return the keys of the stored runs, as dictionaries of the
+            RUN_KEY items and of the status (see benchmark.cell_key).
+        '''
+        existing = self._existing_columns()
+        columns = RUN_KEY + ('status',)
+        cursor = self._conn.execute(f'SELECT DISTINCT {", ".join(self._select(name, existing) for name in columns)} FROM runs')
+        return [dict(zip(columns, key)) for key in cursor]
+
+    def query(self, columns:list=None, **where) -> pd.DataFrame:
+        '''
+            Return the runs matching the given conditions, e.g.
+            store.query(mode='larp', fields=100); a list of values
+            matches any of them. Only the matching rows are read.
+
+            Arguments
+            ---------
+            columns:list
+            Columns to return, all the RUN_COLUMNS if None
+
+            where:dict
+            Conditions on the RUN_COLUMNS
+
+            Return
+            ------
+            pd.DataFrame
+            Dataframe of the matching runs, in insertion order
+        '''
+        columns = list(RUN_COLUMNS) if columns is None else columns
+        for name in list(columns) + list(where):
+            if name not in RUN_COLUMNS and name not in ('id', 'created'):
+                raise KeyError(f'unknown column: {name}')
+
+        existing = self._existing_columns() | {'id', 'created'}
+        conditions, params = list(), list()
+        for name, value in where.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            conditions.append(f'{name if name in existing else "NULL"} IN ({", ".join("?"*len(values))})')
+            params.extend(self._value(v) for v in values)
+
+        sql = f'SELECT {", ".join(self._select(name, existing) for name in columns)} FROM runs'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return pd.read_sql_query(sql + ' ORDER BY id', self._conn, params=params)
+
+    def put(self, instance:str, name:str, value) -> None:
+        '''
+            Store a solution piece of an instance: NumPy arrays and dataframes
+            are stored as compressed blobs, other objects (lists, dictionaries)
+            as JSON.
+
+            Arguments
+            ---------
+            instance:str
+            Name of the instance, e.g. F1_f_7_s_6
+
+            name:str
+            Name of the solution piece, e.g. Y_sol
+
+            value:np.ndarray, pd.DataFrame or JSON serializable object
+            The solution piece
+
+            Return
+            ------
+            None
+        '''
+        labels = None
+        if isinstance(value, pd.DataFrame):
+            fmt, labels = 'frame', json.dumps([value.index.tolist(), value.columns.tolist()])
+            data = _encode_array(value.to_numpy())
+        elif isinstance(value, np.ndarray):
+            fmt, data = 'array', _encode_array(value)
+        else:
+            fmt, data = 'json', zlib.compress(json.dumps(value).encode())
+
+        with self._conn:
+            self._conn.execute('INSERT INTO artifacts (instance, name, format, labels, data, created) '
+                               'VALUES (?, ?, ?, ?, ?, ?)', (instance, name, fmt, labels, data, time.time()))
+
+    def get(self, instance:str, name:str):
+        '''
+            Return the last stored version of a solution piece of an
+            instance (see put); raise a KeyError if it does not exist.
+        '''
+        row = self._conn.execute('SELECT format, labels, data FROM artifacts WHERE instance = ? AND name = ? '
+                                 'ORDER BY id DESC LIMIT 1', (instance, name)).fetchone()
+        if row is None:
+            raise KeyError(f'{instance}/{name}')
+
+        fmt, labels, data = row
+        if fmt == 'json':
+            return json.loads(zlib.decompress(data))
+
+        array = _decode_array(data)
+        if fmt == 'frame':
+            index, columns = json.loads(labels)
+            return pd.DataFrame(array, index=index, columns=columns)
+        return array
+
+    def artifacts(self, instance:str=None) -> pd.DataFrame:
+        '''
+            Return the list of the stored solution pieces (without data),
+            optionally of a single instance.
+        '''
+        sql = 'SELECT instance, name, format, length(data) AS size, created FROM artifacts'
+        params = list()
+        if instance is not None:
+            sql += ' WHERE instance = ?'
+            params.append(instance)
+        return pd.read_sql_query(sql + ' ORDER BY id', self._conn, params=params)
+
+    def import_backup_folder(self, folder:str) -> str:
+        '''
+            Import the solution pickles of a backup folder of the LARP
+            notebook (Y_sol.pkl, Z_sol.pkl, list_X_sol.pkl,
+            dict_storage_to_fields.pkl and scalability_unit.pkl).
+
+            Arguments
+            ---------
+            folder:str
+            Path of the backup folder, e.g. backup/backup_F1_f_7_s_6
+
+            Return
+            ------
+            instance:str
+            Name of the imported instance, e.g. F1_f_7_s_6
+        '''
+        instance = os.path.basename(os.path.normpath(folder)).replace('backup_', '', 1)
+        for name in ['Y_sol', 'Z_sol', 'list_X_sol', 'dict_storage_to_fields', 'scalability_unit']:
+            path = os.path.join(folder, f'{name}.pkl')
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    self.put(instance, name, pickle.load(file))
+        return instance
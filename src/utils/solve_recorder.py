@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+from gurobipy import GRB
+
+
+class SolveRecorder:
+
+    COLUMNS = ('time', 'incumbent', 'bound', 'gap', 'nodes')
+
+    def __init__(self, min_interval:float=0.1) -> None:
+        '''
+            The SolveRecorder class is a Gurobi callback which records the
+            progress of the optimization over time: incumbent objective,
+            best bound, MIP gap, explored nodes and wall time. A point is
+            recorded at each new incumbent and, otherwise, at most every
+            min_interval seconds.
+
+            The timings of the build phases of the LARP model are attached
+            by LARP.optimize, so that the whole history of a run is exported
+            by a single object.
+
+            Arguments
+            ---------
+            min_interval:float
+            Minimum number of seconds between two recorded points, new
+            incumbents are always recorded
+        '''
+        self.min_interval = min_interval
+        self.build_timings = dict()
+        self._points = list()
+        self._last_time = -math.inf
+
+    def __call__(self, model, where) -> None:
+        if where == GRB.Callback.MIPSOL:
+            # MIPSOL_OBJBST is the incumbent before the new solution
+            point = (model.cbGet(GRB.Callback.RUNTIME),
+                     min(model.cbGet(GRB.Callback.MIPSOL_OBJ), model.cbGet(GRB.Callback.MIPSOL_OBJBST)),
+                     model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                     model.cbGet(GRB.Callback.MIPSOL_NODCNT))
+        elif where == GRB.Callback.MIP:
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+            if runtime - self._last_time < self.min_interval:
+                return
+            point = (runtime,
+                     model.cbGet(GRB.Callback.MIP_OBJBST),
+                     model.cbGet(GRB.Callback.MIP_OBJBND),
+                     model.cbGet(GRB.Callback.MIP_NODCNT))
+        else:
+            return
+
+        self._record(*point)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _record(self, runtime:float, incumbent:float, bound:float, nodes:float) -> None:
+        incumbent = math.nan if abs(incumbent) >= GRB.INFINITY else incumbent
+        bound = math.nan if abs(bound) >= GRB.INFINITY else bound
+        gap = abs(incumbent-bound)/abs(incumbent) if incumbent else math.nan
+
+        self._points.append((runtime, incumbent, bound, gap, nodes))
+        self._last_time = runtime
+
+    def record_final(self, model) -> None:
+        '''
+            Record the final state of the model, after the optimization.
+
+            Arguments
+            ---------
+            model:gp.Model
+            The optimized Gurobi model
+
+            Return
+            ------
+            None
+        '''
+        incumbent = model.ObjVal if model.SolCount > 0 else GRB.INFINITY
+        bound = model.ObjBound if model.IsMIP else incumbent
+        self._record(model.Runtime, incumbent, bound, model.NodeCount)
+
+    def to_array(self) -> np.ndarray:
+        '''
+            Return the recorded points as a (n_points, 5) float array,
+            with the columns in COLUMNS order.
+        '''
+        return np.array(self._points, dtype=float).reshape((-1, len(self.COLUMNS)))
+
+    def to_csv(self, path:str) -> None:
+        '''
+            Write the recorded points in a CSV file; the build timings
+            are written as comment lines at the top of the file
+            (np.loadtxt skips them).
+
+            Arguments
+            ---------
+            path:str
+            Path of the CSV file
+
+            Return
+            ------
+            None
+        '''
+        header = [f'build {name} {seconds:.6f}' for name, seconds in self.build_timings.items()]
+        header.append(','.join(self.COLUMNS))
+        np.savetxt(path, self.to_array(), delimiter=',', fmt='%.6g', header='\n'.join(header))
@@ -0,0 +1,160 @@
+from timeit import default_timer as timer
+
+import numpy as np
+from scipy.optimize import milp, Bounds, LinearConstraint
+
+from src.utils.larp_matrix import decode_solution
+
+
+class HighsBackend:
+
+    name = 'highs'
+
+    def __init__(self, time_limit:float=None, mip_rel_gap:float=None) -> None:
+        '''
+            Backend to solve the exported LARP model (see export_matrices)
+            with the open-source HiGHS solver, through scipy.optimize.milp.
+
+            Arguments
+            ---------
+            time_limit:float
+            Maximum number of seconds for the optimization, None for no limit
+
+            mip_rel_gap:float
+            Relative MIP gap used as termination criterion, None for solver default
+        '''
+        self.time_limit = time_limit
+        self.mip_rel_gap = mip_rel_gap
+
+    def solve(self, matrices:dict) -> dict:
+        '''
+            Solve the exported LARP model.
+
+            Arguments
+            ---------
+            matrices:dict
+            Exported LARP model (see export_matrices)
+
+            Return
+            ------
+            results:dict
+            A dictionary with the following information:
+              - status: optimal, time_limit, infeasible or error
+              - objval: objective value, None if no solution is found
+              - X_sol, Y_sol, Z_sol: solution arrays, None if no solution is found
+              - runtime: seconds spent by the solver
+        '''
+        options = {'disp': False}
+        if self.time_limit is not None:
+            options['time_limit'] = self.time_limit
+        if self.mip_rel_gap is not None:
+            options['mip_rel_gap'] = self.mip_rel_gap
+
+        start = timer()
+        res = milp(matrices['c'],
+                   integrality=matrices['integrality'],
+                   bounds=Bounds(matrices['lb'], matrices['ub']),
+                   constraints=LinearConstraint(matrices['A'], matrices['b_l'], matrices['b_u']),
+                   options=options)
+        runtime = timer()-start
+
+        status = {0: 'optimal', 1: 'time_limit', 2: 'infeasible'}.get(res.status, 'error')
+        return _results(matrices, status, res.x, runtime)
+
+
+class GurobiBackend:
+
+    name = 'gurobi'
+
+    def __init__(self, time_limit:float=None, mip_rel_gap:float=None, env=None) -> None:
+        '''
+            Backend to solve the exported LARP model (see export_matrices)
+            with Gurobi, using the matrix API; it is used to compare the
+            backends on the very same export.
+
+            Arguments
+            ---------
+            time_limit:float
+            Maximum number of seconds for the optimization, None for no limit
+
+            mip_rel_gap:float
+            Relative MIP gap used as termination criterion, None for solver default
+
+            env:gp.Env
+            Gurobi environment (see EnvPool), None for the default environment
+        '''
+        self.time_limit = time_limit
+        self.mip_rel_gap = mip_rel_gap
+        self.env = env
+
+    def solve(self, matrices:dict) -> dict:
+        '''
+            Solve the exported LARP model, see HighsBackend.solve
+        '''
+        import gurobipy as gp
+        from gurobipy import GRB
+
+        A, b_l, b_u = matrices['A'], matrices['b_l'], matrices['b_u']
+        vtype = np.where(matrices['integrality'] > 0, GRB.INTEGER, GRB.CONTINUOUS)
+
+        model = gp.Model('location_assignment_routing_problem', env=self.env)
+        model.setParam('OutputFlag', 0)
+        if self.time_limit is not None:
+            model.setParam('TimeLimit', self.time_limit)
+        if self.mip_rel_gap is not None:
+            model.setParam('MIPGap', self.mip_rel_gap)
+
+        x = model.addMVar(len(matrices['c']), lb=matrices['lb'], ub=matrices['ub'], vtype=vtype)
+        model.setObjective(matrices['c'] @ x, GRB.MINIMIZE)
+
+        equal = b_l == b_u
+        upper = ~equal & np.isfinite(b_u)
+        lower = ~equal & np.isfinite(b_l)
+        model.addMConstr(A[equal], x, '=', b_u[equal])
+        model.addMConstr(A[upper], x, '<', b_u[upper])
+        model.addMConstr(A[lower], x, '>', b_l[lower])
+
+        model.optimize()
+
+        status = {GRB.OPTIMAL: 'optimal', GRB.TIME_LIMIT: 'time_limit',
+                  GRB.INFEASIBLE: 'infeasible'}.get(model.status, 'error')
+        solution = x.X if model.SolCount > 0 else None
+        results = _results(matrices, status, solution, model.Runtime)
+        model.dispose()
+        return results
+
+
+BACKENDS = {HighsBackend.name: HighsBackend, GurobiBackend.name: GurobiBackend}
+
+
+def get_backend(name:str, **kwargs):
+    '''
+        Return a new backend instance given its name ('highs' or 'gurobi').
+
+        Arguments
+        ---------
+        name:str
+        Name of the backend
+
+        kwargs
+        Arguments of the backend constructor
+
+        Return
+        ------
+        backend
+        A backend instance with a solve(matrices) method
+    '''
+    return BACKENDS[name](**kwargs)
+
+def _results(matrices:dict, status:str, x:np.ndarray, runtime:float) -> dict:
+    '''
+        Support function to pack the results of a backend.
+    '''
+    objval, X_sol, Y_sol, Z_sol = None, None, None, None
+    if x is not None:
+        objval = round(float(matrices['c'] @ x), 2)
+        X_sol, Y_sol, Z_sol = decode_solution(matrices, x)
+
+    return {'status': status, 'objval': objval,
+            'X_sol': X_sol, 'Y_sol': Y_sol, 'Z_sol': Z_sol,
+            'runtime': round(runtime, 2)}
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+# optional strengtheners of the LARP formulation (see LARP and export_matrices):
+#   - symmetry: identical storages are opened in order and the (unused)
+#     location variable of the main facility is fixed to 1;
+#   - rounded_capacity: minimum number of open storages, given the
+#     vehicles and the storage capacities, and Y_ij <= X_j;
+#   - degree: one arc enters and one arc leaves each open storage, in
+#     place of the W_1/W_2 linearization;
+#   - drop_redundant: the redundant Y >= 0 rows are not added.
+STRENGTHENERS = ('symmetry', 'rounded_capacity', 'degree', 'drop_redundant')
+
+
+def check_strengthening(strengthening) -> tuple:
+    '''
+        Validate the names of the strengtheners.
+
+        Arguments
+        ---------
+        strengthening:list
+        Names of the strengtheners (see STRENGTHENERS), or None
+
+        Return
+        ------
+        tuple
+        Names of the strengtheners, in the order of STRENGTHENERS
+    '''
+    names = set() if strengthening is None else set(strengthening)
+    unknown = names.difference(STRENGTHENERS)
+    if unknown:
+        raise ValueError(f'unknown strengthening: {sorted(unknown)}')
+    return tuple(name for name in STRENGTHENERS if name in names)
+
+def identical_storages(arrays:dict) -> list:
+    '''
+        Groups of identical storages, i.e. storages with the same cost,
+        capacity and distances to the fields, to the other storages and to
+        the main facility: the storages of a group are interchangeable in
+        any solution.
+
+        Arguments
+        ---------
+        arrays:dict
+        LARP inputs as NumPy arrays (see LARP.get_arrays)
+
+        Return
+        ------
+        list
+        List of groups (sorted indexes of the storages) with at least two storages
+    '''
+    f, q = arrays['f'], arrays['q']
+    cs_dist, fs_dist = arrays['cs_dist'], arrays['fs_dist']
+    m = len(f)
+
+    def same(a, b):
+        others = np.ones(m+1, dtype=bool)
+        others[[a, b]] = False
+        return bool(f[a] == f[b] and q[a] == q[b] and fs_dist[a, b] == fs_dist[b, a] and
+                    (cs_dist[:, a] == cs_dist[:, b]).all() and
+                    (fs_dist[a, others] == fs_dist[b, others]).all() and
+                    (fs_dist[others, a] == fs_dist[others, b]).all())
+
+    groups, grouped = list(), np.zeros(m, dtype=bool)
+    for a in range(m):
+        if grouped[a]:
+            continue
+        group = [a] + [b for b in range(a+1, m) if not grouped[b] and same(a, b)]
+        grouped[group] = True
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+def min_open_storages(arrays:dict, k_vehicles:int) -> int:
+    '''
+        Minimum number of open storages: each vehicle visits at least one
+        storage and the open storages have to store the whole demand, i.e.
+        the rounding of sum_j q_j X_j >= sum_i d_i over the largest capacities.
+
+        Arguments
+        ---------
+        arrays:dict
+        LARP inputs as NumPy arrays (see LARP.get_arrays)
+
+        k_vehicles:int
+        Number of vehicles
+
+        Return
+        ------
+        int
+        Lower bound of the number of open storages
+    '''
+    capacity = np.cumsum(np.sort(arrays['q'])[::-1])
+    storages = int(np.searchsorted(capacity, arrays['demand'].sum() - 1e-9) + 1)
+    return max(k_vehicles, min(storages, len(capacity)))
@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.larp import LARP
+
+
+class NeighbourBound:
+
+    def __init__(self, larp:LARP, tolerance:float=1e-6) -> None:
+        '''
+            The NeighbourBound class computes lower bounds of the objective
+            value of the neighbours generated by the neighbourhood structures,
+            to skip the evaluation (LARP model) of the ones that cannot improve
+            the current dow. The objective of the LARP model is:
+              - the fixed cost of the open storages, f*X;
+              - the assignment cost, cs_dist*demand of each field to its storage;
+              - the routing cost, fs_dist of each arc of the routes.
+
+            Bounds use costs precomputed once: per field minimum assignment
+            cost and per storage cheapest incoming arc (each open storage is
+            visited by exactly one route).
+
+            Arguments
+            ---------
+            larp:LARP
+            An instance of the LARP model
+
+            tolerance:float
+            Relative tolerance, a neighbour is pruned only if its bound exceeds
+            the incumbent by more than the tolerance (the objective value of the
+            LARP model may differ by round-off)
+        '''
+        arrays = larp.get_arrays()
+        self.m_storages = larp.m_storages
+        self.tolerance = tolerance
+
+        self.f = arrays['f']
+        self.assign = arrays['cs_dist']*arrays['demand'][:, np.newaxis] # (n_fields, m_storages)
+        self.fs_dist = arrays['fs_dist'] # facility as last row/column
+
+        in_arcs = self.fs_dist.copy()
+        np.fill_diagonal(in_arcs, np.inf)
+        self.min_in_arc = in_arcs[:, :self.m_storages].min(axis=0)
+
+    def X_bound(self, X:np.ndarray, storages:np.ndarray=None) -> float:
+        '''
+            Lower bound of the objective value of any neighbour with the
+            given open storages, i.e. for any assignment Y and routes Z.
+
+            Arguments
+            ---------
+            X:np.ndarray
+            Binary vector of the open storages
+
+            storages:np.ndarray
+            Storages (from 1) the fields can be assigned to, the open ones if None
+
+            Return
+            ------
+            float
+            Lower bound of the objective value
+        '''
+        open_idx = np.nonzero(X)[0]
+        cols = open_idx if storages is None else np.asarray(storages, dtype=np.intp)-1
+        assign = self.assign[:, cols].min(axis=1).sum() if len(cols) else 0.0
+        return float(self.f[open_idx].sum() + assign + self.min_in_arc[open_idx].sum())
+
+    def cost(self, X:np.ndarray, Y:np.ndarray, Z:np.ndarray) -> float:
+        '''
+            Objective value of a fully fixed neighbour (X, Y and Z as in a dow),
+            a lower bound of the LARP model evaluation, equal if it is feasible.
+
+            Return
+            ------
+            float
+            Objective value of the neighbour
+        '''
+        fixed = self.f[np.nonzero(X)[0]].sum()
+        assign = self.assign[np.arange(len(Y)), np.asarray(Y, dtype=np.intp)-1].sum()
+
+        routing = 0.0
+        if len(Z):
+            # arcs of the routes, the facility (label 0) is the last row/column
+            heads = np.where(np.asarray(Z) == 0, self.m_storages+1, Z).astype(np.intp)-1
+            tails = np.append(heads[1:], self.m_storages)
+            arcs = np.unique((heads*(self.m_storages+1) + tails)[heads != tails])
+            routing = self.fs_dist.ravel()[arcs].sum()
+        return float(fixed + assign + routing)
+
+    def prune(self, bound:float, incumbent:float) -> bool:
+        '''
+            True if a neighbour with the given lower bound cannot
+            improve the incumbent objective value.
+        '''
+        return bound >= incumbent + self.tolerance*max(1.0, abs(incumbent))
@@ -1,5 +1,3 @@
-from copy import deepcopy
-
 from src.larp import LARP
 from src.utils.utils_waterflow.dow import DOW
 
@@ -7,10 +5,11 @@ from src.utils.gurobipy_utils import (add_constrs,
                                       modify_rhs_constrs, 
                                       remove_constrs, fit,
                                       check_additional_constr)
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
 
 class CLOUD:
 
-    def __init__(self, larp:LARP, max_pop:int) -> None:
+    def __init__(self, larp:LARP, max_pop:int, stats:WFAStats=NO_STATS) -> None:
         '''
             The CLOUD class is an abstraction of a real cloud.
             For this reason, a CLOUD is capable to produce a 
@@ -23,9 +22,13 @@ class CLOUD:
 
             max_pop:int
             Integer number of drop-of-waters (dows) generated by a CLOUD
+
+            stats:WFAStats
+            Statistics of the WFA run
         '''
         self.larp = larp
         self.max_pop = max_pop # i.e. n_dows
+        self.stats = stats
 
     def make_rain(self, E_list:list, discarded_list:list) -> tuple:
         '''
@@ -57,7 +60,7 @@ class CLOUD:
         generator = self.dows_generator(self.larp, self.max_pop)
         
         for dow, no_dows in generator:
-            no_feasible_dows = deepcopy(no_dows)
+            no_feasible_dows = list(no_dows)
             # print('make_rain | dow in generator:\n', dow)
 
             # print('check if dow in E_list...')
@@ -76,6 +79,8 @@ class CLOUD:
                 rainfall.append(dow)
 
         discarded_dows.extend(no_feasible_dows)
+        self.stats.count('rain_dows', len(rainfall))
+        self.stats.count('rain_discarded_dows', len(no_feasible_dows))
         
         self.larp.model.resetParams()
         return rainfall, discarded_dows
@@ -104,8 +109,7 @@ class CLOUD:
         constrs = None
         for i in range(n_dows):
             while True:
-                dow = DOW(larp.m_storages, larp.n_fields, larp._k_vehicles)
-                dow.set_rand_X() # randomly generate dow.X attribute
+                dow = DOW.rand(larp.m_storages, larp.n_fields, larp._k_vehicles) # randomly generated dow.X
                 # print('dow created')
 
                 if constrs:
@@ -113,12 +117,11 @@ class CLOUD:
                 else:
                     larp, constrs = add_constrs(larp, dow, None)
 
-                larp, is_fit = fit(larp, dow)
+                larp, is_fit = fit(larp, dow, self.stats)
                 
                 pass_additional_constr = False
                 if is_fit:
-                    dow.Y = larp.Y
-                    dow.Z = larp.Z
+                    dow = dow.replace(Y=larp.Y, Z=larp.Z)
                     pass_additional_constr = check_additional_constr(dow)
 
                 if is_fit and pass_additional_constr:
@@ -131,7 +134,6 @@ class CLOUD:
                 # print('iter:', i, ' --> DOW NOT FEASIBLE', sep=' ')
                 larp.model.reset(0)
 
-            dow.to_vector()
             yield dow, discarded_dows
         
         # print('remove additional constraints')
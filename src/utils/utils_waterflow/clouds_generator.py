@@ -1,8 +1,9 @@
 from src.larp import LARP
 from src.utils.utils_waterflow.cloud import CLOUD
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
 
 
-def clouds_generator(n_clouds:int, larp:LARP, max_pop:int) -> CLOUD:
+def clouds_generator(n_clouds:int, larp:LARP, max_pop:int, stats:WFAStats=NO_STATS) -> CLOUD:
     '''
         Python generator to generate clouds, up to n_clouds.
 
@@ -17,6 +18,9 @@ def clouds_generator(n_clouds:int, larp:LARP, max_pop:int) -> CLOUD:
         max_pop:int
         Integer number of drop-of-waters (dows) to generate per each cloud  
 
+        stats:WFAStats
+        Statistics of the WFA run
+
         Return
         ------
         CLOUD
@@ -24,4 +28,4 @@ def clouds_generator(n_clouds:int, larp:LARP, max_pop:int) -> CLOUD:
     '''
 
     for _ in range(n_clouds):
-        yield CLOUD(larp, max_pop)
+        yield CLOUD(larp, max_pop, stats)
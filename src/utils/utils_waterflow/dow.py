@@ -1,20 +1,110 @@
-from dataclasses import dataclass
-from copy import deepcopy
+from collections import OrderedDict
 import numpy as np
 from gurobipy import tupledict
 
 
 rng = np.random.default_rng()
 
+# dtypes of the vectorial representation of a dow
+INDEX_DTYPE = np.int16 # storage labels in Y and Z (up to 32767 storages)
+
+# number of matrix representations kept in memory (see DOW.Y_matrix and DOW.Z_matrix)
+MATRIX_CACHE_SIZE = 256
+_matrix_cache = OrderedDict()
+
+
+def set_seed(seed:int=None) -> None:
+    '''
+        Reset the random generator of the dows, to make the
+        WFA reproducible.
+
+        Arguments
+        ---------
+        seed:int
+        Seed of the random generator
+    '''
+    global rng
+    rng = np.random.default_rng(seed)
+
+
+def _values(other, shape:tuple) -> np.ndarray:
+    # values of a decision variable of the LARP model (tupledict of gurobipy vars)
+    # or of a dictionary indexed as the decision variable, as matrix
+    values = np.zeros(shape)
+    for key in other.keys():
+        values[key] = other[key].x if isinstance(other, tupledict) else other[key]
+    return values
+
+def _Y_to_vector(Y) -> np.ndarray:
+    # each field is assigned to exactly one storage, labels start from 1
+    return np.argmax(Y > 0.5, axis=1).astype(INDEX_DTYPE) + 1
+
+def _Z_to_vector(Z) -> np.ndarray:
+    # routes start from the facility (last row/column of Z, label 0 in the vector)
+    facility = Z.shape[0]-1
+    route = list()
+    for pos in np.nonzero(Z[facility, :] > 0.5)[0]:
+        route.append(0)
+        while pos != facility:
+            route.append(pos+1)
+            pos = np.nonzero(Z[pos, :] > 0.5)[0][0]
+    return np.array(route, dtype=INDEX_DTYPE)
+
+def _Z_to_matrix(route:np.ndarray, m_storages:int) -> np.ndarray:
+    # arcs of the routes, the facility (label 0) is the last row/column
+    Z = np.zeros((m_storages+1, m_storages+1))
+    route = np.asarray(route, dtype=np.intp)
+    if len(route) == 0:
+        return Z
+    arcs = np.where(route == 0, m_storages+1, route)-1
+    Z[arcs[:-1], arcs[1:]] = 1
+    Z[arcs[-1], m_storages] = 1
+    return Z
+
+def _pack_X(X) -> bytes:
+    return None if X is None else np.packbits(np.asarray(X, dtype=bool)).tobytes()
+
+def _pack_index(value, shape:tuple, to_vector) -> bytes:
+    # vector, matrix or LARP decision variable to compact int16 vector
+    if value is None:
+        return None
+    if isinstance(value, (tupledict, dict)):
+        value = to_vector(_values(value, shape))
+    else:
+        value = np.asarray(value)
+        if value.ndim == 2:
+            value = to_vector(value)
+    return value.astype(INDEX_DTYPE).tobytes()
+
+def _cached(key:tuple, compute):
+    # bounded LRU cache of the matrix representations
+    if key in _matrix_cache:
+        _matrix_cache.move_to_end(key)
+        return _matrix_cache[key]
+    value = compute()
+    value.flags.writeable = False
+    _matrix_cache[key] = value
+    if len(_matrix_cache) > MATRIX_CACHE_SIZE:
+        _matrix_cache.popitem(last=False)
+    return value
+
 
-@dataclass(frozen=False)
 class DOW:
 
-    def __init__(self, m_storages:int, n_fields:int, k_vehicles:int):
+    __slots__ = ('m_storages', 'n_fields', 'k_vehicles', '_X', '_Y', '_Z', '_hash', 'obj_value', 'evaluated')
+
+    def __init__(self, m_storages:int, n_fields:int, k_vehicles:int,
+                 X=None, Y=None, Z=None, obj_value:float=None, evaluated:bool=True):
         '''
             DOW stands for "drop-of-water" and the class DOW represents
             an abstraction of a real drop of water generated by a cloud.
 
+            A dow is immutable: the solution (X, Y and Z) is stored in a
+            compact form (X as a bitset, Y and Z as int16 vectors) and a
+            changed solution is a new dow (see replace). Only obj_value,
+            i.e. the evaluation of the solution, is assigned by the LARP
+            model (see gurobipy_utils.fit), together with evaluated.
+
             Arguments
             ---------
             m_storages:int
@@ -24,7 +114,27 @@ class DOW:
             Integer number of fields to consider
 
             k_vehicles:int
-            Integer number of vehicles to consider 
+            Integer number of vehicles to consider
+
+            X:np.ndarray
+            Binary vector of the open storages, optional
+
+            Y:np.ndarray or tupledict
+            Storage (from 1) assigned to each field, or the (n_fields, m_storages)
+            assignment matrix, or the Y decision variable of the LARP model, optional
+
+            Z:np.ndarray or tupledict
+            Routes as a sequence of storages, each route starting from the facility (0),
+            or the (m_storages+1, m_storages+1) arc matrix with the facility as last
+            row/column, or the Z decision variable of the LARP model, optional
+
+            obj_value:float
+            Objective value of the solution, optional
+
+            evaluated:bool
+            False if the feasibility of the solution is not checked yet, i.e.
+            a neighbour pruned by the local search whose obj_value is the
+            objective of the fixed solution (see NeighbourBound.cost)
         '''
 
         self.m_storages = m_storages
@@ -36,152 +146,135 @@ class DOW:
         #   then, we use the partial fixed solution to find a feasible solution for the LARP
         #   model. The first feasible solution found is returned as a DOW.
 
-        self._X = None
-        self._Y = None
-        self._Z = None
-        self._obj_value = None
+        self._X = _pack_X(X)
+        self._Y = _pack_index(Y, (n_fields, m_storages), _Y_to_vector)
+        self._Z = self._pack_Z(Z)
+        self._hash = hash((self._X, self._Y, self._Z))
+        self.obj_value = obj_value
+        self.evaluated = evaluated
 
-    @property
-    def obj_value(self):
-        return self._obj_value
+    @classmethod
+    def rand(cls, m_storages:int, n_fields:int, k_vehicles:int):
+        '''
+            Return a new dow with randomly generated values for the X attribute
+        '''
+        return cls(m_storages, n_fields, k_vehicles, X=rng.integers(2, size=m_storages))
+
+    def replace(self, **changes):
+        '''
+            Return a new dow with the given attributes (X, Y, Z and obj_value)
+            changed; the unchanged attributes are shared, not copied.
+        '''
+        dow = DOW(self.m_storages, self.n_fields, self.k_vehicles,
+                  obj_value=changes.get('obj_value', self.obj_value))
+        dow._X = _pack_X(changes['X']) if 'X' in changes else self._X
+        dow._Y = _pack_index(changes['Y'], (self.n_fields, self.m_storages), _Y_to_vector) \
+                    if 'Y' in changes else self._Y
+        dow._Z = self._pack_Z(changes['Z']) if 'Z' in changes else self._Z
+        dow._hash = hash((dow._X, dow._Y, dow._Z))
+        return dow
 
-    @obj_value.setter
-    def obj_value(self, other):
-        self._obj_value = deepcopy(other)
+    def _pack_Z(self, Z) -> bytes:
+        # routes are stored in canonical order (sorted by their first storage),
+        # a vector (any sequence) is converted through its matrix representation,
+        # which is cached
+        if Z is not None and not isinstance(Z, (tupledict, dict)):
+            Z = np.asarray(Z)
+        if isinstance(Z, np.ndarray) and Z.ndim == 1:
+            matrix = _Z_to_matrix(Z, self.m_storages)
+            packed = _pack_index(matrix, None, _Z_to_vector)
+            _cached(('Z', self.m_storages, packed), lambda: matrix)
+            return packed
+        return _pack_index(Z, (self.m_storages+1, self.m_storages+1), _Z_to_vector)
 
     @property
-    def X(self) -> np.array:
-        return self._X
+    def X(self) -> np.ndarray:
+        '''
+            Binary vector of the open storages, a new (uint8) array at each access.
+        '''
+        if self._X is None:
+            return None
+        return np.unpackbits(np.frombuffer(self._X, dtype=np.uint8), count=self.m_storages)
 
-    @X.setter
-    def X(self, other) -> None:
-        self._X = np.array(deepcopy(other))
+    @property
+    def Y(self) -> np.ndarray:
+        '''
+            Storage (from 1) assigned to each field, read-only view.
+        '''
+        if self._Y is None:
+            return None
+        return np.frombuffer(self._Y, dtype=INDEX_DTYPE)
 
     @property
-    def Y(self) -> np.array:
-        return self._Y
-
-    @Y.setter
-    def Y(self, other) -> None:
-        if isinstance(other, np.ndarray):
-            self._Y = other
-        else:
-            self._Y = np.zeros((self.n_fields, self.m_storages))
-            for i in range(self._Y.shape[0]):
-                for j in range(self._Y.shape[1]):
-                    if isinstance(other, tupledict):
-                        self._Y[i,j] = deepcopy(other[i,j].x)
-                    else:
-                        self._Y[i,j] = deepcopy(other[i,j])
+    def Z(self) -> np.ndarray:
+        '''
+            Routes as a sequence of storages, each route starting from the
+            facility (0), read-only view.
+        '''
+        if self._Z is None:
+            return None
+        return np.frombuffer(self._Z, dtype=INDEX_DTYPE)
 
     @property
-    def Z(self) -> np.array:
-        return self._Z
-
-    @Z.setter
-    def Z(self, other) -> None:
-        if isinstance(other, np.ndarray):
-            self._Z = other
-        else:
-            self._Z = np.zeros((self.m_storages+1, self.m_storages+1))
-            for u in range(self._Z.shape[0]):
-                for v in range(self._Z.shape[1]):
-                    if u!=v:
-                        if isinstance(other, tupledict):
-                            self._Z[u,v] = deepcopy(other[u,v].x)
-                        else:
-                            self._Z[u,v] = deepcopy(other[u,v])
-                
+    def Y_matrix(self) -> np.ndarray:
+        '''
+            Matrix representation of Y, (n_fields, m_storages), computed
+            on demand and cached (see MATRIX_CACHE_SIZE), read-only.
+        '''
+        def compute():
+            Y = np.zeros((self.n_fields, self.m_storages))
+            Y[np.arange(self.n_fields), self.Y.astype(np.intp)-1] = 1
+            return Y
+        return _cached(('Y', self.n_fields, self.m_storages, self._Y), compute)
+
+    @property
+    def Z_matrix(self) -> np.ndarray:
+        '''
+            Matrix representation of Z, (m_storages+1, m_storages+1) with the
+            facility as last row/column, computed on demand and cached
+            (see MATRIX_CACHE_SIZE), read-only.
+        '''
+        return _cached(('Z', self.m_storages, self._Z), lambda: _Z_to_matrix(self.Z, self.m_storages))
 
     def __str__(self):
-        out_string = f'objValue: {self._obj_value}\n'
-        out_string += f'X: {self._X}\n'
-        out_string += f'Y: {self._Y}\n'
-        out_string += f'Z: {self._Z}\n'
+        out_string = f'objValue: {self.obj_value}\n'
+        out_string += f'X: {self.X}\n'
+        out_string += f'Y: {self.Y}\n'
+        out_string += f'Z: {self.Z}\n'
         return out_string
-    
-    def __hash__(self) -> int:
-        # to univocally rapresent a dow
-        return hash(repr(self))
 
-    def __eq__(self, other) -> bool:        
-        if isinstance(other, DOW):
-            if all(arr is not None for arr in [other.Z, other.Y, self._Z, self._Y]):
-                other.to_vector()
-                self.to_vector()
+    def __repr__(self):
+        return f'DOW(X={self.X}, Y={self.Y}, Z={self.Z}, obj_value={self.obj_value})'
+
+    def __getstate__(self):
+        # the hash of bytes changes between processes, it is computed again
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_hash'}
 
-                return (self.X == other.X).all() and \
-                        (self.Y == other.Y).all() and \
-                        (len(self.Z) == len(other.Z)) and \
-                        (self.Z == other.Z).all()
+    def __setstate__(self, state):
+        self.evaluated = True # dows pickled before the attribute existed
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._hash = hash((self._X, self._Y, self._Z))
 
+    @property
+    def key(self) -> bytes:
+        '''
+            Bytes univocally representing the solution of the dow (for a given
+            number of storages and fields), stable between processes.
+        '''
+        return bytes([self._Y is None, self._Z is None]) + \
+                b''.join(value for value in (self._X, self._Y, self._Z) if value is not None)
+
+    def __hash__(self) -> int:
+        # to univocally rapresent a dow
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        # dows without Y and Z (X only, e.g. no feasible dows of a cloud) are never equal
+        if isinstance(other, DOW) and None not in (self._Y, self._Z, other._Y, other._Z):
+            return self._hash == other._hash and \
+                    (self._X, self._Y, self._Z) == (other._X, other._Y, other._Z)
         return False
 
     def __ne__(self, other) -> bool:
         return not self.__eq__(other)
-
-    def set_rand_X(self) -> None:
-        '''
-            Randomly generate values for the X attribute of the dow instance
-        '''
-        self._X = rng.integers(2, size=self.m_storages)
-
-    def to_vector(self) -> None:
-        '''
-            Convert DOW attributes X, Y and Z into a vectorial rapresentation.
-        '''
-        if self._Y.ndim == 2: # check if dow.Y is, in fact, with a matrix shape
-            self._Y = [np.nonzero(self._Y[i,:])[0][0]+1 for i in range(self._Y.shape[0])]
-            self._Y = np.array(self._Y)
-        
-        if self._Z.ndim == 2: # check if dow.Z is, in fact, with a matrix shape
-            F_firsts_pos = np.nonzero(self._Z[self._Z.shape[0]-1, :] == 1)[0]
-            # print('F firsts pos:', F_firsts_pos)
-            routes = list()
-            for pos in F_firsts_pos:
-                route = list()
-                route.append(0)
-                route.append(pos+1)
-                while True:
-                    pos = np.nonzero(self._Z[pos, :] == 1)[0][0]
-                    # print('while | pos:', pos)
-                    if pos == self._Z.shape[1]-1:
-                        break
-                    route.append(pos+1)
-                routes.append(route)
-            self._Z = [pos for route in routes for pos in route]
-            self._Z = np.array(self._Z)
-    
-    def to_matrix(self) -> None:
-        '''
-            Convert DOW attributes X, Y and Z into a matrix rapresentation.
-        '''
-        if self._Y.ndim == 1: # check if dow.Y is, in fact, with a vectorial shape
-            Y = np.zeros((self.n_fields, self.m_storages))
-            cols = [j-1 for j in self._Y]
-            for i in range(len(self._Y)):
-                
-                j = cols[i]
-                try:
-                    Y[i,j] = 1
-                except IndexError as e:
-                    print(self._Y)
-                    print('i:', i, 'j:', j)
-                    raise(e)
-            self._Y = Y
-
-        if self._Z.ndim == 1: # check if dow.Y is, in fact, with a vectorial shape
-            Z = np.zeros((self.m_storages+1, self.m_storages+1))
-            for idx in range(len(self._Z)-1):
-                u = self._Z[idx]
-                v = self._Z[idx+1]
-                if u == 0:
-                    Z[self.m_storages, v-1] = 1
-                elif v == 0:
-                    Z[u-1,self.m_storages] = 1
-                else:
-                    Z[u-1, v-1] = 1
-            Z[self._Z[len(self._Z)-1]-1, self.m_storages] = 1
-            self._Z = Z
-        
-            
\ No newline at end of file
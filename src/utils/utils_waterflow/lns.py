@@ -0,0 +1,193 @@
+import numpy as np
+from gurobipy import GRB
+
+from src.larp import LARP
+from src.utils.utils_waterflow.dow import DOW
+from src.utils.gurobipy_utils import set_start
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+
+
+def storage_proximity(larp:LARP) -> np.ndarray:
+    '''
+        Proximity of the storages, used to choose the storages freed
+        together by the destroy step: two storages are close if they are
+        close in fs_dist and if they have similar distances from the fields
+        in cs_dist (i.e. they compete for the same fields). Both terms are
+        normalized in [0, 1].
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model
+
+        Return
+        ------
+        proximity:np.ndarray
+        Distance among the storages, (m_storages, m_storages), the smaller
+        the closer
+    '''
+    arrays = larp.get_arrays()
+    m = larp.m_storages
+    fs_dist = arrays['fs_dist'][:m, :m]
+    cs_dist = arrays['cs_dist']
+    profile = np.abs(cs_dist[:, :, np.newaxis] - cs_dist[:, np.newaxis, :]).mean(axis=0)
+    return fs_dist/max(fs_dist.max(), 1e-12) + profile/max(profile.max(), 1e-12)
+
+def destroy(dow:DOW, proximity:np.ndarray, size:int, rng:np.random.Generator) -> np.ndarray:
+    '''
+        Destroy step: choose the storages to free, a random open storage
+        and its closest storages (see storage_proximity).
+
+        Arguments
+        ---------
+        dow:DOW
+        A drop-of-water (dow) representing a certain solution
+
+        proximity:np.ndarray
+        Distance among the storages
+
+        size:int
+        Integer number of storages to free
+
+        rng:np.random.Generator
+        Random generator
+
+        Return
+        ------
+        free:np.ndarray
+        Indexes (from 0) of the storages to free
+    '''
+    open_idx = np.nonzero(dow.X)[0]
+    center = rng.choice(open_idx) if len(open_idx) else rng.integers(len(proximity))
+    closest = np.argsort(proximity[center], kind='stable')
+    closest = np.append(center, closest[closest != center])
+    return closest[:max(size, 1)]
+
+def repair(larp:LARP, dow:DOW, free:np.ndarray, time_limit:float=1.0,
+           stats:WFAStats=NO_STATS) -> DOW:
+    '''
+        Repair step: optimize the LARP model with the solution of dow fixed,
+        apart for the given storages, the assignment of the fields to them
+        (each field is assigned to its storage or to a freed one) and the
+        arcs of the routes around them (storages freed, their predecessors
+        and successors and the facility). Variables are fixed through
+        their bounds, restored once the sub-MIP is solved, and dow is
+        used as MIP start.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model, already built
+
+        dow:DOW
+        A drop-of-water (dow) representing a certain (feasible) solution
+
+        free:np.ndarray
+        Indexes (from 0) of the storages to free
+
+        time_limit:float
+        Time limit (sec) of the sub-MIP
+
+        stats:WFAStats
+        Statistics of the WFA run, the sub-MIPs are counted and timed
+
+        Return
+        ------
+        solution:DOW
+        An improved solution, None if no improved solution is found
+    '''
+    model = larp.model
+    m = larp.m_storages
+    X, Y, Z = dow.X, dow.Y_matrix, dow.Z_matrix
+
+    free_storages = np.zeros(m+1, dtype=bool)
+    free_storages[free] = True
+    # each field can be assigned to its storage or to a freed storage
+    free_assignments = Y.astype(bool) | free_storages[np.newaxis, :m]
+    # route neighbours of the freed storages, reconnected by the sub-MIP
+    region = free_storages | (Z[free_storages].sum(axis=0) > 0.5) | (Z[:, free_storages].sum(axis=1) > 0.5)
+
+    # (variable, free, value in dow) of the X (storages only), Y and Z decision variables
+    rows = [(larp.X[j], free_storages[j], X[j]) for j in range(m)]
+    rows += [(var, free_assignments[i,j], Y[i,j]) for (i, j), var in larp.Y.items()]
+    rows += [(var, region[u] and region[v], Z[u,v]) for (u, v), var in larp.Z.items()]
+    variables = [var for var, _, _ in rows]
+    lbs = [0.0 if free else float(value) for _, free, value in rows]
+    ubs = [1.0 if free else float(value) for _, free, value in rows]
+
+    old_lbs, old_ubs = model.getAttr('LB', variables), model.getAttr('UB', variables)
+    old_params = (model.Params.TimeLimit, model.Params.SolutionLimit)
+    try:
+        model.setAttr('LB', variables, lbs)
+        model.setAttr('UB', variables, ubs)
+        model.Params.TimeLimit = time_limit
+        model.Params.SolutionLimit = GRB.MAXINT
+        set_start(larp, dow)
+
+        larp.solver_calls += 1
+        stats.count('lns_solves')
+        with stats.timer('lns_solve'):
+            model.optimize()
+
+        solution = None
+        if model.SolCount > 0 and model.ObjVal < dow.obj_value - 1e-6*max(1.0, abs(dow.obj_value)):
+            X_sol = np.array([larp.X[j].x for j in range(m)]).round()
+            solution = DOW(dow.m_storages, dow.n_fields, dow.k_vehicles, X_sol,
+                           larp.Y, larp.Z, obj_value=model.ObjVal)
+    finally:
+        model.setAttr('LB', variables, old_lbs)
+        model.setAttr('UB', variables, old_ubs)
+        model.setAttr('Start', variables, [GRB.UNDEFINED]*len(variables))
+        model.Params.TimeLimit, model.Params.SolutionLimit = old_params
+        model.update()
+
+    return solution
+
+def large_neighbourhood_search(larp:LARP, dow:DOW, max_iter:int=10, destroy_size:int=3,
+                               time_limit:float=1.0, seed:int=None, stats:WFAStats=NO_STATS) -> DOW:
+    '''
+        Large Neighbourhood Search (LNS): at each iteration a region of the
+        solution, i.e. a subset of close storages (see destroy), is freed and
+        optimized exactly with the rest of the solution fixed (see repair).
+        An improved solution replaces the current one.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model, already built
+
+        dow:DOW
+        A drop-of-water (dow) representing a certain (feasible) solution
+
+        max_iter:int
+        Integer number of destroy and repair iterations
+
+        destroy_size:int
+        Integer number of storages freed at each iteration
+
+        time_limit:float
+        Time limit (sec) of each sub-MIP
+
+        seed:int
+        Seed of the random generator of the destroy step, optional
+
+        stats:WFAStats
+        Statistics of the WFA run
+
+        Return
+        ------
+        solution:DOW
+        Best solution found, dow if no improved solution is found
+    '''
+    rng = np.random.default_rng(seed)
+    proximity = storage_proximity(larp)
+
+    for _ in range(max_iter):
+        stats.count('lns_iterations')
+        free = destroy(dow, proximity, destroy_size, rng)
+        solution = repair(larp, dow, free, time_limit, stats)
+        if solution is not None:
+            stats.count('lns_improvements')
+            dow = solution
+
+    return dow
@@ -1,11 +1,17 @@
 from src.larp import LARP
 from src.utils.utils_waterflow.dow import DOW
+from src.utils.gurobipy_utils import fit, add_constrs, remove_constrs
 from src.utils.utils_waterflow.neighbourhood_strategies.opt_1_neighbourhood import opt_1
 from src.utils.utils_waterflow.neighbourhood_strategies.swap_neighbourhood import swap
 from src.utils.utils_waterflow.sort_topology import sort_by_topology
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+from src.utils.utils_waterflow.bounds import NeighbourBound
+from src.utils.utils_waterflow.tabu import TabuList
+from src.utils.utils_waterflow.routing import RouteSolver
 
 
-def local_search(larp:LARP, dow:DOW) -> tuple:
+def local_search(larp:LARP, dow:DOW, stats:WFAStats=NO_STATS, bound:NeighbourBound=None,
+                 tabu:TabuList=None, router:RouteSolver=None) -> tuple:
     '''
         Local search algorithm: starting from a given solution, the function
         apply in sequence the opt_1 and swap neighbourhood structures to find
@@ -23,6 +29,21 @@ def local_search(larp:LARP, dow:DOW) -> tuple:
         dow:DOW
         A drop-of-water (dow) representing a certain solution (a local optimum)
 
+        stats:WFAStats
+        Statistics of the WFA run, opt_1 and swap are timed separately
+
+        bound:NeighbourBound
+        Lower bounds of the neighbours, the ones that cannot improve the
+        current solution are not evaluated (see opt_1 and swap), optional
+
+        tabu:TabuList
+        If given, once no improved solution is found the local search continues
+        with a tabu search (see tabu_search), optional
+
+        router:RouteSolver
+        If given, the routes of the neighbours are computed for their X and Y
+        (see opt_1 and swap), optional
+
         Return
         ------
         local_optimum:dow
@@ -42,15 +63,21 @@ def local_search(larp:LARP, dow:DOW) -> tuple:
     excluded_dows = list()
     discarded_dows = list()
     neighbours = None
+    opt_1_neighbours = list()
+    if tabu is not None:
+        tabu.clear()
     
     while True:
 
-        solution, neighbours, no_feasible_dows = opt_1(larp, local_optimum)
+        with stats.timer('opt_1'):
+            solution, neighbours, no_feasible_dows = opt_1(larp, local_optimum, stats, bound, router)
         discarded_dows.extend(no_feasible_dows)
+        opt_1_neighbours = neighbours
 
         # until an improved solution is found, continue the local search
         # using the opt_1 neighbourhood structure
         if solution != local_optimum:
+            stats.count('opt_1_improvements')
             excluded_dows.extend([local_optimum])
             excluded_dows.extend(neighbours)
             local_optimum = solution
@@ -59,24 +86,179 @@ def local_search(larp:LARP, dow:DOW) -> tuple:
         # once no improved solution is found with the opt_1 neighbourhood structure,
         # continue the local search with the swap neighbourhood structure
         while True:
-            solution, neighbours, no_feasible_dows = swap(larp, local_optimum)
+            with stats.timer('swap'):
+                solution, neighbours, no_feasible_dows = swap(larp, local_optimum, stats, bound, router)
             discarded_dows.extend(no_feasible_dows)
 
             # if no improved solution is found, stop the local search
             if solution == local_optimum:
                 break
 
+            stats.count('swap_improvements')
             excluded_dows.extend([local_optimum])
             excluded_dows.extend(neighbours)
             local_optimum = solution
-        
-        break
+            opt_1_neighbours = list()
+
+        if tabu is None:
+            break
+
+        # once no improved solution is found with the swap neighbourhood structure,
+        # try to escape the local optimum with a tabu search (pruned neighbourhoods
+        # miss the worse neighbours, they are evaluated again)
+        tabu_neighbours = None if bound is not None else list(opt_1_neighbours) + list(neighbours)
+        with stats.timer('tabu'):
+            solution, walked_dows, no_feasible_dows = tabu_search(larp, local_optimum,
+                tabu_neighbours, tabu, stats, router)
+        discarded_dows.extend(no_feasible_dows)
+        if solution == local_optimum:
+            excluded_dows.extend(dow for dow in walked_dows if dow != local_optimum)
+            break
+
+        # the tabu search found an improved solution,
+        # continue the local search from it
+        stats.count('tabu_improvements')
+        excluded_dows.extend([local_optimum])
+        excluded_dows.extend(walked_dows)
+        local_optimum = solution
     
     return local_optimum, neighbours, excluded_dows, discarded_dows
 
+def tabu_search(larp:LARP, dow:DOW, neighbours:list, tabu:TabuList,
+                stats:WFAStats=NO_STATS, router:RouteSolver=None) -> tuple:
+    '''
+        Tabu search starting from a local optimum: at each step the search
+        moves to the best neighbour (opt_1 and swap neighbourhood structures)
+        even if worse, unless the move is tabu, i.e. it undoes one of the
+        last moves (see TabuList). A tabu move is accepted only if it
+        improves the local optimum (aspiration criterion).
+        The search stops once an improved solution is found, after
+        tabu.max_moves moves or if no move is allowed.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model
+
+        dow:DOW
+        A drop-of-water (dow) representing a local optimum
+
+        neighbours:list
+        List of neighbour dows of dow, evaluated if None
+
+        tabu:TabuList
+        Short-term memory of the tabu search
+
+        stats:WFAStats
+        Statistics of the WFA run
+
+        router:RouteSolver
+        Solver of the routes of the neighbours, optional
+
+        Return
+        ------
+        solution:DOW
+        An improved solution, dow if no improved solution is found
+
+        walked_dows:list
+        List of feasible solutions met during the tabu search
+
+        discarded_dows:list
+        List of no feasible solution evaluated using the LARP model
+    '''
+
+    walked_dows = list()
+    discarded_dows = list()
+    current = dow
+
+    for _ in range(tabu.max_moves):
+        if neighbours is None:
+            # neighbours of the current position, all of them (no bound),
+            # since the tabu search accepts worse solutions
+            _, opt_1_neighbours, no_feasible_dows = opt_1(larp, current, stats, router=router)
+            discarded_dows.extend(no_feasible_dows)
+            _, swap_neighbours, no_feasible_dows = swap(larp, current, stats, router=router)
+            discarded_dows.extend(no_feasible_dows)
+            neighbours = list(opt_1_neighbours) + list(swap_neighbours)
+
+        candidates = [neighbour for neighbour in neighbours
+                      if neighbour != current and tabu.allowed(current, neighbour, dow.obj_value)]
+        if not candidates:
+            break
+
+        obj_vals = [neighbour.obj_value for neighbour in candidates]
+        candidate = candidates[obj_vals.index(min(obj_vals))]
+        if tabu.is_tabu(current, candidate):
+            stats.count('tabu_aspirations')
+        stats.count('tabu_moves')
+
+        tabu.push(current, candidate)
+        walked_dows.extend([current])
+        walked_dows.extend(neighbours)
+        current = candidate
+
+        if current.obj_value < dow.obj_value:
+            return current, walked_dows, discarded_dows
+        neighbours = None
+
+    walked_dows.extend(neighbours or list())
+    return dow, walked_dows, discarded_dows
+
+def evaluate(larp:LARP, dow:DOW, discarded_list:list, stats:WFAStats=NO_STATS, fitted:dict=None) -> bool:
+    '''
+        Lazy evaluation of a neighbour not evaluated by the local search
+        (see DOW.evaluated), done only when the erosion starts a local
+        search from it: the fixed solution is checked with the LARP model,
+        a no feasible dow is added to discarded_list.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model
+
+        dow:DOW
+        A drop-of-water (dow) representing a certain solution
+
+        discarded_list:list
+        List of discarded dows, no feasible solutions
+
+        stats:WFAStats
+        Statistics of the WFA run, lazy evaluations are counted
+
+        fitted:dict
+        Objective values of the feasible dows already evaluated, by key
+        (see DOW.key); a dow rebuilt by a Neighbourhood is not fitted twice
+
+        Return
+        ------
+        bool
+        True if dow is feasible, False otherwise
+    '''
+    if dow.evaluated:
+        return True
+    if fitted is not None and dow.key in fitted:
+        dow.obj_value = fitted[dow.key]
+        dow.evaluated = True
+        return True
+
+    stats.count('lazy_evaluations')
+    larp, constrs = add_constrs(larp, dow)
+    larp, is_fit = fit(larp, dow, stats)
+    larp = remove_constrs(larp, constrs)
+
+    if is_fit:
+        dow.evaluated = True
+        if fitted is not None:
+            fitted[dow.key] = dow.obj_value
+    else:
+        discarded_list.extend([dow])
+    return is_fit
+
 def dow_seen(dow:DOW, excluded_list:list, discarded_list:list, UE_list:list, E_list:list) -> bool:
     '''
         Check if a certain drop-of-water (dow) was already evaluated.
+        The lists can also be seen sets (see seen_set), membership is
+        then O(1).
 
         Arguments
         ---------
@@ -114,7 +296,8 @@ def get_next_neighbour(neighbours:list, excluded_list:list,
         Arguments
         ---------
         neighbours:list
-        List of neighbours, i.e. dows
+        List of neighbours, i.e. dows, or an iterator over them: the search
+        then resumes after the last neighbour returned
 
         excluded_list:list
         List of excluded dows, feasible solutions but worse than a discovered local optimum
@@ -144,7 +327,9 @@ def get_next_neighbour(neighbours:list, excluded_list:list,
 
 def erosion(larp:LARP, local_optimum:DOW, neighbours:list, max_UIE:int,
             excluded_list:list, discarded_list:list, optimal_dows:dict, 
-            P0_list:list, UE_list:list, E_list:list) -> tuple:
+            P0_list:list, UE_list:list, E_list:list, stats:WFAStats=NO_STATS,
+            skip_seen:bool=False, bound:NeighbourBound=None, tabu:TabuList=None,
+            router:RouteSolver=None, fitted:dict=None) -> tuple:
     '''
         Erosion process applied to a certain local optimum, this is the
         exploitation phase of the WaterFlow algorithm where the porpose
@@ -155,6 +340,8 @@ def erosion(larp:LARP, local_optimum:DOW, neighbours:list, max_UIE:int,
         and it is used to set an ordering over the neighbour dows. Than,
         the erosion process excecute a local search over each neighbour
         until an improved solution is discovered, or no more dows are left.
+        Neighbours pruned by the local search are evaluated only when the
+        erosion reaches them (see evaluate).
 
         Arguments
         ---------
@@ -188,6 +375,26 @@ def erosion(larp:LARP, local_optimum:DOW, neighbours:list, max_UIE:int,
         E_list:list
         List of eroded "directions", i.e. dows which are already used for the erision process
 
+        stats:WFAStats
+        Statistics of the WFA run
+
+        skip_seen:bool
+        If True, neighbours already seen (see dow_seen) are not used to
+        start a local search
+
+        bound:NeighbourBound
+        Lower bounds of the neighbours used by the local search, optional
+
+        tabu:TabuList
+        Short-term memory of the tabu search used by the local search, optional
+
+        router:RouteSolver
+        Solver of the routes of the neighbours used by the local search, optional
+
+        fitted:dict
+        Objective values of the feasible dows evaluated lazily (see evaluate),
+        shared among the erosion calls, optional
+
         Return
         ------
         local_optimum:DOW
@@ -213,19 +420,28 @@ def erosion(larp:LARP, local_optimum:DOW, neighbours:list, max_UIE:int,
         
     '''
 
-    topology = sort_by_topology(local_optimum, neighbours)
+    stats.count('erosion_calls')
+    fitted = dict() if fitted is None else fitted
+    skip = None
+    if skip_seen:
+        skip = lambda dow: dow_seen(dow, excluded_list, discarded_list, UE_list, E_list)
+    topology = sort_by_topology(local_optimum, neighbours, skip)
     # print('neighbours topology:', topology)
 
     local_solution = None
     better_solution = False
-    i = 0
-    while i < len(topology) and not better_solution:
+    candidates = None # next neighbours of the local optimum, iterated once
+    for curr_dow in topology:
+        if not evaluate(larp, curr_dow, discarded_list, stats, fitted):
+            continue
         tentative = 0
-        curr_dow = topology[i]
         while tentative < max_UIE:
-            local_solution, local_neighbours, excluded_dows, discarded_dows = local_search(larp, curr_dow)
+            with stats.timer('local_search'):
+                local_solution, local_neighbours, excluded_dows, discarded_dows = local_search(larp, curr_dow, stats, bound, tabu, router)
             excluded_list.extend(excluded_dows)
             discarded_list.extend(discarded_dows)
+            stats.count('excluded_dows', len(excluded_dows))
+            stats.count('discarded_dows', len(discarded_dows))
             
             seen = dow_seen(local_solution, excluded_list, discarded_list, UE_list, E_list)
             # print('dow already seen?', seen)
@@ -248,8 +464,16 @@ def erosion(larp:LARP, local_optimum:DOW, neighbours:list, max_UIE:int,
             elif local_solution == local_optimum:
                 # print('local solution is the local optimum.')
                 # print('search for the best neighbour of the local optimum...')
-                curr_dow = get_next_neighbour(local_neighbours, excluded_list, 
+                # the neighbours of the local optimum are rebuilt (see
+                # Neighbourhood) only once, the search resumes where it stopped
+                if candidates is None:
+                    candidates = iter(local_neighbours)
+                curr_dow = get_next_neighbour(candidates, excluded_list, 
                         discarded_list, UE_list, E_list)
+                # a no feasible neighbour is discarded, the next one is taken
+                while curr_dow is not None and not evaluate(larp, curr_dow, discarded_list, stats, fitted):
+                    curr_dow = get_next_neighbour(candidates, excluded_list,
+                            discarded_list, UE_list, E_list)
 
                 if curr_dow is None:
                     # print('no aligible neighbour is found.')
@@ -267,13 +491,15 @@ def erosion(larp:LARP, local_optimum:DOW, neighbours:list, max_UIE:int,
                 local_solution = None # reset local_solution
                 tentative = max_UIE # stop while-loop
             tentative += 1
-        i += 1
+
+        if better_solution:
+            break
 
     if local_solution and better_solution:
         # print('continue erosion process with local solution...')
         return erosion(larp, local_solution, local_neighbours, max_UIE,
                        excluded_list, discarded_list, optimal_dows, 
-                       P0_list, UE_list, E_list)
+                       P0_list, UE_list, E_list, stats, skip_seen, bound, tabu, router, fitted)
 
     UE_list.remove(local_optimum)
     E_list.append(local_optimum)
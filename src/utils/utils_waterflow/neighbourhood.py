@@ -0,0 +1,105 @@
+import numpy as np
+
+from src.utils.utils_waterflow.dow import DOW, INDEX_DTYPE
+from src.utils.utils_waterflow.routing import RouteSolver
+
+
+def swap_move(dow:DOW, zero_idx:int, nonzero_idx:int) -> tuple:
+    '''
+        Swap move: open the closed storage zero_idx and close the open
+        storage nonzero_idx (labels from 1), the fields and the route
+        stops of nonzero_idx are moved to zero_idx.
+
+        Arguments
+        ---------
+        dow:DOW
+        A drop-of-water (dow) representing a certain solution
+
+        zero_idx:int
+        Label of the storage to open
+
+        nonzero_idx:int
+        Label of the storage to close
+
+        Return
+        ------
+        tuple
+        X, Y and Z of the neighbour dow
+    '''
+    # adjust X decision variable
+    tmp_X = dow.X.copy()
+    tmp_X[zero_idx-1] = 1
+    tmp_X[nonzero_idx-1] = 0
+
+    # adjust Y decision variable
+    tmp_Y = dow.Y.copy()
+    tmp_Y[tmp_Y == nonzero_idx] = zero_idx
+
+    # adjust Z decision variable
+    tmp_Z = dow.Z.copy()
+    tmp_Z[tmp_Z == nonzero_idx] = zero_idx
+    return tmp_X, tmp_Y, tmp_Z
+
+# move type and function applying the move to a dow
+MOVES = {'swap': swap_move}
+
+
+class Neighbourhood:
+
+    __slots__ = ('origin', 'move', 'moves', 'obj_values', 'router', 'evaluated')
+
+    def __init__(self, origin:DOW, move:str, moves:list, obj_values:list,
+                 router:RouteSolver=None, evaluated:list=None) -> None:
+        '''
+            The Neighbourhood class is a compact representation of the
+            neighbours of a dow: the dow (origin), the move type and, for
+            each neighbour, the arguments of the move and the objective value.
+            Neighbour dows are re-materialized on demand, so the memory does
+            not grow with the size of the dows.
+
+            It behaves as a read-only list of dows (len, iteration, indexing).
+
+            Arguments
+            ---------
+            origin:DOW
+            The dow the moves are applied to
+
+            move:str
+            Move type (see MOVES)
+
+            moves:list
+            List of the arguments of the move of each neighbour
+
+            obj_values:list
+            Objective value of each neighbour
+
+            router:RouteSolver
+            Solver of the routes of the neighbours, if the move is followed by
+            the computation of the routes (see route_check), optional
+
+            evaluated:list
+            For each neighbour, False if its feasibility is not checked yet
+            (see DOW.evaluated), all the neighbours are evaluated if None
+        '''
+        self.origin = origin
+        self.move = move
+        self.moves = np.array(moves, dtype=INDEX_DTYPE) # (n_neighbours, n_arguments)
+        self.obj_values = np.array(obj_values, dtype=float)
+        self.router = router
+        self.evaluated = np.ones(len(self.obj_values), dtype=bool) if evaluated is None \
+                            else np.array(evaluated, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.obj_values)
+
+    def __getitem__(self, i:int) -> DOW:
+        origin = self.origin
+        X, Y, Z = MOVES[self.move](origin, *(int(arg) for arg in self.moves[i]))
+        if self.router is not None:
+            Z, _ = self.router.solve(X, Y, Z)
+        return DOW(origin.m_storages, origin.n_fields, origin.k_vehicles, X, Y, Z,
+                   obj_value=float(self.obj_values[i]), evaluated=bool(self.evaluated[i]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -1,14 +1,17 @@
 import numpy as np
 from itertools import product
-from copy import deepcopy
 
 from src.utils.utils_waterflow.dow import DOW
 from src.larp import LARP
 from src.utils.gurobipy_utils import add_constrs, remove_constrs
-from src.utils.utils_waterflow.neighbourhood_strategies.support_functions import feasibility_check, optimality_check
+from src.utils.utils_waterflow.neighbourhood_strategies.support_functions import feasibility_check, optimality_check, prune_check, route_check
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+from src.utils.utils_waterflow.bounds import NeighbourBound
+from src.utils.utils_waterflow.routing import RouteSolver
 
 
-def opt_1(larp:LARP, dow:DOW) -> tuple:
+def opt_1(larp:LARP, dow:DOW, stats:WFAStats=NO_STATS, bound:NeighbourBound=None,
+          router:RouteSolver=None) -> tuple:
     '''
         Opt1 is a neighbourhood structure used during the local search
         algorithm to identify the list of valid neighbours of a certain
@@ -28,6 +31,17 @@ def opt_1(larp:LARP, dow:DOW) -> tuple:
         dow:DOW
         A drop-of-water (dow) representing a certain solution
 
+        stats:WFAStats
+        Statistics of the WFA run
+
+        bound:NeighbourBound
+        Lower bounds of the neighbours, the ones that cannot improve dow are not
+        evaluated but kept as unevaluated neighbours (see DOW.evaluated), optional
+
+        router:RouteSolver
+        If given, the routes of each neighbour are computed again for its X and Y
+        (see RouteSolver), instead of adjusting the routes of dow, optional
+
         Return
         ------
         local_optimum:DOW
@@ -41,26 +55,24 @@ def opt_1(larp:LARP, dow:DOW) -> tuple:
     '''
 
     # print('opt_1 | dow vector:', dow)
-    dow.to_matrix()
     larp, constrs = add_constrs(larp, dow)
-    dow.to_vector()
     
     neighbours = list()
     discarded_list = list()
     optimal_neighbours = list()
 
     for idx in range(len(dow.X)):
-        tmp_X = deepcopy(dow.X)
+        tmp_X = dow.X.copy()
         tmp_X[idx] = not dow.X[idx]
         dow_new_status_to_close = tmp_X[idx] == 0
         idx += 1 # adjust index of X to match the values in Y and Z
 
         if dow_new_status_to_close: # binary value is 0
             # change binary status to 1 (open)
-            tmp = _change_status_to_close(larp, constrs, dow, tmp_X, idx)
+            tmp = _change_status_to_close(larp, constrs, dow, tmp_X, idx, stats, bound, router)
         else: # binary value is 1
             # change binary status to 0 (close)
-            tmp = _change_status_to_open(larp, constrs, dow, tmp_X, idx)
+            tmp = _change_status_to_open(larp, constrs, dow, tmp_X, idx, stats, bound, router)
         
         good_neighbour, other_neighbours, discarded_dows = tmp
 
@@ -94,7 +106,9 @@ def opt_1(larp:LARP, dow:DOW) -> tuple:
     
     return local_optimum, dows, discarded_list
 
-def _change_status_to_close(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, idx:int) -> tuple:
+def _change_status_to_close(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, idx:int,
+                            stats:WFAStats=NO_STATS, bound:NeighbourBound=None,
+                            router:RouteSolver=None) -> tuple:
     '''
         If change status from 1 (open) to 0 (close), following routine
         is executed to adjust Y and Z attributes and generate new dows.
@@ -118,6 +132,17 @@ def _change_status_to_close(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray,
         idx:int
         Integer number representing the position of the changed binary value
 
+        stats:WFAStats
+        Statistics of the WFA run
+
+        bound:NeighbourBound
+        Lower bounds of the neighbours, the ones that cannot improve dow are not
+        evaluated but kept as unevaluated neighbours (see DOW.evaluated), optional
+
+        router:RouteSolver
+        If given, the routes of each neighbour are computed again for its X and Y
+        (see RouteSolver), instead of adjusting the routes of dow, optional
+
         Return
         ------
         local_optimum:DOW
@@ -132,19 +157,21 @@ def _change_status_to_close(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray,
 
     discarded_dows = list()
     tmp_neighbours = list()
+    unevaluated = list() # neighbours pruned by the bound
     
-    # a no-really elegant way to adjust a copy of dow.Z
-    # to match the changes from dow.X 
-    tmp_dow = deepcopy(dow)
+    # adjust copies of dow.Z and dow.Y to match the changes from dow.X
+    # (dow is immutable, arrays are cheap to copy)
+    tmp_Z = dow.Z.copy()
+    base_Y = dow.Y.copy()
 
     # adapt decision variable Z
-    unwanted_value_idx = np.nonzero(tmp_dow.Z == idx)[0]
-    if unwanted_value_idx+1 < len(tmp_dow.Z):
-        if tmp_dow.Z[unwanted_value_idx-1] == tmp_dow.Z[unwanted_value_idx+1]:
-            tmp_dow.Z = np.delete(tmp_dow.Z, unwanted_value_idx+1)
-    np.delete(tmp_dow.Z, unwanted_value_idx)
-    if tmp_dow.Z[-1] == 0:
-        tmp_dow.Z = np.delete(tmp_dow.Z, -1)
+    unwanted_value_idx = np.nonzero(tmp_Z == idx)[0]
+    if unwanted_value_idx+1 < len(tmp_Z):
+        if tmp_Z[unwanted_value_idx-1] == tmp_Z[unwanted_value_idx+1]:
+            tmp_Z = np.delete(tmp_Z, unwanted_value_idx+1)
+    np.delete(tmp_Z, unwanted_value_idx)
+    if tmp_Z[-1] == 0:
+        tmp_Z = np.delete(tmp_Z, -1)
 
     # adapt decision variable Y
     indexes_positions_of_idx = np.nonzero(dow.Y == idx)
@@ -153,18 +180,31 @@ def _change_status_to_close(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray,
     acceptable_values = uniques[acceptable_values]
 
     cartesian = product(acceptable_values, repeat=len(indexes_positions_of_idx))
+    if prune_check(bound, bound.X_bound(tmp_X, acceptable_values) if bound else None, dow, stats, 'pruned_moves'):
+        cartesian = list()
 
     for disp in cartesian:
-        tmp_dow.Y[indexes_positions_of_idx] = disp
-        tmp_Y = deepcopy(tmp_dow.Y)
+        base_Y[indexes_positions_of_idx] = disp
+        tmp_Y = base_Y.copy()
+        disp_Z = route_check(router, tmp_X, tmp_Y, tmp_Z, stats)
+        if disp_Z is None:
+            continue
+        cost = bound.cost(tmp_X, tmp_Y, disp_Z) if bound else None
+        if prune_check(bound, cost, dow, stats):
+            # not evaluated, but still a neighbour for the erosion
+            unevaluated.append(DOW(dow.m_storages, dow.n_fields, dow.k_vehicles,
+                                   tmp_X, tmp_Y, disp_Z, obj_value=cost, evaluated=False))
+            continue
         larp, constrs = feasibility_check(dow.m_storages, dow.n_fields, dow.k_vehicles, 
-                          tmp_X, tmp_Y, tmp_dow.Z, larp, constrs, 
-                          tmp_neighbours, discarded_dows)
+                          tmp_X, tmp_Y, disp_Z, larp, constrs, 
+                          tmp_neighbours, discarded_dows, stats)
 
     local_optimum, dows = optimality_check(dow, tmp_neighbours)
-    return local_optimum, dows, discarded_dows
+    return local_optimum, list(dows) + unevaluated, discarded_dows
 
-def _change_status_to_open(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, idx:int) -> tuple:
+def _change_status_to_open(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, idx:int,
+                           stats:WFAStats=NO_STATS, bound:NeighbourBound=None,
+                           router:RouteSolver=None) -> tuple:
     '''
         If change status from 0 (close) to 0 (open), following routine
         is executed to adjust Y and Z attributes and generate new dows.
@@ -188,6 +228,17 @@ def _change_status_to_open(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, i
         idx:int
         Integer number representing the position of the changed binary value
 
+        stats:WFAStats
+        Statistics of the WFA run
+
+        bound:NeighbourBound
+        Lower bounds of the neighbours, the ones that cannot improve dow are not
+        evaluated but kept as unevaluated neighbours (see DOW.evaluated), optional
+
+        router:RouteSolver
+        If given, the routes of each neighbour are computed again for its X and Y
+        (see RouteSolver), instead of adjusting the routes of dow, optional
+
         Return
         ------
         local_optimum:DOW
@@ -202,9 +253,10 @@ def _change_status_to_open(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, i
 
     discarded_dows = list()
     tmp_neighbours = list()
+    unevaluated = list() # neighbours pruned by the bound
 
     # adapt decision variable Z
-    tmp_Z = deepcopy(dow.Z)
+    tmp_Z = dow.Z.copy()
 
     if len(tmp_Z) == 0 or tmp_Z is None:
         tmp_Z = np.array([0, idx])
@@ -215,12 +267,23 @@ def _change_status_to_open(larp:LARP, constrs:dict, dow:DOW, tmp_X:np.ndarray, i
     uniques = np.unique(dow.Y)
     uniques = np.append(uniques, idx)
     cartesian = product(uniques, repeat=len(dow.Y))
+    if prune_check(bound, bound.X_bound(tmp_X, uniques) if bound else None, dow, stats, 'pruned_moves'):
+        cartesian = list()
 
     for disp in cartesian:
         tmp_Y = np.array(disp)
+        disp_Z = route_check(router, tmp_X, tmp_Y, tmp_Z, stats)
+        if disp_Z is None:
+            continue
+        cost = bound.cost(tmp_X, tmp_Y, disp_Z) if bound else None
+        if prune_check(bound, cost, dow, stats):
+            # not evaluated, but still a neighbour for the erosion
+            unevaluated.append(DOW(dow.m_storages, dow.n_fields, dow.k_vehicles,
+                                   tmp_X, tmp_Y, disp_Z, obj_value=cost, evaluated=False))
+            continue
         larp, constrs = feasibility_check(dow.m_storages, dow.n_fields, dow.k_vehicles, 
-                          tmp_X, tmp_Y, tmp_Z, larp, constrs, 
-                          tmp_neighbours, discarded_dows)
+                          tmp_X, tmp_Y, disp_Z, larp, constrs, 
+                          tmp_neighbours, discarded_dows, stats)
 
     local_optimum, dows = optimality_check(dow, tmp_neighbours)
-    return local_optimum, dows, discarded_dows
+    return local_optimum, list(dows) + unevaluated, discarded_dows
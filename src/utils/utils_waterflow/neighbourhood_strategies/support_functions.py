@@ -5,10 +5,14 @@ from src.larp import LARP
 from src.utils.gurobipy_utils import (fit, 
                                       add_constrs, 
                                       modify_rhs_constrs)
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+from src.utils.utils_waterflow.bounds import NeighbourBound
+from src.utils.utils_waterflow.routing import RouteSolver
 
 def feasibility_check(m_storages:int, n_fields:int, k_vehicles:int, 
                        tmp_X:np.array, tmp_Y:np.array, tmp_Z:np.array, 
-                       larp:LARP, constrs:dict, tmp_neighbours:list, discarded_dows:list) -> None:
+                       larp:LARP, constrs:dict, tmp_neighbours:list, discarded_dows:list,
+                       stats:WFAStats=NO_STATS) -> None:
     '''
     This is a suppot function used to create a new dow solution 
     and check if this solution is feasible.
@@ -44,18 +48,16 @@ def feasibility_check(m_storages:int, n_fields:int, k_vehicles:int,
     
     discarded_dows:list
     List if discarded dows since they are not feasible
+
+    stats:WFAStats
+    Statistics of the WFA run
     
     Return
     ------
     None
     '''
 
-    neighbour_dow = DOW(m_storages, n_fields, k_vehicles)
-    neighbour_dow.X = tmp_X
-    neighbour_dow.Y = tmp_Y
-    neighbour_dow.Z = tmp_Z
-
-    neighbour_dow.to_matrix()
+    neighbour_dow = DOW(m_storages, n_fields, k_vehicles, tmp_X, tmp_Y, tmp_Z)
     # print('neighbour dow:', neighbour_dow)
 
     if len(constrs) != 0:
@@ -66,11 +68,9 @@ def feasibility_check(m_storages:int, n_fields:int, k_vehicles:int,
         larp, constrs = add_constrs(larp, neighbour_dow)
 
     # print('fitting LARP model...')
-    larp, is_fit = fit(larp, neighbour_dow)
+    larp, is_fit = fit(larp, neighbour_dow, stats)
     # print('fitting completed')
 
-    neighbour_dow.to_vector()
-
     if is_fit:
         # print('neighbour dow is FEASIBLE')
         tmp_neighbours.append([neighbour_dow, neighbour_dow.obj_value])
@@ -80,6 +80,76 @@ def feasibility_check(m_storages:int, n_fields:int, k_vehicles:int,
     
     return larp, constrs
     
+def prune_check(bound:NeighbourBound, value:float, dow:DOW, stats:WFAStats=NO_STATS,
+                counter:str='pruned_neighbours') -> bool:
+    '''
+        This is a support function to skip the evaluation of neighbours
+        that cannot improve the given dow (see NeighbourBound).
+
+        Arguments
+        ---------
+        bound:NeighbourBound
+        Lower bounds of the neighbours, no neighbour is pruned if None
+
+        value:float
+        Lower bound of the neighbour(s)
+
+        dow:DOW
+        A drop-of-water (dow) rapresenting the incumbent solution
+
+        stats:WFAStats
+        Statistics of the WFA run, pruned neighbours are counted
+
+        counter:str
+        Name of the counter
+
+        Return
+        ------
+        bool
+        True if the neighbour(s) can be skipped, False otherwise
+    '''
+    if bound is None or not bound.prune(value, dow.obj_value):
+        return False
+    stats.count(counter)
+    return True
+
+def route_check(router:RouteSolver, tmp_X:np.ndarray, tmp_Y:np.ndarray, tmp_Z:np.ndarray,
+                stats:WFAStats=NO_STATS) -> np.ndarray:
+    '''
+        This is a support function to compute the routes of a neighbour
+        for its X and Y, instead of the routes adjusted from the dow.
+
+        Arguments
+        ---------
+        router:RouteSolver
+        Solver of the routes, the adjusted routes are kept if None
+
+        tmp_X:np.ndarray
+        Temporary X decision variable of the neighbour
+
+        tmp_Y:np.ndarray
+        Temporary Y decision variable of the neighbour
+
+        tmp_Z:np.ndarray
+        Temporary Z decision variable of the neighbour, adjusted from the dow
+
+        stats:WFAStats
+        Statistics of the WFA run, neighbours without feasible routes are counted
+
+        Return
+        ------
+        tmp_Z:np.ndarray
+        Routes of the neighbour, the adjusted ones if the heuristic of the
+        router finds no routes (see RouteSolver.solve), None if no feasible
+        routes exist
+    '''
+    if router is None:
+        return tmp_Z
+    tmp_Z, _ = router.solve(tmp_X, tmp_Y, tmp_Z)
+    if tmp_Z is None:
+        stats.count('unroutable_neighbours')
+    return tmp_Z
+
 def optimality_check(dow:DOW, neighbours:list) -> tuple:
     '''
         This is a support function to determine the local optimum.
@@ -114,7 +184,6 @@ def optimality_check(dow:DOW, neighbours:list) -> tuple:
     if dow.obj_value <= candidate.obj_value:
         # print('local optimum is dow!')
         local_optimum = dow
-        local_optimum.to_vector()
     else:
         # print('local optimum is candidate!')
         local_optimum = candidate
@@ -1,14 +1,18 @@
 import numpy as np
 from itertools import product
-from copy import deepcopy
 
 from src.utils.utils_waterflow.dow import DOW
 from src.larp import LARP
 from src.utils.gurobipy_utils import remove_constrs
-from src.utils.utils_waterflow.neighbourhood_strategies.support_functions import feasibility_check, optimality_check
+from src.utils.utils_waterflow.neighbourhood_strategies.support_functions import feasibility_check, optimality_check, prune_check, route_check
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+from src.utils.utils_waterflow.bounds import NeighbourBound
+from src.utils.utils_waterflow.routing import RouteSolver
+from src.utils.utils_waterflow.neighbourhood import Neighbourhood, swap_move
 
 
-def swap(larp:LARP, dow:DOW) -> tuple:
+def swap(larp:LARP, dow:DOW, stats:WFAStats=NO_STATS, bound:NeighbourBound=None,
+         router:RouteSolver=None) -> tuple:
     '''
         Swap is a neighbourhood structure used during the local search
         algorithm to identify the list of valid neighbours of a certain
@@ -28,22 +32,36 @@ def swap(larp:LARP, dow:DOW) -> tuple:
         dow:DOW
         A drop-of-water (dow) representing a certain solution
 
+        stats:WFAStats
+        Statistics of the WFA run
+
+        bound:NeighbourBound
+        Lower bounds of the neighbours, the ones that cannot improve dow are not
+        evaluated but kept as unevaluated neighbours (see DOW.evaluated), optional
+
+        router:RouteSolver
+        If given, the routes of each neighbour are computed again for its X and Y
+        (see RouteSolver), instead of adjusting the routes of dow, optional
+
         Return
         ------
         local_optimum:DOW
         An improved solution
 
-        dows:list
-        List of neighbours drop-of-waters (dows) for local optimum
+        dows:Neighbourhood
+        Feasible (and unevaluated) neighbours drop-of-waters (dows) of dow
+        (compact, see Neighbourhood)
 
         discarded_dows:list
         List of no feasible solutions
     '''
 
-    dow.to_vector()
     # print('dow:', dow)
 
     neighbours = list()
+    moves = list() # swap of each feasible (or unevaluated) neighbour
+    obj_values = list()
+    evaluated = list()
     discarded_dows = list()
     constrs = dict()
 
@@ -51,7 +69,7 @@ def swap(larp:LARP, dow:DOW) -> tuple:
     X_idx_nonzeros = np.nonzero(dow.X)[0]
 
     if len(X_idx_zeros) == 0 or len(X_idx_nonzeros) == 0:
-        return dow, list(), discarded_dows
+        return dow, Neighbourhood(dow, 'swap', moves, list(), router), discarded_dows
     
     cartesian = product(X_idx_zeros, X_idx_nonzeros)
     for zero_idx, nonzero_idx in cartesian:
@@ -60,29 +78,33 @@ def swap(larp:LARP, dow:DOW) -> tuple:
         nonzero_idx += 1
         # print('zero_idx:', zero_idx, 'nonzero_idx:', nonzero_idx)
 
-        # adjust X decision variable
-        tmp_X = deepcopy(dow.X)
-        tmp_X[zero_idx-1] = 1
-        tmp_X[nonzero_idx-1] = 0
-
-        # adjust Y decision variable
-        tmp_Y = deepcopy(dow.Y)
-        reassign_indexes = np.nonzero(tmp_Y == nonzero_idx)[0]
-        tmp_Y[reassign_indexes] = zero_idx
-        # print('tmp_Y:', tmp_Y)
-
-        # adjust Z decision variable
-        tmp_Z = deepcopy(dow.Z)
-        reassign_indexes = np.nonzero(tmp_Z == nonzero_idx)[0]
-        tmp_Z[reassign_indexes] = zero_idx
-        # print('tmp_Z:', tmp_Z)
-
+        # adjust X, Y and Z decision variables
+        tmp_X, tmp_Y, tmp_Z = swap_move(dow, zero_idx, nonzero_idx)
+        tmp_Z = route_check(router, tmp_X, tmp_Y, tmp_Z, stats)
+        if tmp_Z is None:
+            continue
+        cost = bound.cost(tmp_X, tmp_Y, tmp_Z) if bound else None
+        if prune_check(bound, cost, dow, stats):
+            # not evaluated, but still a neighbour for the erosion
+            moves.append((zero_idx, nonzero_idx))
+            obj_values.append(cost)
+            evaluated.append(False)
+            continue
+
+        n_neighbours = len(neighbours)
         larp, constrs = feasibility_check(dow.m_storages, dow.n_fields, dow.k_vehicles, 
                           tmp_X, tmp_Y, tmp_Z, larp, constrs, 
-                          neighbours, discarded_dows)
+                          neighbours, discarded_dows, stats)
+        if len(neighbours) > n_neighbours: # feasible neighbour
+            moves.append((zero_idx, nonzero_idx))
+            obj_values.append(neighbours[-1][1])
+            evaluated.append(True)
 
     # print('neighbours:', neighbours)
     larp = remove_constrs(larp, constrs)
     
-    local_optimum, dows = optimality_check(dow, neighbours)
+    local_optimum, _ = optimality_check(dow, neighbours)
+
+    # feasible and unevaluated neighbours are kept as swaps of dow
+    dows = Neighbourhood(dow, 'swap', moves, obj_values, router, evaluated)
     return local_optimum, dows, discarded_dows
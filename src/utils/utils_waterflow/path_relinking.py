@@ -0,0 +1,283 @@
+from itertools import combinations
+import numpy as np
+
+from src.larp import LARP
+from src.utils.utils_waterflow.dow import DOW
+from src.utils.gurobipy_utils import add_constrs, remove_constrs
+from src.utils.utils_waterflow.neighbourhood import swap_move
+from src.utils.utils_waterflow.neighbourhood_strategies.support_functions import feasibility_check
+from src.utils.utils_waterflow.bounds import NeighbourBound
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+
+
+def dow_distance(dow:DOW, other:DOW) -> int:
+    '''
+        Distance between two dows: number of storages with a different
+        status (X) plus number of fields assigned to a different storage (Y).
+    '''
+    return int(np.count_nonzero(dow.X != other.X) + np.count_nonzero(dow.Y != other.Y))
+
+
+class ElitePool:
+
+    def __init__(self, size:int=10, min_distance:int=2) -> None:
+        '''
+            The ElitePool class keeps the best dows found, at most size,
+            and at least min_distance (see dow_distance) one from the other:
+            a dow too close to an elite dow replaces it only if better,
+            otherwise, with a full pool, it replaces the worst elite dow
+            only if better.
+
+            Arguments
+            ---------
+            size:int
+            Integer number of maximum elite dows
+
+            min_distance:int
+            Integer number of minimum distance between two elite dows
+        '''
+        self.size = size
+        self.min_distance = min_distance
+        self.dows = list()
+
+    def add(self, dow:DOW) -> bool:
+        '''
+            Add a dow to the pool, if it is good and diverse enough.
+
+            Return
+            ------
+            bool
+            True if the dow is added, False otherwise
+        '''
+        if dow is None or dow in self.dows:
+            return False
+
+        if self.dows:
+            distances = [dow_distance(dow, elite) for elite in self.dows]
+            closest = distances.index(min(distances))
+            if distances[closest] < self.min_distance:
+                if dow.obj_value < self.dows[closest].obj_value:
+                    self.dows[closest] = dow
+                    return True
+                return False
+
+        if len(self.dows) < self.size:
+            self.dows.append(dow)
+            return True
+
+        worst = self.worst()
+        if dow.obj_value < worst.obj_value:
+            self.dows[self.dows.index(worst)] = dow
+            return True
+        return False
+
+    def best(self) -> DOW:
+        return min(self.dows, key=lambda dow: dow.obj_value) if self.dows else None
+
+    def worst(self) -> DOW:
+        return max(self.dows, key=lambda dow: dow.obj_value) if self.dows else None
+
+    def pairs(self) -> list:
+        '''
+            Pairs of elite dows (initiating, guiding), the guiding dow is
+            the better one.
+        '''
+        return [(a, b) if a.obj_value >= b.obj_value else (b, a)
+                for a, b in combinations(self.dows, 2)]
+
+    def __len__(self) -> int:
+        return len(self.dows)
+
+
+def _remove_stop(Z:np.ndarray, label:int) -> np.ndarray:
+    # remove a storage from the routes, without empty routes
+    Z = Z[Z != label]
+    keep = np.ones(len(Z), dtype=bool)
+    keep[:-1] = ~((Z[:-1] == 0) & (Z[1:] == 0))
+    if len(Z) and Z[-1] == 0:
+        keep[-1] = False
+    return Z[keep]
+
+def relinking_moves(dow:DOW, guide:DOW) -> list:
+    '''
+        Moves from dow towards guide, as (X, Y, Z) of the intermediate
+        solutions (storage labels from 1):
+          - open a storage open in guide, with the fields guide assigns to it;
+          - close a storage closed in guide, its fields are assigned as in
+            guide (only if the storages are open);
+          - swap a storage open in guide with a storage closed in guide
+            (see swap_move);
+          - reassign a field as in guide (only if the storage is open).
+
+        Arguments
+        ---------
+        dow:DOW
+        A drop-of-water (dow), the current solution
+
+        guide:DOW
+        A drop-of-water (dow), the guiding solution
+
+        Return
+        ------
+        list
+        List of (X, Y, Z) of the intermediate solutions
+    '''
+    X, Y, Z = dow.X, dow.Y, dow.Z
+    to_open = np.nonzero(guide.X > X)[0] + 1
+    to_close = np.nonzero(guide.X < X)[0] + 1
+
+    moves = list()
+    for idx in to_open:
+        tmp_X = X.copy()
+        tmp_X[idx-1] = 1
+        tmp_Y = np.where(guide.Y == idx, idx, Y)
+        moves.append((tmp_X, tmp_Y, np.append(Z, idx) if len(Z) else np.array([0, idx])))
+
+    for idx in to_close:
+        tmp_X = X.copy()
+        tmp_X[idx-1] = 0
+        fields = Y == idx
+        if not tmp_X[guide.Y[fields].astype(np.intp)-1].all():
+            continue
+        tmp_Y = np.where(fields, guide.Y, Y)
+        moves.append((tmp_X, tmp_Y, _remove_stop(Z, idx)))
+
+    for zero_idx in to_open:
+        for nonzero_idx in to_close:
+            moves.append(swap_move(dow, int(zero_idx), int(nonzero_idx)))
+
+    for i in np.nonzero(Y != guide.Y)[0]:
+        if X[guide.Y[i]-1]:
+            tmp_Y = Y.copy()
+            tmp_Y[i] = guide.Y[i]
+            moves.append((X, tmp_Y, Z))
+
+    return moves
+
+def path_relinking(larp:LARP, dow:DOW, guide:DOW, bound:NeighbourBound=None,
+                   stats:WFAStats=NO_STATS) -> tuple:
+    '''
+        Path relinking from dow to guide: at each step the search moves to
+        the best feasible intermediate solution closer to guide (see
+        relinking_moves), until guide is reached or no move is feasible.
+        Intermediate solutions are evaluated incrementally: the exact
+        objective of a fixed solution (see NeighbourBound.cost) ranks the
+        moves and the LARP model only checks the feasibility of the best
+        ones, reusing the same fixing constraints.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model
+
+        dow:DOW
+        A drop-of-water (dow), the initiating solution
+
+        guide:DOW
+        A drop-of-water (dow), the guiding solution
+
+        bound:NeighbourBound
+        Objective of the fixed solutions, computed from larp if None
+
+        stats:WFAStats
+        Statistics of the WFA run
+
+        Return
+        ------
+        best:DOW
+        Best intermediate solution, None if no intermediate solution is feasible
+
+        dows:list
+        List of the feasible intermediate solutions
+
+        discarded_dows:list
+        List of no feasible solutions
+    '''
+    bound = NeighbourBound(larp) if bound is None else bound
+    larp, constrs = add_constrs(larp, dow)
+
+    dows = list()
+    discarded_dows = list()
+    current = dow
+    distance = dow_distance(dow, guide)
+
+    stats.count('relinking_paths')
+    while distance > 0:
+        candidates = list()
+        for tmp_X, tmp_Y, tmp_Z in relinking_moves(current, guide):
+            candidate = DOW(dow.m_storages, dow.n_fields, dow.k_vehicles, tmp_X, tmp_Y, tmp_Z)
+            candidate_distance = dow_distance(candidate, guide)
+            if candidate_distance < distance:
+                candidates.append((bound.cost(tmp_X, tmp_Y, tmp_Z), candidate_distance, tmp_X, tmp_Y, tmp_Z))
+        candidates.sort(key=lambda candidate: candidate[:2])
+
+        step = None
+        for _, candidate_distance, tmp_X, tmp_Y, tmp_Z in candidates:
+            feasible = list()
+            larp, constrs = feasibility_check(dow.m_storages, dow.n_fields, dow.k_vehicles,
+                                              tmp_X, tmp_Y, tmp_Z, larp, constrs,
+                                              feasible, discarded_dows, stats)
+            if feasible:
+                step = feasible[0][0]
+                break
+        if step is None:
+            break
+
+        stats.count('relinking_steps')
+        current, distance = step, candidate_distance
+        if distance > 0:
+            dows.append(current)
+
+    larp = remove_constrs(larp, constrs)
+
+    best = min(dows, key=lambda dow: dow.obj_value) if dows else None
+    return best, dows, discarded_dows
+
+def relink_elite(larp:LARP, dows:list, pool_size:int=10, min_distance:int=2,
+                 stats:WFAStats=NO_STATS) -> DOW:
+    '''
+        Path relinking phase: the given dows (e.g. the P0 solutions of the
+        WFA) fill an elite pool (see ElitePool), then the path between each
+        pair of elite dows is explored (see path_relinking), from the worse
+        to the better one. The best intermediate solutions enter the pool,
+        the new pairs are explored until no solution enters the pool.
+
+        Arguments
+        ---------
+        larp:LARP
+        An instance of the LARP model
+
+        dows:list
+        List of dows
+
+        pool_size:int
+        Integer number of maximum elite dows
+
+        min_distance:int
+        Integer number of minimum distance between two elite dows
+
+        stats:WFAStats
+        Statistics of the WFA run
+
+        Return
+        ------
+        best:DOW
+        Best elite dow, None if no dow is given
+    '''
+    pool = ElitePool(pool_size, min_distance)
+    for dow in sorted(dows, key=lambda dow: dow.obj_value):
+        pool.add(dow)
+
+    bound = NeighbourBound(larp)
+    relinked = set()
+    while True:
+        pairs = [pair for pair in pool.pairs() if pair not in relinked]
+        if not pairs:
+            break
+        for initiating, guiding in pairs:
+            relinked.add((initiating, guiding))
+            best, _, _ = path_relinking(larp, initiating, guiding, bound, stats)
+            if best is not None and best.obj_value < guiding.obj_value and pool.add(best):
+                stats.count('relinking_improvements')
+
+    return pool.best()
@@ -0,0 +1,297 @@
+from collections import OrderedDict
+import numpy as np
+
+from src.larp import LARP
+
+
+class RouteSolver:
+
+    def __init__(self, larp:LARP, exact_limit:int=8, cache_size:int=4096) -> None:
+        '''
+            The RouteSolver class computes the routes (Z) of the LARP model
+            for given open storages (X) and assignments of the fields (Y):
+            exactly k_vehicles routes start and end at the facility, each open
+            storage is visited once, and the load of each route does not
+            exceed the vehicle capacity.
+
+            As in the LARP model (subtour elimination with integer T), each
+            storage loads ceil(demand/k_vehicles) of the fields assigned to it,
+            so the load of a route does not depend on the order of the visits.
+
+            Routes are optimal for at most exact_limit open storages (Held-Karp
+            dynamic programming for the routes, exact partition of the storages
+            in k_vehicles routes); otherwise routes are built with the savings
+            heuristic (Clarke and Wright), repaired if needed (merge of any two
+            routes, then first-fit decreasing packing of the storages in
+            k_vehicles routes) and improved with a local search (relocate
+            among routes and 2-opt).
+
+            Arguments
+            ---------
+            larp:LARP
+            An instance of the LARP model
+
+            exact_limit:int
+            Integer number of maximum open storages for the exact solver
+
+            cache_size:int
+            Integer number of routes kept in memory
+        '''
+        arrays = larp.get_arrays()
+        self.m_storages = larp.m_storages
+        self.k_vehicles = larp._k_vehicles
+        self.capacity = larp._Q_vehicle_capacity
+        self.exact_limit = exact_limit
+        self.demand = arrays['demand']
+        self.dist = arrays['fs_dist'] # facility as last row/column
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def solve(self, X:np.ndarray, Y:np.ndarray, Z:np.ndarray=None) -> tuple:
+        '''
+            Routes for the given open storages and assignments.
+
+            Above exact_limit open storages, the heuristics may not find
+            routes that exist: the given Z (e.g. the routes adjusted from
+            the current solution) is returned instead, if any.
+
+            Arguments
+            ---------
+            X:np.ndarray
+            Binary vector of the open storages
+
+            Y:np.ndarray
+            Storage (from 1) assigned to each field
+
+            Z:np.ndarray
+            Routes used if the heuristics find no routes, optional
+
+            Return
+            ------
+            Z:np.ndarray
+            Routes as a sequence of storages, each route starting from the
+            facility (0); None if no feasible routes exist (proved by the
+            capacities or by the exact solver), or if the heuristics find no
+            routes and Z is not given
+
+            cost:float
+            Routing cost, inf if Z is None
+        '''
+        stops = np.nonzero(X)[0]
+        loads = np.bincount(np.asarray(Y, dtype=np.intp)-1, weights=self.demand, minlength=self.m_storages)
+        weights = np.ceil(loads[stops]/self.k_vehicles - 1e-9)
+
+        key = (stops.tobytes(), weights.tobytes())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            result = self._cache[key]
+        else:
+            result = self._solve(stops, weights)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if result is None: # no routes found by the heuristics
+            if Z is None:
+                return None, np.inf
+            path = np.append(Z, 0).astype(np.intp)
+            path = np.where(path == 0, self.m_storages+1, path)-1 # facility as last row/column
+            return Z, float(self.dist[path[:-1], path[1:]].sum())
+        return result
+
+    def _solve(self, stops:np.ndarray, weights:np.ndarray) -> tuple:
+        # (Z, cost), (None, inf) if no feasible routes exist,
+        # None if the heuristics find no routes
+        if len(stops) < self.k_vehicles or (weights > self.capacity).any() or \
+                weights.sum() > self.k_vehicles*self.capacity:
+            return (None, np.inf)
+        if len(stops) <= self.exact_limit:
+            routes = self._exact(stops, weights)
+            if routes is None:
+                return (None, np.inf)
+        else:
+            routes = self._savings(stops, weights)
+            if routes is None:
+                routes = self._pack(stops, weights)
+            if routes is None:
+                return None
+            routes = self._improve(routes, weights, stops)
+
+        Z = np.array([label for route in routes for label in [0, *(stop+1 for stop in route)]])
+        return (Z, sum(self._route_cost(route) for route in routes))
+
+    def _route_cost(self, route:list) -> float:
+        # cost of a route from and to the facility (storages from 0)
+        path = [self.m_storages, *route, self.m_storages]
+        return float(self.dist[path[:-1], path[1:]].sum())
+
+    def _exact(self, stops:np.ndarray, weights:np.ndarray) -> list:
+        # Held-Karp: best path from the facility visiting the storages of
+        # each subset (mask), then best partition in k_vehicles routes
+        s, facility = len(stops), self.m_storages
+        full = (1 << s) - 1
+        dist = self.dist
+
+        path = np.full((1 << s, s), np.inf)
+        parent = np.full((1 << s, s), -1, dtype=np.intp)
+        for j in range(s):
+            path[1 << j, j] = dist[facility, stops[j]]
+        for mask in range(1, full+1):
+            for j in range(s):
+                if not mask & (1 << j) or path[mask, j] == np.inf:
+                    continue
+                for h in range(s):
+                    if mask & (1 << h):
+                        continue
+                    cost = path[mask, j] + dist[stops[j], stops[h]]
+                    if cost < path[mask | (1 << h), h]:
+                        path[mask | (1 << h), h] = cost
+                        parent[mask | (1 << h), h] = j
+
+        closing = dist[stops, facility]
+        route_cost = (path + closing).min(axis=1)
+        route_last = (path + closing).argmin(axis=1)
+        load = np.array([weights[[j for j in range(s) if mask & (1 << j)]].sum() for mask in range(1 << s)])
+        route_cost[load > self.capacity] = np.inf
+        route_cost[0] = np.inf
+
+        # best[c][mask]: minimum cost of c routes visiting the storages of mask
+        best = np.full((self.k_vehicles+1, 1 << s), np.inf)
+        choice = np.zeros((self.k_vehicles+1, 1 << s), dtype=np.intp)
+        best[0, 0] = 0.0
+        for c in range(1, self.k_vehicles+1):
+            for mask in range(1, full+1):
+                low = mask & -mask
+                rest = mask ^ low
+                sub = rest
+                while True:
+                    route = sub | low
+                    cost = route_cost[route] + best[c-1, mask ^ route]
+                    if cost < best[c, mask]:
+                        best[c, mask], choice[c, mask] = cost, route
+                    if sub == 0:
+                        break
+                    sub = (sub - 1) & rest
+
+        if best[self.k_vehicles, full] == np.inf:
+            return None
+
+        routes, mask = list(), full
+        for c in range(self.k_vehicles, 0, -1):
+            route_mask = choice[c, mask]
+            route, j = list(), route_last[route_mask]
+            sub = route_mask
+            while j != -1:
+                route.append(stops[j])
+                sub, j = sub ^ (1 << j), parent[sub, j]
+            routes.append(route[::-1])
+            mask ^= route_mask
+        return routes
+
+    def _savings(self, stops:np.ndarray, weights:np.ndarray) -> list:
+        # Clarke and Wright savings: merge the routes (end of a route to the
+        # start of another one) by decreasing saving, until k_vehicles routes;
+        # then, if needed, the cheapest merge of any two routes (also reversed)
+        facility = self.m_storages
+        dist = self.dist
+        routes = {j: [j] for j in range(len(stops))}
+        route_of = list(range(len(stops)))
+        load = {j: weights[j] for j in range(len(stops))}
+
+        i, j = np.meshgrid(np.arange(len(stops)), np.arange(len(stops)), indexing='ij')
+        savings = dist[stops[i], facility] + dist[facility, stops[j]] - dist[stops[i], stops[j]]
+        savings[i == j] = -np.inf
+        order = np.argsort(-savings, axis=None, kind='stable')
+
+        for pos in order:
+            if len(routes) == self.k_vehicles:
+                break
+            a, b = divmod(int(pos), len(stops))
+            ra, rb = route_of[a], route_of[b]
+            if ra == rb or routes[ra][-1] != a or routes[rb][0] != b or load[ra] + load[rb] > self.capacity:
+                continue
+            routes[ra].extend(routes.pop(rb))
+            load[ra] += load.pop(rb)
+            for stop in routes[ra]:
+                route_of[stop] = ra
+
+        routes = [[stops[j] for j in route] for route in routes.values()]
+        weight = dict(zip(stops, weights))
+        while len(routes) > self.k_vehicles:
+            best = None
+            for a in range(len(routes)):
+                for b in range(len(routes)):
+                    if a == b or sum(weight[stop] for stop in routes[a]+routes[b]) > self.capacity:
+                        continue
+                    for merged in (routes[a]+routes[b], routes[a]+routes[b][::-1]):
+                        cost = self._route_cost(merged) - self._route_cost(routes[a]) - self._route_cost(routes[b])
+                        if best is None or cost < best[0]:
+                            best = (cost, a, b, merged)
+            if best is None:
+                return None
+            _, a, b, merged = best
+            routes = [route for r, route in enumerate(routes) if r not in (a, b)] + [merged]
+        return routes
+
+    def _pack(self, stops:np.ndarray, weights:np.ndarray) -> list:
+        # first-fit decreasing packing of the storages in k_vehicles routes,
+        # empty routes take a storage from the others, the storages of a
+        # route are visited in nearest neighbour order
+        routes = [list() for _ in range(self.k_vehicles)]
+        load = np.zeros(self.k_vehicles)
+        for j in np.argsort(-weights, kind='stable'):
+            fit = np.nonzero(load + weights[j] <= self.capacity)[0]
+            if len(fit) == 0:
+                return None
+            routes[fit[0]].append(stops[j])
+            load[fit[0]] += weights[j]
+
+        for route in routes:
+            if not route:
+                donor = max(routes, key=len)
+                route.append(donor.pop())
+
+        ordered = list()
+        for route in routes:
+            path, last = list(), self.m_storages
+            while route:
+                nearest = min(route, key=lambda stop: self.dist[last, stop])
+                route.remove(nearest)
+                path.append(nearest)
+                last = nearest
+            ordered.append(path)
+        return ordered
+
+    def _improve(self, routes:list, weights:np.ndarray, stops:np.ndarray) -> list:
+        # local search: relocate a storage to another route/position and
+        # reverse a segment of a route (2-opt), first improvement
+        weight = dict(zip(stops, weights))
+        improved = True
+        while improved:
+            improved = False
+            for r, route in enumerate(routes):
+                for a in range(len(route)):
+                    for b in range(a+2, len(route)+1):
+                        candidate = route[:a] + route[a:b][::-1] + route[b:]
+                        if self._route_cost(candidate) < self._route_cost(route) - 1e-9:
+                            routes[r] = route = candidate
+                            improved = True
+
+            for r, route in enumerate(routes):
+                for stop in list(route):
+                    if len(route) == 1:
+                        break
+                    removed = [other for other in route if other != stop]
+                    gain = self._route_cost(route) - self._route_cost(removed)
+                    for t, target in enumerate(routes):
+                        if t == r or sum(weight[other] for other in target) + weight[stop] > self.capacity:
+                            continue
+                        for pos in range(len(target)+1):
+                            inserted = target[:pos] + [stop] + target[pos:]
+                            if self._route_cost(inserted) - self._route_cost(target) < gain - 1e-9:
+                                routes[r], routes[t] = route, target = removed, inserted
+                                improved = True
+                                break
+                        if route is removed:
+                            break
+        return routes
@@ -0,0 +1,121 @@
+import math
+import hashlib
+
+from src.utils.utils_waterflow.dow import DOW
+
+
+# kinds of seen set (see make_seen_set)
+KINDS = ('exact', 'bloom')
+
+
+class ExactSet(set):
+    '''
+        Exact seen set of dows (hash set), with the list methods used by the
+        WFA (append and extend); memory grows with the number of dows.
+    '''
+
+    def append(self, dow:DOW) -> None:
+        self.add(dow)
+
+    def extend(self, dows) -> None:
+        self.update(dows)
+
+    @property
+    def fill_ratio(self) -> float:
+        return None
+
+
+class BloomFilter:
+
+    def __init__(self, capacity:int=1_000_000, error_rate:float=1e-3) -> None:
+        '''
+            The BloomFilter class is an approximate seen set of dows: memory
+            is fixed and membership queries are O(1), a dow never added may
+            be reported as seen (false positive), an added dow is always seen.
+            With more than capacity dows the false positive rate grows beyond
+            error_rate (see fill_ratio).
+
+            Arguments
+            ---------
+            capacity:int
+            Integer number of dows expected in the set
+
+            error_rate:float
+            False positive rate with capacity dows in the set
+        '''
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.n_bits = max(8, math.ceil(-capacity*math.log(error_rate)/math.log(2)**2))
+        self.n_hashes = max(1, round(self.n_bits/capacity*math.log(2)))
+        self._bits = bytearray((self.n_bits+7)//8)
+        self._n_items = 0
+        self._n_ones = 0
+
+    def _positions(self, dow:DOW) -> list:
+        # double hashing of a stable digest of the dow
+        digest = hashlib.blake2b(dow.key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i*h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def append(self, dow:DOW) -> None:
+        bits = self._bits
+        for pos in self._positions(dow):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                self._n_ones += 1
+        self._n_items += 1
+
+    def extend(self, dows) -> None:
+        for dow in dows:
+            self.append(dow)
+
+    def __contains__(self, dow:DOW) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(dow))
+
+    def __len__(self) -> int:
+        # number of added dows, duplicates included
+        return self._n_items
+
+    @property
+    def fill_ratio(self) -> float:
+        '''
+            Fraction of bits set, the false positive rate is about
+            fill_ratio**n_hashes.
+        '''
+        return self._n_ones/self.n_bits
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+def make_seen_set(kind:str='exact', capacity:int=1_000_000, error_rate:float=1e-3):
+    '''
+        Return an empty seen set of dows, used by the WFA for the
+        discarded and excluded dows.
+
+        Arguments
+        ---------
+        kind:str
+        'exact' for a hash set (exact, unbounded memory) or 'bloom' for
+        a Bloom filter (approximate, fixed memory)
+
+        capacity:int
+        Integer number of dows expected in the set, only for 'bloom'
+
+        error_rate:float
+        False positive rate with capacity dows in the set, only for 'bloom'
+
+        Return
+        ------
+        ExactSet or BloomFilter
+        The seen set
+    '''
+    if kind == 'exact':
+        return ExactSet()
+    if kind == 'bloom':
+        return BloomFilter(capacity, error_rate)
+    raise ValueError(f'unknown seen set: {kind} (expected one of {KINDS})')
@@ -1,11 +1,74 @@
+import heapq
+
 from src.utils.utils_waterflow.dow import DOW
+from src.utils.utils_waterflow.neighbourhood import Neighbourhood
+
+
+class Topology:
+
+    def __init__(self, local_optimum:DOW, neighbours, skip=None) -> None:
+        '''
+            The Topology class is a lazy priority queue over the neighbours
+            of a local optimum, ordered by the topology parameter, i.e. the
+            difference between the objective value of each neighbour and the
+            one of the local optimum (ties in the original order).
+
+            The queue is built in O(n) (heapify of the differences) and each
+            neighbour is popped in O(log n), only when needed: neighbours are
+            neither fully sorted nor copied, and the ones of a Neighbourhood
+            are materialized only when popped.
+
+            Arguments
+            ---------
+            local_optimum:DOW
+            A drop-of-water (dow) representing a local optimum position
+
+            neighbours:list or Neighbourhood
+            Neighbours solution of the local optimum
+
+            skip:function
+            Predicate of the neighbours to skip when popped, e.g. already
+            seen dows, optional
+        '''
+        if isinstance(neighbours, Neighbourhood):
+            diff_obj_vals = (neighbours.obj_values - local_optimum.obj_value).tolist()
+        else:
+            diff_obj_vals = [dow.obj_value - local_optimum.obj_value for dow in neighbours]
 
+        self._heap = [(diff, i) for i, diff in enumerate(diff_obj_vals)]
+        heapq.heapify(self._heap)
+        self._neighbours = neighbours
+        self._skip = skip
 
-def sort_by_topology(local_optimum:DOW, neighbours:list) -> list:
+    def pop(self) -> DOW:
+        '''
+            Return the next best neighbour (not skipped), None if no
+            neighbour is left.
+        '''
+        while self._heap:
+            _, i = heapq.heappop(self._heap)
+            dow = self._neighbours[i]
+            if self._skip is None or not self._skip(dow):
+                return dow
+        return None
+
+    def __iter__(self):
+        while True:
+            dow = self.pop()
+            if dow is None:
+                return
+            yield dow
+
+    def __len__(self) -> int:
+        # neighbours left, skipped ones included
+        return len(self._heap)
+
+
+def sort_by_topology(local_optimum:DOW, neighbours, skip=None) -> Topology:
     '''
         Compute the topology parameter for the given local optimum; a
         topology parameters is represented by a list of differences between
-        the local optimum objective function and the objective function of 
+        the local optimum objective function and the objective function of
         each neighbours solution (other dows).
 
         Arguments
@@ -13,23 +76,16 @@ def sort_by_topology(local_optimum:DOW, neighbours:list) -> list:
         local_optimum:DOW
         A drop-of-water (dow) representing a local optimum position
 
-        neighbours:list
+        neighbours:list or Neighbourhood
         List of neighbours solution of the local optimum
 
+        skip:function
+        Predicate of the neighbours to skip, e.g. already seen dows, optional
+
         Return
         ------
-        topology:list
-        Topology parameter for the local optimum
+        topology:Topology
+        Neighbours ordered by the topology parameter, lazily (see Topology)
     '''
 
-    diff_obj_vals = [dow.obj_value - local_optimum.obj_value for dow in neighbours]
-    topology = [{'idx': i, 'val': diff} for i, diff in enumerate(diff_obj_vals)]
-
-    def sort_by_value(d:dict):
-        return d['val']
-
-    topology.sort(key=sort_by_value)
-    indexing = [item['idx'] for item in topology]
-    topology = [neighbours[i] for i in indexing]
-
-    return topology
+    return Topology(local_optimum, neighbours, skip)
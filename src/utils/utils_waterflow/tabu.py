@@ -0,0 +1,108 @@
+from collections import Counter
+import numpy as np
+
+from src.utils.utils_waterflow.dow import DOW
+
+
+def move_attributes(dow:DOW, neighbour:DOW) -> list:
+    '''
+        Attributes of the move from dow to neighbour: the storages
+        opened ('open', storage) and closed ('close', storage), and the
+        fields reassigned ('assign', field, storage), labels from 1.
+
+        Arguments
+        ---------
+        dow:DOW
+        A drop-of-water (dow) representing a certain solution
+
+        neighbour:DOW
+        A neighbour dow of dow
+
+        Return
+        ------
+        list
+        List of the attributes of the move
+    '''
+    X, X_new = dow.X, neighbour.X
+    attributes = [('open', int(j)+1) for j in np.nonzero(X_new > X)[0]]
+    attributes += [('close', int(j)+1) for j in np.nonzero(X_new < X)[0]]
+    attributes += [('assign', int(i)+1, int(neighbour.Y[i])) for i in np.nonzero(neighbour.Y != dow.Y)[0]]
+    return attributes
+
+def reverse_attributes(dow:DOW, neighbour:DOW) -> list:
+    '''
+        Attributes of the moves undoing the move from dow to neighbour,
+        i.e. the attributes declared tabu once the move is done.
+    '''
+    X, X_new = dow.X, neighbour.X
+    attributes = [('close', int(j)+1) for j in np.nonzero(X_new > X)[0]]
+    attributes += [('open', int(j)+1) for j in np.nonzero(X_new < X)[0]]
+    attributes += [('assign', int(i)+1, int(dow.Y[i])) for i in np.nonzero(neighbour.Y != dow.Y)[0]]
+    return attributes
+
+
+class TabuList:
+
+    def __init__(self, tenure:int=7, max_moves:int=10) -> None:
+        '''
+            The TabuList class is the short-term memory of the tabu search
+            used by the local search (see local_search) to escape a local
+            optimum: the attributes undoing the last tenure moves are tabu,
+            a neighbour with a tabu attribute is not accepted, unless it
+            improves the best solution found (aspiration criterion).
+
+            The moves are stored in a ring buffer of tenure slots, the
+            memory does not grow with the number of moves.
+
+            Arguments
+            ---------
+            tenure:int
+            Integer number of moves an attribute stays tabu
+
+            max_moves:int
+            Integer number of maximum non-improving moves of a tabu search
+        '''
+        if tenure < 1:
+            raise ValueError(f'tenure must be positive: {tenure}')
+        self.tenure = tenure
+        self.max_moves = max_moves
+        self._slots = [()]*tenure
+        self._head = 0
+        self._active = Counter()
+
+    def clear(self) -> None:
+        '''
+            Forget all the moves.
+        '''
+        self._slots = [()]*self.tenure
+        self._head = 0
+        self._active.clear()
+
+    def push(self, dow:DOW, neighbour:DOW) -> None:
+        '''
+            Record the move from dow to neighbour, the oldest move
+            (if tenure moves are stored) is no more tabu.
+        '''
+        self._active.subtract(self._slots[self._head])
+        self._active += Counter() # drop non positive counts
+        attributes = tuple(reverse_attributes(dow, neighbour))
+        self._slots[self._head] = attributes
+        self._active.update(attributes)
+        self._head = (self._head + 1) % self.tenure
+
+    def is_tabu(self, dow:DOW, neighbour:DOW) -> bool:
+        '''
+            True if the move from dow to neighbour has a tabu attribute.
+        '''
+        return any(attribute in self._active for attribute in move_attributes(dow, neighbour))
+
+    def allowed(self, dow:DOW, neighbour:DOW, best_value:float) -> bool:
+        '''
+            True if the move from dow to neighbour is not tabu or the
+            neighbour improves the best objective value (aspiration).
+        '''
+        return neighbour.obj_value < best_value or not self.is_tabu(dow, neighbour)
+
+    def __len__(self) -> int:
+        # number of tabu attributes
+        return len(self._active)
@@ -0,0 +1,138 @@
+import io
+import cProfile
+import pstats
+from collections import Counter
+from contextlib import contextmanager
+from timeit import default_timer as timer
+
+
+class WFAStats:
+
+    def __init__(self, profile:bool=False) -> None:
+        '''
+            The WFAStats class collects the internal statistics of a WFA run:
+              - counters: number of events, e.g. fit calls, feasible and
+                no feasible dows, discarded and excluded dows;
+              - timers: number of calls and cumulative seconds of each phase
+                (rain, exploration, erosion, local search, opt_1, swap) and
+                of the solver calls (fit);
+              - values: last recorded value of a quantity, e.g. the fill
+                ratio of the seen sets.
+
+            It is passed to the WFA functions with the stats argument.
+
+            Arguments
+            ---------
+            profile:bool
+            If True, the whole WFA run is also profiled with cProfile
+            (see profile_report)
+        '''
+        self.counters = Counter()
+        self.timers = dict()
+        self.values = dict()
+        self._profiler = cProfile.Profile() if profile else None
+
+    def count(self, name:str, n:int=1) -> None:
+        '''
+            Increase the counter name by n.
+        '''
+        self.counters[name] += n
+
+    def record(self, name:str, value) -> None:
+        '''
+            Record the value of the quantity name, the last value is kept.
+        '''
+        self.values[name] = value
+
+    @contextmanager
+    def timer(self, name:str):
+        '''
+            Context manager to measure the time spent in a phase,
+            calls and seconds are accumulated.
+
+            Arguments
+            ---------
+            name:str
+            Name of the phase
+        '''
+        start = timer()
+        try:
+            yield
+        finally:
+            calls, seconds = self.timers.get(name, (0, 0.0))
+            self.timers[name] = (calls+1, seconds+timer()-start)
+
+    @contextmanager
+    def profile(self):
+        '''
+            Context manager to profile the code with cProfile,
+            only if the stats are created with profile=True.
+        '''
+        if self._profiler is None:
+            yield
+            return
+
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+
+    def profile_report(self, sort:str='cumulative', limit:int=30) -> str:
+        '''
+            Return the cProfile report of the run, None if the stats
+            are created with profile=False.
+
+            Arguments
+            ---------
+            sort:str
+            Sort key of the report (see pstats.Stats.sort_stats)
+
+            limit:int
+            Integer number of functions in the report
+        '''
+        if self._profiler is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def report(self) -> dict:
+        '''
+            Return the statistics as a dictionary with the counters, the
+            recorded values and, for each timer, the number of calls and
+            the cumulative seconds.
+        '''
+        return {'counters': dict(self.counters), 'values': dict(self.values),
+                'timers': {name: {'calls': calls, 'seconds': seconds}
+                           for name, (calls, seconds) in self.timers.items()}}
+
+    def __str__(self) -> str:
+        lines = [f'{name}: {value}' for name, value in sorted({**self.counters, **self.values}.items())]
+        lines += [f'{name}: {calls} calls, {seconds:.3f} sec'
+                  for name, (calls, seconds) in sorted(self.timers.items(), key=lambda item: -item[1][1])]
+        return '\n'.join(lines)
+
+
+class _NoStats(WFAStats):
+
+    def __init__(self) -> None:
+        '''
+            Support class used when no statistics are requested,
+            all methods do nothing.
+        '''
+        super().__init__()
+
+    def count(self, name:str, n:int=1) -> None:
+        pass
+
+    def record(self, name:str, value) -> None:
+        pass
+
+    @contextmanager
+    def timer(self, name:str):
+        yield
+
+
+# default of the stats argument of the WFA functions
+NO_STATS = _NoStats()
@@ -1,13 +1,29 @@
 from collections import Counter
+from contextlib import nullcontext
 
 from src.larp import LARP
 from src.utils.utils_waterflow.local_search import local_search, erosion
 
-from src.utils.utils_waterflow.dow import DOW
+from src.utils.utils_waterflow.dow import DOW, set_seed
 from src.utils.utils_waterflow.clouds_generator import clouds_generator
+from src.utils.memory_profiler import MemoryProfiler
+from src.utils.utils_waterflow.wfa_stats import WFAStats, NO_STATS
+from src.utils.utils_waterflow.seen_set import ExactSet, make_seen_set
+from src.utils.utils_waterflow.bounds import NeighbourBound
+from src.utils.utils_waterflow.tabu import TabuList
+from src.utils.utils_waterflow.lns import large_neighbourhood_search
+from src.utils.utils_waterflow.path_relinking import relink_elite
+from src.utils.utils_waterflow.routing import RouteSolver
 
 
-def waterflow(larp:LARP, max_cloud:int, max_pop:int, max_UIE:int, min_ero:int) -> DOW:
+def _phase(profiler:MemoryProfiler, name:str):
+    # memory profiling of a WFA phase, only if a profiler is given
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+def waterflow(larp:LARP, max_cloud:int, max_pop:int, max_UIE:int, min_ero:int, seed:int=None,
+              profiler:MemoryProfiler=None, stats:WFAStats=None, seen:dict=None,
+              skip_seen:bool=False, prune:bool=False, tabu:dict=None,
+              relinking:dict=None, lns:dict=None, routing:dict=None) -> DOW:
     '''
         This function represents the WaterFlow Algorithm (WFA), a meta-heuristic algorithm
         used to find an "acceptable" solution in a "reasonable" amount of time. This
@@ -31,66 +47,152 @@ def waterflow(larp:LARP, max_cloud:int, max_pop:int, max_UIE:int, min_ero:int) -
         min_ero:int
         Integer number of minimum count of dows required to start erosion process
 
+        seed:int
+        Seed of the random generator of the dows, optional (see set_seed)
+
+        profiler:MemoryProfiler
+        Memory profiler of the WFA phases (rain, exploration and erosion), optional
+
+        stats:WFAStats
+        Statistics of the run (counters, phase and solver timers, optionally
+        cProfile), optional; filled in place
+
+        seen:dict
+        Arguments of make_seen_set for the discarded and excluded dows, e.g.
+        {'kind': 'bloom', 'capacity': 10**6, 'error_rate': 1e-3} for a fixed
+        memory (approximate) seen set; exact hash sets if None
+
+        skip_seen:bool
+        If True, the erosion skips the neighbours already seen (see erosion)
+
+        prune:bool
+        If True, the local search does not evaluate the neighbours whose lower
+        bound (see NeighbourBound) cannot improve the current solution: single
+        neighbours are kept unevaluated (with their objective value) and
+        evaluated only if the erosion starts from them, while opt_1 moves
+        pruned as a whole (see NeighbourBound.X_bound) are not enumerated,
+        so the erosion explores fewer neighbours than without prune
+
+        tabu:dict
+        Arguments of TabuList, e.g. {'tenure': 7, 'max_moves': 10}, to continue
+        the local search with a tabu search once no improved solution is found;
+        no tabu search if None
+
+        relinking:dict
+        Arguments of relink_elite, e.g. {'pool_size': 10, 'min_distance': 2},
+        to explore the paths between the best solutions (P0) with path
+        relinking; no path relinking if None
+
+        lns:dict
+        Arguments of large_neighbourhood_search, e.g. {'max_iter': 10,
+        'destroy_size': 3, 'time_limit': 1.0}, to improve the best solution
+        with small exact sub-MIPs; no LNS if None
+
+        routing:dict
+        Arguments of RouteSolver, e.g. {'exact_limit': 8}, to compute the routes
+        of each neighbour for its open storages and assignments instead of
+        adjusting the routes of the current solution; routes are adjusted if None
+
         Return
         ------
         best_solution:DOW
         Best dow (drop-of-water), aka solution
     '''
+    if seed is not None:
+        set_seed(seed)
+
+    run_stats = NO_STATS if stats is None else stats
+    bound = NeighbourBound(larp) if prune else None
+    tabu_list = TabuList(**tabu) if tabu is not None else None
+    router = RouteSolver(larp, **routing) if routing is not None else None
+
     optimal_dows = dict()
     P0_list = list()
     UE_list = list()
-    E_list = list()
+    E_list = ExactSet()
+
+    # dows already evaluated, never removed (see seen_set)
+    excluded_list = make_seen_set(**(seen or dict()))
+    discarded_list = make_seen_set(**(seen or dict()))
 
-    excluded_list = list()
-    discarded_list = list()
+    # objective values of the feasible dows evaluated by the erosion (see evaluate)
+    fitted = dict()
 
     # generator of clouds, generate at most max_cloud clouds
-    clouds = clouds_generator(max_cloud, larp, max_pop)
-
-    for cloud in clouds:
-        # cloud generate a set of dow-of-water (dow)
-        # print('cloud - start raining...')
-        rainfall, discarded_dows = cloud.make_rain(E_list, discarded_list)
-        discarded_list.extend(discarded_dows) # no feasible dows met during dows generation
-        # print('cloud - stop raining.')
-        
-        ### Exploration Phase ###
-        # print('start exploration...')
-        for dow in rainfall:
-            # gravity force push dow to a local optimal position (or solution)
-            local_optimum, neighbours, excluded_dows, discarded_dows = local_search(larp, dow)
-            excluded_list.extend(excluded_dows) # feasible dows excluded since less optimal than local optimum
-            discarded_list.extend(discarded_dows) # no feasible position evaluated during local search
-            UE_list.append(local_optimum) # for erosion process
-        
-            if local_optimum not in optimal_dows.keys():
-                optimal_dows[local_optimum] = neighbours # store local optimal and his neighbour positions
-        # print('exploration completed.')
-        
-        # erosion condition: a certain position is eligible for the erosion
-        # process is a minimum number of min_ero dows converged to the same position
-        # print('verify erosion condition...')
-        dow_occurances = Counter(UE_list)
-        dow_occurances = [dow for dow, occurs in dow_occurances.items() if occurs >= min_ero]
-        # print('eligible dows:', len(dow_occurances))
-        for dow in dow_occurances:
-            
-            neighbours = optimal_dows[dow]
-
-            # start erosion process for eligible dow
-            tmp = erosion(larp, dow, neighbours, max_UIE,
-                excluded_list, discarded_list, optimal_dows, 
-                P0_list, UE_list, E_list)
-            
-            dow_optimum, _, excluded_list, discarded_list, \
-                optimal_dows, UE_list, E_list = tmp
-            P0_list.append(dow_optimum) # store (new) optimal position in P0
-    
+    clouds = clouds_generator(max_cloud, larp, max_pop, run_stats)
+
+    with run_stats.profile():
+        for cloud in clouds:
+            # cloud generate a set of dow-of-water (dow)
+            # print('cloud - start raining...')
+            with _phase(profiler, 'rain'), run_stats.timer('rain'):
+                rainfall, discarded_dows = cloud.make_rain(E_list, discarded_list)
+                discarded_list.extend(discarded_dows) # no feasible dows met during dows generation
+            # print('cloud - stop raining.')
+
+            ### Exploration Phase ###
+            # print('start exploration...')
+            with _phase(profiler, 'exploration'), run_stats.timer('exploration'):
+                for dow in rainfall:
+                    # gravity force push dow to a local optimal position (or solution)
+                    with run_stats.timer('local_search'):
+                        local_optimum, neighbours, excluded_dows, discarded_dows = local_search(larp, dow, run_stats, bound, tabu_list, router)
+                    excluded_list.extend(excluded_dows) # feasible dows excluded since less optimal than local optimum
+                    discarded_list.extend(discarded_dows) # no feasible position evaluated during local search
+                    run_stats.count('excluded_dows', len(excluded_dows))
+                    run_stats.count('discarded_dows', len(discarded_dows))
+                    UE_list.append(local_optimum) # for erosion process
+
+                    if local_optimum not in optimal_dows.keys():
+                        optimal_dows[local_optimum] = neighbours # store local optimal and his neighbour positions
+            # print('exploration completed.')
+
+            # erosion condition: a certain position is eligible for the erosion
+            # process is a minimum number of min_ero dows converged to the same position
+            # print('verify erosion condition...')
+            dow_occurances = Counter(UE_list)
+            dow_occurances = [dow for dow, occurs in dow_occurances.items() if occurs >= min_ero]
+            # print('eligible dows:', len(dow_occurances))
+            with _phase(profiler, 'erosion'), run_stats.timer('erosion'):
+                for dow in dow_occurances:
+
+                    neighbours = optimal_dows[dow]
+
+                    # start erosion process for eligible dow
+                    tmp = erosion(larp, dow, neighbours, max_UIE,
+                        excluded_list, discarded_list, optimal_dows,
+                        P0_list, UE_list, E_list, run_stats, skip_seen, bound, tabu_list, router, fitted)
+
+                    dow_optimum, _, excluded_list, discarded_list, \
+                        optimal_dows, UE_list, E_list = tmp
+                    P0_list.append(dow_optimum) # store (new) optimal position in P0
+
+            if profiler is not None:
+                # size of the WFA bookkeeping
+                for name, container in [('excluded_list', excluded_list), ('discarded_list', discarded_list),
+                                        ('optimal_dows', optimal_dows), ('UE_list', UE_list),
+                                        ('E_list', E_list), ('P0_list', P0_list)]:
+                    profiler.record_size(name, container)
+
+            for name, container in [('excluded', excluded_list), ('discarded', discarded_list)]:
+                run_stats.record(f'{name}_size', len(container))
+                if container.fill_ratio is not None:
+                    run_stats.record(f'{name}_fill_ratio', container.fill_ratio)
+
+    best_solution = None
     if P0_list:
         # retrieve best position from P0
         obj_vals = [dow.obj_value for dow in P0_list]
         idx_min = obj_vals.index(min(obj_vals))
         best_solution = P0_list[idx_min]
-        return best_solution
-    return None
-                
\ No newline at end of file
+
+        if relinking is not None:
+            with run_stats.profile(), run_stats.timer('relinking'):
+                best_solution = relink_elite(larp, P0_list, **relinking, stats=run_stats)
+
+        if lns is not None:
+            with run_stats.profile(), run_stats.timer('lns'):
+                best_solution = large_neighbourhood_search(larp, best_solution, **lns,
+                                                           seed=seed, stats=run_stats)
+
+    return best_solution